@@ -3,6 +3,8 @@ ASGI config for coopV2 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Production serves this with uvicorn workers under gunicorn (see gunicorn.conf.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -42,14 +42,16 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "coopstack",
     "django_extensions",
     "mathfilters",
 ]
 
 MIDDLEWARE = [
+    "coopstack.instrumentation.PerformanceMiddleware",  # ต้องอยู่บนสุด (จับเวลาทั้ง request)
     "django.middleware.security.SecurityMiddleware",
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    "coopstack.middleware.AsyncWhiteNoiseMiddleware",  # WhiteNoise ที่ไม่บังคับ ASGI ให้สลับไป thread
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -63,7 +65,7 @@ ROOT_URLCONF = "coopV2.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "coopstack.instrumentation.TimedDjangoTemplates",  # DjangoTemplates + จับเวลา render
        # "DIRS": [],
         'DIRS': [BASE_DIR / 'templates'], # ชี้ไปที่โฟลเดอร์ templates
         "APP_DIRS": True,
@@ -78,6 +80,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "coopV2.wsgi.application"
+# production รันแบบ ASGI ด้วย uvicorn worker ใต้ gunicorn (ดู gunicorn.conf.py)
+ASGI_APPLICATION = "coopV2.asgi.application"
+
+# Performance instrumentation (coopstack.instrumentation)
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', 'True') == 'True'  # ส่ง header Server-Timing
+PERF_SLOW_REQUEST_MS = int(os.getenv('PERF_SLOW_REQUEST_MS', '1000'))  # request ที่ช้ากว่านี้จะถูก log
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Bearer token ของ Prometheus สำหรับ /metrics
 
 LOGIN_REDIRECT_URL = '/'
 
@@ -99,10 +108,13 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # ไม่ตั้ง CONN_MAX_AGE: ภายใต้ ASGI แต่ละ request ใช้ thread ของตัวเอง connection แบบ persistent จะค้างอยู่ตาม thread
     }
 }
 
 AUTH_USER_MODEL = "coopstack.User"
+# โหลด User พร้อม student_profile / company_profile ใน query เดียว (coopstack/backends.py)
+AUTHENTICATION_BACKENDS = ['coopstack.backends.ProfileModelBackend']
 ALLOWED_EMAIL_DOMAINS = ["ubu.ac.th"]  # เพิ่มโดเมนอีเมลที่อนุญาตที่นี่
 
 # Password validation
@@ -148,6 +160,27 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media Files (ไฟล์ที่ User อัปโหลด เช่น PDF, รูปโปรไฟล์)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# ไฟล์อัปโหลดส่งผ่าน view ที่ตรวจสิทธิ์ (coopstack/media.py) ถ้าตั้งค่านี้ nginx จะเป็นผู้ส่งไฟล์ผ่าน X-Accel-Redirect
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', '')
+
+# Cache (coopstack/caching.py) ไม่ต้องมี service ภายนอก
+# - ไม่ตั้ง CACHE_DIR: LocMemCache แยกต่อ process (พอสำหรับ dev / runserver)
+# - ตั้ง CACHE_DIR: FileBasedCache ที่ทุก gunicorn worker ใช้ร่วมกัน ตัวนับเวอร์ชันจึงเห็นตรงกันทุก worker
+CACHE_DIR = os.getenv('CACHE_DIR', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    } if CACHE_DIR else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Session อ่านจาก cache ก่อน (ไม่มี SELECT django_session ทุก request) และเขียนลงฐานข้อมูลด้วยเสมอ
+# หลาย gunicorn worker ต้องตั้ง CACHE_DIR ให้ใช้ cache ร่วมกัน ไม่อย่างนั้น logout จาก worker หนึ่ง
+# จะไม่ลบ session ที่ cache อยู่ใน worker อื่น (วัดผลด้วย `python manage.py benchmark_sessions`)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
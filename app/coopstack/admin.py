@@ -1,13 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
+from django.db.models import F
 
 # Import Models ทั้งหมด
 from .models import (
     User, Student, CompanyMaster, CompanyProfile,
     TrainingRecord, JobApplication, WeeklyReport, 
-    Evaluation, Announcement, AllowedStudent
+    Evaluation, Announcement, AllowedStudent, StudentProgress,
+    BackgroundTask
 )
+from .caching import ANNOUNCEMENTS, bump_models, bump_version
+from .progress import refresh_many_progress
 
 # ==========================================
 # 0. Global Settings (ปรับแต่งหน้า Admin)
@@ -47,6 +51,14 @@ class StudentAdmin(admin.ModelAdmin):
     list_filter = ('major',)
 
 
+@admin.register(StudentProgress)
+class StudentProgressAdmin(admin.ModelAdmin):
+    list_display = ('student', 'training_hours', 'job_status', 'academic_year', 'current_week', 'acknowledged_reports', 'evaluation_status', 'updated_at')
+    list_filter = ('job_status', 'academic_year', 'evaluation_status')
+    search_fields = ('student__student_code', 'student__firstname', 'student__lastname')
+    readonly_fields = [f.name for f in StudentProgress._meta.fields]
+
+
 class CompanyProfileInline(admin.StackedInline):
     """ แสดง User พี่เลี้ยงที่ผูกกับบริษัทนี้ """
     model = CompanyProfile
@@ -98,7 +110,12 @@ class TrainingRecordAdmin(admin.ModelAdmin):
 
     @admin.action(description='อนุมัติรายการที่เลือก (Batch Approve)')
     def approve_selected_trainings(self, request, queryset):
-        queryset.update(status='APPROVED')
+        # เก็บ student_id ก่อน update เพราะ queryset อาจถูกกรองด้วย status (เช่น list_filter=PENDING)
+        student_ids = set(queryset.values_list('student_id', flat=True))
+        queryset.update(status='APPROVED', get_hours=F('hours'))
+        # update() ไม่ส่ง signals จึงต้องคำนวณ StudentProgress ใหม่และเปลี่ยน generation ของ cache เอง
+        bump_models(TrainingRecord)
+        refresh_many_progress(student_ids)
 
 
 # ==========================================
@@ -228,7 +245,20 @@ class AnnouncementAdmin(admin.ModelAdmin):
     @admin.action(description='เผยแพร่ที่เลือก')
     def publish_announcements(self, request, queryset):
         queryset.update(is_published=True)
+        bump_version(ANNOUNCEMENTS)  # update() ไม่ส่ง signals
 
     @admin.action(description='ยกเลิกการเผยแพร่ที่เลือก')
     def unpublish_announcements(self, request, queryset):
-        queryset.update(is_published=False)
\ No newline at end of file
+        queryset.update(is_published=False)
+        bump_version(ANNOUNCEMENTS)
+
+
+# ==========================================
+# 5. Background Tasks
+# ==========================================
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task_name', 'status', 'progress', 'message', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'task_name')
+    readonly_fields = ('started_at', 'finished_at', 'error')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoopstackConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "coopstack"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,25 @@
+"""
+Authentication backend ที่โหลด User พร้อมโปรไฟล์ตาม role ใน query เดียว
+
+view ของนักศึกษา/บริษัทเกือบทุกตัวเรียก request.user.student_profile หรือ request.user.company_profile
+(เช่น StudentBaseView, CompanyEvaluationListView) ModelBackend ปกติโหลดแค่ตาราง user แล้วแต่ละ relation
+เป็น lazy query แยก ที่นี่ใช้ LEFT JOIN ตอนโหลด User จาก session ทำให้การอ่านโปรไฟล์ (และบริษัทของพี่เลี้ยง)
+ไม่มี query เพิ่ม ผู้ใช้ที่ไม่มีโปรไฟล์ (อาจารย์/แอดมิน) จะได้ RelatedObjectDoesNotExist ทันทีโดยไม่ query ซ้ำ
+"""
+from django.contrib.auth.backends import ModelBackend
+
+from .models import User
+
+
+class ProfileModelBackend(ModelBackend):
+    def user_queryset(self, user_id):
+        return User._default_manager.select_related('student_profile', 'company_profile__company').filter(pk=user_id)
+
+    def get_user(self, user_id):
+        user = self.user_queryset(user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # request.auser() ของ view แบบ async (ModelBackend.aget_user เดิมไม่ได้เรียก get_user)
+        user = await self.user_queryset(user_id).afirst()
+        return user if user is not None and self.user_can_authenticate(user) else None
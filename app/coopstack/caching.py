@@ -0,0 +1,158 @@
+"""
+cache แบบมีเวอร์ชัน (versioned cache) สำหรับข้อมูลที่อ่านบ่อยแต่เปลี่ยนไม่บ่อย
+
+- แต่ละกลุ่มข้อมูล (namespace) มีตัวนับเวอร์ชันเก็บใน cache อยู่ 1 ค่า และอยู่ใน key ของทุกรายการ
+- signals เรียก bump_version() เมื่อข้อมูลเปลี่ยน ทำให้ key เดิมทั้งหมดไม่ถูกอ่านอีก (ไม่ต้องไล่ลบ)
+  รายการเก่าจะหมดอายุ/ถูกไล่ออกจาก cache เอง
+- ใช้ได้กับ LocMemCache / FileBasedCache (ดู CACHES ใน settings) ไม่ต้องมี Redis/Memcached
+- view แบบ async (ASGI) ใช้ฟังก์ชันคู่ที่ขึ้นต้นด้วย a (aget_version, aversioned_cache, aannouncement_lists)
+  ซึ่งใช้ key และเวอร์ชันชุดเดียวกัน
+- HTMX partial ของหน้าอาจารย์ cache ทั้งก้อน HTML ด้วย key = ตัวกรอง/หน้า + เวอร์ชัน (generation) ของทุก model
+  ที่ partial นั้นอ่าน (render_cached_fragment) นับ hit/miss ไว้ที่ metric coop_fragment_cache_requests_total
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from .metrics import FRAGMENT_REQUESTS
+from .models import Announcement
+
+# รายการที่ cache ไว้อยู่ได้นานสุด 1 ชั่วโมง (ปกติถูกเปลี่ยนเวอร์ชันก่อนหมดอายุ)
+VERSIONED_CACHE_TIMEOUT = 60 * 60
+# partial มีจำนวนรวมโดยประมาณจาก KeysetPaginator ด้วย จึงเก็บไว้สั้นกว่า
+FRAGMENT_CACHE_TIMEOUT = 10 * 60
+
+ANNOUNCEMENTS = 'announcements'
+
+
+def _version_key(namespace):
+    return f"cache_version:{namespace}"
+
+
+def get_version(namespace):
+    # ค่าเริ่มต้นเป็นเวลาปัจจุบัน: ถ้าตัวนับถูกไล่ออกจาก cache จะไม่ย้อนกลับไปชน key เก่า
+    return cache.get_or_set(_version_key(namespace), time.time_ns, None)
+
+
+async def aget_version(namespace):
+    return await cache.aget_or_set(_version_key(namespace), time.time_ns, None)
+
+
+def get_versions(namespaces):
+    """ เวอร์ชันของหลาย namespace ด้วย cache.get_many ครั้งเดียว """
+    found = cache.get_many([_version_key(namespace) for namespace in namespaces])
+    return [found.get(_version_key(namespace)) or get_version(namespace) for namespace in namespaces]
+
+
+def _increment(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:  # ตัวนับหมดไปจาก cache แล้ว
+        get_version(namespace)
+
+
+def bump_version(namespace):
+    """ ทำให้ cache ของ namespace นี้ทั้งหมดหมดอายุ """
+    _increment(namespace)
+    # เพิ่มอีกครั้งหลัง commit: request อื่นที่อ่านข้อมูลเก่าระหว่าง transaction จะไม่ค้างอยู่ใน cache
+    transaction.on_commit(lambda: _increment(namespace))
+
+
+def versioned_cache(namespace, key, builder, timeout=VERSIONED_CACHE_TIMEOUT):
+    """ อ่านค่าจาก cache ตามเวอร์ชันปัจจุบัน ถ้าไม่มีให้เรียก builder() แล้วเก็บไว้ """
+    cache_key = f"{namespace}:{get_version(namespace)}:{key}"
+    value = cache.get(cache_key)
+    if value is None:
+        value = builder()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+async def aversioned_cache(namespace, key, builder, timeout=VERSIONED_CACHE_TIMEOUT):
+    """ versioned_cache สำหรับ view แบบ async: builder เป็น coroutine function """
+    cache_key = f"{namespace}:{await aget_version(namespace)}:{key}"
+    value = await cache.aget(cache_key)
+    if value is None:
+        value = await builder()
+        await cache.aset(cache_key, value, timeout)
+    return value
+
+
+# ==========================================
+# ประกาศข่าวสาร
+# ==========================================
+
+def _announcement_queryset(include_unpublished):
+    announcements = Announcement.objects.all()  # เรียง Pin ก่อน แล้วใหม่สุด (Meta.ordering)
+    if not include_unpublished:
+        announcements = announcements.filter(is_published=True)
+    return announcements
+
+
+def _split_documents(announcements):
+    # เอกสารดาวน์โหลด = ประกาศที่มีไฟล์แนบ เรียงใหม่สุด (คัดจากชุดเดียวกัน ไม่ query ซ้ำ)
+    documents = sorted((item for item in announcements if item.attachment),
+                       key=lambda item: item.created_at, reverse=True)
+    return {'announcements': announcements, 'documents': documents}
+
+
+def _build_announcement_lists(include_unpublished):
+    return _split_documents(list(_announcement_queryset(include_unpublished)))
+
+
+async def _abuild_announcement_lists(include_unpublished):
+    return _split_documents([item async for item in _announcement_queryset(include_unpublished)])
+
+
+def announcement_lists(include_unpublished=False):
+    """
+    {'announcements': [...], 'documents': [...]} ของหน้าข่าวสาร
+    cache แยกตามกลุ่มผู้ใช้: อาจารย์เห็นทุกประกาศ (include_unpublished) คนอื่นเห็นเฉพาะที่เผยแพร่แล้ว
+    """
+    audience = 'all' if include_unpublished else 'published'
+    return versioned_cache(ANNOUNCEMENTS, audience, lambda: _build_announcement_lists(include_unpublished))
+
+
+async def aannouncement_lists(include_unpublished=False):
+    audience = 'all' if include_unpublished else 'published'
+    return await aversioned_cache(ANNOUNCEMENTS, audience, lambda: _abuild_announcement_lists(include_unpublished))
+
+
+# ==========================================
+# HTMX partial (fragment cache)
+# ==========================================
+
+def model_namespace(model):
+    return f"model:{model._meta.label_lower}"
+
+
+def bump_models(*models):
+    """ เปลี่ยน generation ของ model (เรียกเองหลัง queryset.update()/bulk_create ซึ่งไม่ส่ง signals) """
+    for model in models:
+        bump_version(model_namespace(model))
+
+
+def fragment_cache_key(request, name, models):
+    generations = ':'.join(str(version) for version in get_versions([model_namespace(model) for model in models]))
+    params = hashlib.md5(repr(sorted(request.GET.lists())).encode('utf-8')).hexdigest()
+    return f"fragment:{name}:{request.user.role}:{generations}:{params}"
+
+
+def render_cached_fragment(request, template_name, models, get_context):
+    """
+    render partial จาก cache ถ้าตัวกรอง/หน้า (request.GET), role และ generation ของ models ตรงกัน
+    get_context() ถูกเรียกเฉพาะตอน miss (ไม่ query ฐานข้อมูลเลยเมื่อ hit)
+    partial ที่ใช้ต้องไม่มีข้อมูลเฉพาะตัวผู้ใช้ (เช่น {% csrf_token %}) เพราะใช้ร่วมกันทุกคนใน role เดียวกัน
+    """
+    name = template_name.rsplit('/', 1)[-1].removesuffix('.html')
+    key = fragment_cache_key(request, name, models)
+    html = cache.get(key)
+    FRAGMENT_REQUESTS.labels(name, 'hit' if html is not None else 'miss').inc()
+    if html is None:
+        html = render_to_string(template_name, get_context(), request)
+        cache.set(key, html, FRAGMENT_CACHE_TIMEOUT)
+    return HttpResponse(html)
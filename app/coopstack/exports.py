@@ -0,0 +1,264 @@
+import csv
+import datetime
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import TrainingRecord, JobApplication, WeeklyReport, Evaluation
+from .filters import (
+    evaluated_jobs, filter_evaluation_jobs, filter_job_applications, filter_reports, filter_trainings
+)
+from .utils import ZipStream
+
+# จำนวนแถวที่ดึงจาก server-side cursor ต่อรอบ (และจำนวนแถวต่อ chunk ที่ส่งออก)
+EXPORT_CHUNK_SIZE = 2000
+
+EVALUATION_QUESTIONS = [f"q{part}_{item}" for part in range(1, 6) for item in range(1, 4)]
+
+
+# ==========================================
+# ชุดข้อมูลที่ export ได้ (ใช้ตัวกรองชุดเดียวกับหน้าตรวจสอบใน filters.py)
+# ==========================================
+
+def _jobs(params):
+    jobs = JobApplication.objects.order_by('-created_at')
+    return filter_job_applications(jobs, params, rank=False)
+
+
+def _trainings(params):
+    trainings = TrainingRecord.objects.order_by('-date')
+    return filter_trainings(trainings, params, rank=False)
+
+
+def _reports(params):
+    reports = WeeklyReport.objects.order_by('-submitted_at')
+    return filter_reports(reports, params, rank=False)
+
+
+def _evaluations(params):
+    jobs = filter_evaluation_jobs(evaluated_jobs(), params)
+    return Evaluation.objects.filter(job_application__in=jobs).order_by('job_application__student__student_code')
+
+
+# ชื่อชุดข้อมูล -> (ชื่อไฟล์, ฟังก์ชันสร้าง queryset, [(field, หัวคอลัมน์), ...])
+EXPORTS = {
+    'jobs': ('job_applications', _jobs, [
+        ('student__student_code', 'รหัสนักศึกษา'),
+        ('student__firstname', 'ชื่อ'),
+        ('student__lastname', 'นามสกุล'),
+        ('company__name', 'บริษัท'),
+        ('position', 'ตำแหน่ง'),
+        ('academic_year', 'ปีการศึกษา'),
+        ('start_date', 'วันเริ่มฝึก'),
+        ('end_date', 'วันสิ้นสุด'),
+        ('supervisor_name', 'พี่เลี้ยง'),
+        ('supervisor_phone', 'เบอร์พี่เลี้ยง'),
+        ('status', 'สถานะ'),
+        ('teacher_note', 'หมายเหตุอาจารย์'),
+        ('created_at', 'วันที่ยื่น'),
+    ]),
+    'trainings': ('training_records', _trainings, [
+        ('student__student_code', 'รหัสนักศึกษา'),
+        ('student__firstname', 'ชื่อ'),
+        ('student__lastname', 'นามสกุล'),
+        ('topic', 'หัวข้อการอบรม'),
+        ('date', 'วันที่อบรม'),
+        ('hours', 'ชั่วโมงที่เคลม'),
+        ('get_hours', 'ชั่วโมงที่ได้รับ'),
+        ('status', 'สถานะ'),
+        ('teacher_comment', 'ความเห็นอาจารย์'),
+    ]),
+    'reports': ('weekly_reports', _reports, [
+        ('job_application__student__student_code', 'รหัสนักศึกษา'),
+        ('job_application__student__firstname', 'ชื่อ'),
+        ('job_application__student__lastname', 'นามสกุล'),
+        ('job_application__company__name', 'บริษัท'),
+        ('job_application__academic_year', 'ปีการศึกษา'),
+        ('week_number', 'สัปดาห์ที่'),
+        ('work_summary', 'สรุปงานที่ปฏิบัติ'),
+        ('problems', 'ปัญหาและอุปสรรค'),
+        ('knowledge_gained', 'สิ่งที่ได้เรียนรู้'),
+        ('status', 'สถานะ'),
+        ('teacher_comment', 'ความเห็นอาจารย์'),
+        ('submitted_at', 'วันที่ส่ง'),
+    ]),
+    'evaluations': ('evaluations', _evaluations, [
+        ('job_application__student__student_code', 'รหัสนักศึกษา'),
+        ('job_application__student__firstname', 'ชื่อ'),
+        ('job_application__student__lastname', 'นามสกุล'),
+        ('job_application__company__name', 'บริษัท'),
+        ('job_application__academic_year', 'ปีการศึกษา'),
+        *[(question, question.upper().replace('_', '.')) for question in EVALUATION_QUESTIONS],
+        ('total_score', 'คะแนนรวม'),
+        ('strengths', 'จุดเด่น'),
+        ('weaknesses', 'จุดที่ควรปรับปรุง'),
+        ('status', 'สถานะ'),
+    ]),
+}
+
+
+def export_rows(dataset, params):
+    """
+    คืนค่า (ชื่อไฟล์, หัวคอลัมน์, generator ของแถว)
+    ใช้ values_list + iterator (server-side cursor บน PostgreSQL) จึงไม่โหลดทั้งตารางเข้า Memory
+    """
+    filename, build_queryset, columns = EXPORTS[dataset]
+    fields = [field for field, _ in columns]
+    headers = [header for _, header in columns]
+    rows = build_queryset(params).values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return filename, headers, map(_format_row, rows)
+
+
+def _format_row(row):
+    # DateTimeField เก็บเป็น UTC ให้แสดงเป็นเวลาท้องถิ่นแบบอ่านง่าย
+    return tuple(
+        timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if isinstance(value, datetime.datetime) else value
+        for value in row
+    )
+
+
+# ==========================================
+# รูปแบบไฟล์
+# ==========================================
+
+# ค่าที่ขึ้นต้นด้วยอักขระเหล่านี้ Excel/LibreOffice ตีความเป็นสูตร (CSV/formula injection)
+# เช่นชื่อบริษัทหรือความเห็นที่ผู้ใช้พิมพ์ว่า =HYPERLINK(...) จึงเติม ' นำหน้าให้แสดงเป็นข้อความ
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _safe_text(value):
+    text = str(value)
+    if text.startswith(FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def _safe_cell(value):
+    """ ตัวเลขคงเป็นตัวเลข (ค่าติดลบไม่ใช่สูตร) ส่วนข้อความผ่าน _safe_text """
+    if value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+        return value
+    return _safe_text(value)
+
+
+class _Echo:
+    """ file-like object ที่คืนค่าที่เขียนกลับมาเลย (ให้ csv.writer ใช้กับ StreamingHttpResponse) """
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    """ CSV (UTF-8 with BOM ให้ Excel อ่านภาษาไทยได้) ส่งออกทีละ EXPORT_CHUNK_SIZE แถว """
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow([_safe_cell(value) for value in headers])
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow([_safe_cell(value) for value in row]))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+async def _async_chunks(chunks):
+    """
+    ดึง chunk จาก generator แบบ sync ทีละตัวใน thread ของ request (thread_sensitive)
+    ให้ server-side cursor ของ .iterator() อยู่บน connection เดิมตลอดการ stream
+    """
+    chunks = iter(chunks)
+    done = object()
+    while (chunk := await sync_to_async(next)(chunks, done)) is not done:
+        yield chunk
+
+
+def streaming_response(request, chunks, **kwargs):
+    """
+    StreamingHttpResponse ที่ stream จริงทั้ง WSGI และ ASGI
+    ใต้ ASGI ถ้าให้ iterator แบบ sync Django จะ sync_to_async(list) ทั้ง body ไว้ใน Memory ก่อนส่ง
+    จึงห่อเป็น async iterator (ฝั่ง WSGI ใช้ iterator เดิม)
+    """
+    if isinstance(request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# อักขระควบคุมที่ XML ไม่อนุญาต (เช่นที่ติดมากับข้อความที่ copy มาจากที่อื่น)
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append('<c/>')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML_CHARS.sub('', _safe_text(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>"
+
+
+def stream_xlsx(headers, rows):
+    """
+    ไฟล์ .xlsx แบบ stream (ไม่ต้องใช้ library เพิ่ม): เขียน sheet ทีละแถวลง ZIP แล้วส่งออกทีละ chunk
+    ใช้ inline string จึงไม่ต้องเก็บ shared strings ทั้งไฟล์ไว้ใน Memory
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(headers).encode('utf-8'))
+            for count, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                if count % EXPORT_CHUNK_SIZE == 0:
+                    yield stream.pop()
+            sheet.write(b'</sheetData></worksheet>')
+    yield stream.pop()
@@ -0,0 +1,85 @@
+"""
+ตัวกรอง (?q= / ?year= / ?week=) ของหน้าตรวจสอบฝั่งอาจารย์
+ใช้ร่วมกันระหว่างหน้ารายการ (views.py), badge จำนวนงานค้าง และ export (exports.py) ให้ query string เดียวกันได้แถวชุดเดียวกัน
+rank=False ข้ามการคำนวณ search_rank (export ไม่ได้เรียงตามความใกล้เคียง) แถวที่ผ่านตัวกรองไม่เปลี่ยน
+"""
+from django.db.models import Q
+
+from .models import JobApplication
+from .progress import PLACED_STATUSES
+from .search import search_queryset
+
+
+def filter_trainings(trainings, params, rank=True):
+    search_query = params.get('q', '')
+    if search_query:
+        trainings = search_queryset(trainings, search_query, [
+            'student__firstname', 'student__lastname', 'student__student_code', 'topic'
+        ], rank=rank)
+    return trainings
+
+
+def filter_job_applications(jobs, params, rank=True):
+    search_query = params.get('q', '')
+    year_filter = params.get('year', '')
+
+    # Search Filter
+    if search_query:
+        jobs = search_queryset(jobs, search_query, [
+            'student__firstname', 'student__lastname', 'student__student_code', 'company__name'
+        ], rank=rank)
+
+    # Year Filter
+    if year_filter:
+        jobs = jobs.filter(Q(academic_year__icontains=year_filter))
+    return jobs
+
+
+def filter_reports(reports, params, rank=True):
+    search_query = params.get('q', '')
+    week_filter = params.get('week', '')
+    year_filter = params.get('year', '')
+
+    # Search Filter
+    if search_query:
+        reports = search_queryset(reports, search_query, [
+            'job_application__student__firstname',
+            'job_application__student__lastname',
+            'job_application__student__student_code',
+            'work_summary',
+        ], rank=rank)
+    # Year Filter
+    if year_filter:
+        reports = reports.filter(
+            job_application__academic_year__icontains=year_filter
+        )
+
+    if week_filter:
+        try:
+            week_num = int(week_filter)
+            reports = reports.filter(week_number=week_num)
+        except ValueError:
+            pass # กรณีค่า week ไม่ถูกต้อง
+    return reports
+
+
+def evaluated_jobs():
+    """ ใบสมัครที่ออกฝึกแล้ว (APPROVED/COMPLETED) และบริษัทส่งผลประเมินมาแล้ว = แถวของหน้าตรวจผลประเมิน """
+    return JobApplication.objects.filter(status__in=PLACED_STATUSES, evaluation__isnull=False)
+
+
+def filter_evaluation_jobs(jobs, params):
+    search_query = params.get('q', '')
+    year_filter = params.get('year', '')
+
+    # Filter Search
+    if search_query:
+        jobs = jobs.filter(
+            Q(student__firstname__icontains=search_query) |
+            Q(student__lastname__icontains=search_query) |
+            Q(student__student_code__icontains=search_query) |
+            Q(company__name__icontains=search_query)
+        )
+    if year_filter:
+        jobs = jobs.filter(academic_year=year_filter)
+    return jobs
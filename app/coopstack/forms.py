@@ -118,7 +118,7 @@ class TrainingRecordForm(forms.ModelForm):
             }),
             'proof_file': forms.FileInput(attrs={
                 'class': 'file-input file-input-bordered w-full',
-                'accept': 'image/*,.pdf' # กำหนดประเภทไฟล์ให้ตรงกับ HTML เดิม
+                'accept': '.pdf,.jpg,.jpeg,.png,.gif,.webp' # ตรวจซ้ำฝั่ง server ที่ validators ของ proof_file
             }),
         }
 
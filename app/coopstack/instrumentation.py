@@ -0,0 +1,164 @@
+"""
+วัดเวลาต่อ request แบบเบา ๆ (เปิดทิ้งไว้บน production ได้)
+
+- PerformanceMiddleware: นับ query / เวลา DB (ผ่าน connection.execute_wrapper), เวลา render template,
+  เวลารวม แล้วส่งกลับเป็น header Server-Timing (ดูได้ใน DevTools > Network > Timing)
+  และบันทึกลง Prometheus metrics (coopstack.metrics)
+- request ที่ช้ากว่า PERF_SLOW_REQUEST_MS จะถูก log เป็น JSON หนึ่งบรรทัด พร้อม SQL ที่ช้าที่สุด
+- TimedDjangoTemplates: template backend ที่จับเวลา render (ตั้งใน settings.TEMPLATES)
+
+หมายเหตุ: query ที่ถูกยิงระหว่าง render (lazy queryset ใน template) ถูกนับทั้งใน db และ tpl
+"""
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from .metrics import observe_request
+
+logger = logging.getLogger('coopstack.performance')
+
+# จำนวน SQL ที่ช้าที่สุดที่เก็บไว้ใส่ใน slow log
+TOP_SQL_COUNT = 3
+SQL_LOG_LENGTH = 500
+
+_current_metrics = ContextVar('coopstack_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'db_time', 'template_time', 'slowest')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.slowest = []  # min-heap ของ (duration, sql) ขนาดไม่เกิน TOP_SQL_COUNT
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if len(self.slowest) < TOP_SQL_COUNT:
+            heapq.heappush(self.slowest, (duration, sql))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, sql))
+
+    def __call__(self, execute, sql, params, many, context):
+        """ execute_wrapper: จับเวลาทุก query ที่วิ่งผ่าน connection """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record_query(sql, time.perf_counter() - start)
+
+    def top_sql(self):
+        return [
+            {'ms': round(duration * 1000, 1), 'sql': sql[:SQL_LOG_LENGTH]}
+            for duration, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+class PerformanceMiddleware:
+    """
+    ควรอยู่บนสุดของ MIDDLEWARE เพื่อให้นับ query ของ session/auth middleware ด้วย
+
+    รองรับทั้ง WSGI และ ASGI: ตอนรันแบบ ASGI query ของ request หนึ่ง (ทั้ง ORM แบบ async และโค้ด sync)
+    วิ่งใน thread เดียวกันของ request นั้น (thread_sensitive) จึงติดตั้ง execute_wrapper ใน thread นั้นผ่าน sync_to_async
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            stack = ExitStack()
+            await sync_to_async(self.wrap_connections)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def wrap_connections(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else ''
+        observe_request(request, response, view_name, total, metrics.queries, metrics.db_time)
+
+        if getattr(settings, 'PERF_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f'tpl;dur={metrics.template_time * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+
+        if total * 1000 >= getattr(settings, 'PERF_SLOW_REQUEST_MS', 1000):
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                'db_ms': round(metrics.db_time * 1000, 1),
+                'queries': metrics.queries,
+                'template_ms': round(metrics.template_time * 1000, 1),
+                'top_sql': metrics.top_sql(),
+            }, ensure_ascii=False))
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """ DjangoTemplates ที่คืน TimedTemplate (include ภายใน template ไม่ผ่าน backend จึงไม่ถูกนับซ้ำ) """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,320 @@
+"""
+เครื่องมือยิงโหลดจำลองผู้ใช้ตามบทบาท (นักศึกษา / อาจารย์ / บริษัท)
+ใช้กับคำสั่ง `python manage.py load_test` (ดูรายละเอียดใน management/commands/load_test.py)
+
+ยิงเฉพาะ GET (หน้าเต็ม + HTMX partial/modal) เพื่อไม่ให้ข้อมูลที่ใช้วัดผลเปลี่ยนระหว่างรอบ
+"""
+import http.cookiejar
+import random
+import re
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict, namedtuple
+
+from django.urls import reverse
+
+from .models import (
+    User, Student, CompanyMaster, CompanyProfile, TrainingRecord,
+    JobApplication, WeeklyReport
+)
+
+# ขั้นตอน 1 request: ชื่อ URL, args, query string, HX-Target (None = โหลดหน้าเต็ม)
+Step = namedtuple('Step', ['url_name', 'args', 'params', 'hx_target'], defaults=[(), None, None])
+
+# จำนวน id ตัวอย่างที่ดึงมาใช้สุ่มต่อชนิดข้อมูล
+SAMPLE_SIZE = 1000
+
+
+def percentile(sorted_values, pct):
+    """ percentile แบบ nearest-rank จาก list ที่เรียงแล้ว """
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Stats:
+    """ เก็บเวลาตอบสนองต่อ endpoint (thread-safe) """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.latencies[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+    @staticmethod
+    def _row(label, values, errors, elapsed):
+        values = sorted(values)
+        return (
+            label, len(values), errors, len(values) / elapsed,
+            *(percentile(values, pct) * 1000 for pct in (50, 95, 99)), values[-1] * 1000 if values else 0.0,
+        )
+
+    def rows(self, elapsed):
+        """ [(endpoint, requests, errors, req/s, p50, p95, p99, max)] เวลาเป็นมิลลิวินาที เรียงตาม p95 มากสุดก่อน """
+        rows = [self._row(label, values, self.errors[label], elapsed) for label, values in self.latencies.items()]
+        return sorted(rows, key=lambda row: row[5], reverse=True)
+
+    def total(self, elapsed, exclude=()):
+        """ แถวเดียวรูปแบบเดียวกับ rows() แต่รวมทุก endpoint (ยกเว้น exclude) """
+        labels = [label for label in self.latencies if label not in exclude]
+        values = [value for label in labels for value in self.latencies[label]]
+        return self._row('total', values, sum(self.errors[label] for label in labels), elapsed)
+
+
+class Client:
+    """ HTTP client ต่อผู้ใช้ 1 คน (เก็บ cookie session/csrf ของตัวเอง) """
+    def __init__(self, base_url, timeout=30, host=None, insecure=False):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        # host = ค่า Host header ที่ส่งแทนชื่อใน base_url (เช่นยิงผ่าน https://nginx แต่ให้ Django เห็น localhost
+        # ซึ่งอยู่ใน ALLOWED_HOSTS / CSRF_TRUSTED_ORIGINS)
+        parsed = urllib.parse.urlparse(self.base_url)
+        self.host = host
+        self.origin = f"{parsed.scheme}://{host or parsed.netloc}"
+        self.cookies = http.cookiejar.CookieJar()
+        handlers = [urllib.request.HTTPCookieProcessor(self.cookies)]
+        if insecure:
+            # cert ของ mkcert ใน docker-compose ไม่อยู่ใน trust store ของ container
+            handlers.append(urllib.request.HTTPSHandler(context=ssl._create_unverified_context()))
+        self.opener = urllib.request.build_opener(*handlers)
+
+    def request(self, path, data=None, headers=None):
+        """ คืนค่า (status, url ปลายทางหลัง redirect, body) """
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=urllib.parse.urlencode(data).encode() if data is not None else None,
+            headers=headers or {},
+        )
+        if self.host:
+            request.add_header('Host', self.host)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.geturl(), response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.geturl(), error.read()
+
+    def login(self, username, password):
+        login_path = reverse('login')
+        _, _, body = self.request(login_path)
+        match = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', body)
+        token = match.group(1).decode() if match else ''
+        status, url, _ = self.request(
+            login_path,
+            data={'username': username, 'password': password, 'csrfmiddlewaretoken': token},
+            headers={'Referer': self.origin + login_path},
+        )
+        return status < 400 and login_path not in urllib.parse.urlparse(url).path
+
+
+class Samples:
+    """ id ตัวอย่างจากฐานข้อมูล (ดึงครั้งเดียวก่อนเริ่มยิง) ใช้เติม args ของ URL """
+    def __init__(self):
+        self.students = list(
+            User.objects.filter(role=User.Role.STUDENT, student_profile__job_applications__reports__isnull=False)
+            .values_list('username', 'student_profile__id').distinct()[:SAMPLE_SIZE]
+        )
+        self.teachers = list(User.objects.filter(role=User.Role.TEACHER).values_list('username', flat=True)[:10])
+        self.companies = list(
+            CompanyProfile.objects.filter(company__job_applications__evaluation__isnull=False)
+            .values_list('user__username', 'company_id').distinct()[:SAMPLE_SIZE]
+        )
+        self.student_ids = list(Student.objects.values_list('id', flat=True)[:SAMPLE_SIZE])
+        self.training_ids = list(TrainingRecord.objects.values_list('id', flat=True)[:SAMPLE_SIZE])
+        self.job_ids = list(JobApplication.objects.values_list('id', flat=True)[:SAMPLE_SIZE])
+        self.report_ids = list(WeeklyReport.objects.values_list('id', flat=True)[:SAMPLE_SIZE])
+        self.evaluated_job_ids = list(
+            JobApplication.objects.filter(evaluation__isnull=False).values_list('id', flat=True)[:SAMPLE_SIZE]
+        )
+        self.company_ids = list(CompanyMaster.objects.values_list('id', flat=True)[:SAMPLE_SIZE])
+        self.years = list(
+            JobApplication.objects.order_by('-academic_year').values_list('academic_year', flat=True).distinct()
+        )
+
+    def accounts(self, role):
+        if role == 'student':
+            return [username for username, _ in self.students]
+        if role == 'company':
+            return [username for username, _ in self.companies]
+        return self.teachers
+
+    def own_records(self, role, username):
+        """ id ของข้อมูลที่ผู้ใช้คนนี้เปิดดูได้ (รายงานของตัวเอง / ใบสมัครที่บริษัทประเมินแล้ว) """
+        if role == 'student':
+            student_id = dict(self.students)[username]
+            return list(
+                WeeklyReport.objects.filter(job_application__student_id=student_id).values_list('id', flat=True)[:20]
+            )
+        if role == 'company':
+            company_id = dict(self.companies)[username]
+            return list(
+                JobApplication.objects.filter(company_id=company_id, evaluation__isnull=False)
+                .values_list('id', flat=True)[:20]
+            )
+        return []
+
+
+# ==========================================
+# Scenario ต่อบทบาท (ลำดับการคลิกโดยประมาณของผู้ใช้จริง)
+# ==========================================
+
+def student_scenario(rng, samples, own_ids):
+    steps = [
+        Step('student-dashboard'),
+        Step('student-job'),
+        Step('search-company', params={'company_search': rng.choice(['บริษัท', 'เทค', 'ซอฟต์', 'จำกัด'])},
+             hx_target='company-results'),
+        Step('student-training'),
+        Step('student-report'),
+        Step('student-news'),
+    ]
+    if own_ids:
+        steps.insert(5, Step('report-detail-modal', args=(rng.choice(own_ids),), hx_target='modal-container'))
+    return steps
+
+
+def teacher_scenario(rng, samples, own_ids):
+    year = rng.choice(samples.years) if samples.years else ''
+    pick = lambda ids: (rng.choice(ids),) if ids else None
+    steps = [
+        Step('teacher-dashboard'),
+        Step('teacher-dashboard', params={'year': year, 'page': rng.randint(1, 5)}, hx_target='student-results'),
+        Step('get-student-detail-modal', args=pick(samples.student_ids), hx_target='modal-container'),
+        Step('teacher-verify-train'),
+        Step('teacher-verify-train', params={'page': rng.randint(2, 5)}, hx_target='training-list-container'),
+        Step('get-approve-modal', args=pick(samples.training_ids), hx_target='modal-container'),
+        Step('teacher-verify-job'),
+        Step('teacher-verify-job', params={'year': year}, hx_target='job-list-container'),
+        Step('get-job-detail-modal', args=pick(samples.job_ids), hx_target='modal-container'),
+        Step('teacher-verify-report'),
+        Step('teacher-verify-report', params={'week': rng.randint(1, 16)}, hx_target='report-list-container'),
+        Step('get-report-detail-modal', args=pick(samples.report_ids), hx_target='modal-container'),
+        Step('teacher-verify-evaluation'),
+        Step('get-eval-detail-modal', args=pick(samples.evaluated_job_ids), hx_target='modal-container'),
+        Step('teacher-company-summary'),
+        Step('teacher-company-summary', params={'page': rng.randint(2, 5)}, hx_target='company-list-container'),
+        Step('get-company-comment-modal', args=pick(samples.company_ids), hx_target='modal-container'),
+        Step('teacher-company-account'),
+        Step('teacher-news'),
+    ]
+    # ข้าม step ที่ไม่มีข้อมูลให้เปิด (args=None)
+    return [step for step in steps if step.args is not None]
+
+
+def company_scenario(rng, samples, own_ids):
+    steps = [Step('company-evaluation-list')]
+    for job_id in rng.sample(own_ids, k=min(3, len(own_ids))):
+        steps.append(Step('get-evaluation-modal', args=(job_id,), hx_target='modal-container'))
+    return steps
+
+
+SCENARIOS = {
+    'student': student_scenario,
+    'teacher': teacher_scenario,
+    'company': company_scenario,
+}
+
+
+class VirtualUser(threading.Thread):
+    """ ผู้ใช้จำลอง 1 คน: login แล้ววนเล่น scenario ของบทบาทตัวเองจนหมดเวลา """
+    def __init__(self, role, username, runner, seed):
+        super().__init__(daemon=True)
+        self.role = role
+        self.username = username
+        self.runner = runner
+        self.rng = random.Random(seed)
+        # ดึงจากฐานข้อมูลตั้งแต่ตอนสร้าง (main thread) ระหว่างยิงโหลดจะไม่แตะฐานข้อมูลเลย
+        self.own_ids = runner.samples.own_records(role, username)
+
+    def run(self):
+        runner = self.runner
+        client = Client(runner.base_url, timeout=runner.timeout, host=runner.host, insecure=runner.insecure)
+
+        started = time.perf_counter()
+        ok = client.login(self.username, runner.password)
+        runner.stats.record('login', time.perf_counter() - started, ok)
+        if not ok:
+            return
+
+        while time.monotonic() < runner.deadline:
+            for step in SCENARIOS[self.role](self.rng, runner.samples, self.own_ids):
+                if time.monotonic() >= runner.deadline:
+                    return
+                self.hit(client, step)
+                if runner.think_time:
+                    time.sleep(self.rng.uniform(0, runner.think_time * 2))
+
+    def hit(self, client, step):
+        path = reverse(step.url_name, args=step.args)
+        if step.params:
+            path += '?' + urllib.parse.urlencode(step.params)
+        headers = {}
+        label = step.url_name
+        if step.hx_target:
+            headers = {'HX-Request': 'true', 'HX-Target': step.hx_target}
+            label += ' [htmx]'
+
+        started = time.perf_counter()
+        status, url, _ = client.request(path, headers=headers)
+        elapsed = time.perf_counter() - started
+        # โดน redirect กลับหน้า login/home = session หลุดหรือไม่มีสิทธิ์ นับเป็น error
+        redirected = urllib.parse.urlparse(url).path != urllib.parse.urlparse(client.base_url + path).path
+        self.runner.stats.record(label, elapsed, status < 400 and not redirected)
+
+
+class LoadTest:
+    """ สุ่มบทบาทตามสัดส่วน mix แล้วปล่อยผู้ใช้จำลองทีละคนตามช่วง ramp-up """
+    def __init__(self, base_url, users, duration, mix, password, think_time=0.5, ramp_up=0, timeout=30, seed=1,
+                 host=None, insecure=False):
+        self.base_url = base_url
+        self.host = host
+        self.insecure = insecure
+        self.users = users
+        self.duration = duration
+        self.mix = mix
+        self.password = password
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.timeout = timeout
+        self.seed = seed
+        self.stats = Stats()
+        self.samples = Samples()
+        self.deadline = None
+        self.elapsed = 0.0
+
+    def plan(self):
+        """ [(role, username)] ของผู้ใช้จำลองทั้งหมด """
+        rng = random.Random(self.seed)
+        roles = [role for role, weight in self.mix.items() if weight > 0 and self.samples.accounts(role)]
+        if not roles:
+            raise ValueError("ไม่มีบัญชีผู้ใช้ให้ทดสอบ (ลองสร้างข้อมูลด้วย generate_mock_data)")
+        weights = [self.mix[role] for role in roles]
+        plan = []
+        for _ in range(self.users):
+            role = rng.choices(roles, weights)[0]
+            plan.append((role, rng.choice(self.samples.accounts(role))))
+        return plan
+
+    def run(self):
+        threads = [
+            VirtualUser(role, username, self, seed=self.seed + index)
+            for index, (role, username) in enumerate(self.plan())
+        ]
+        started = time.monotonic()
+        self.deadline = started + self.ramp_up + self.duration
+        for thread in threads:
+            thread.start()
+            if self.ramp_up:
+                time.sleep(self.ramp_up / len(threads))
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.monotonic() - started
+        return self.stats.rows(self.elapsed)
@@ -0,0 +1,182 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from coopstack.loadtest import LoadTest
+from coopstack.management.commands.load_test import parse_mix
+
+# (ชื่อโหมด, application, worker class ของ gunicorn)
+MODES = [
+    ('wsgi-sync', 'coopV2.wsgi:application', 'sync'),
+    ('asgi-uvicorn', 'coopV2.asgi:application', 'uvicorn_worker.UvicornWorker'),
+]
+
+
+def parse_levels(value):
+    """ "25,50,100" -> [25, 50, 100] """
+    try:
+        levels = sorted({int(part) for part in value.split(',')})
+    except ValueError:
+        raise CommandError(f"รูปแบบ --concurrency ไม่ถูกต้อง: {value}")
+    if not levels or levels[0] < 1:
+        raise CommandError(f"รูปแบบ --concurrency ไม่ถูกต้อง: {value}")
+    return levels
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def worker_pids(master_pid):
+    """ pid ของ worker (process ลูกของ gunicorn master) อ่านจาก /proc """
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue  # process จบไปแล้ว
+        if parent == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+@contextmanager
+def gunicorn(application, worker_class, workers, port, timeout=60):
+    env = os.environ.copy()
+    # on_starting ใน gunicorn.conf.py ล้างโฟลเดอร์นี้ ห้ามแตะ metrics ของเซิร์ฟเวอร์จริงที่รันอยู่ใน container เดียวกัน
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    env['PERF_SLOW_REQUEST_MS'] = str(10 ** 9)  # ไม่ให้ slow log ของทุก request ตอนโหลดสูงท่วมผลลัพธ์
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', application, '-k', worker_class, '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=settings.BASE_DIR, env=env,
+    )
+    try:
+        url = f'http://127.0.0.1:{port}{reverse("login")}'
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise CommandError(f"gunicorn ({worker_class}) หยุดทำงานก่อนพร้อมรับ request")
+            try:
+                with urllib.request.urlopen(url, timeout=5):
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                if time.monotonic() > deadline:
+                    raise CommandError(f"gunicorn ({worker_class}) ไม่ตอบภายใน {timeout} วินาที")
+                time.sleep(0.5)
+        # รอให้ worker ครบก่อนเริ่มวัด
+        while len(worker_pids(process.pid)) < workers and time.monotonic() < deadline:
+            time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare gunicorn sync workers (coopV2.wsgi) with uvicorn workers (coopV2.asgi) at the same memory budget. '
+        'For each mode the per-worker RSS is measured after a warm-up, the number of workers is sized to fit '
+        '--memory-mb, and the same role-based traffic as load_test is replayed at each --concurrency level. '
+        'Needs accounts from generate_mock_data and Linux /proc, e.g. '
+        '"docker compose exec web python manage.py benchmark_asgi --memory-mb 1024"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--memory-mb', type=int, default=1024, help='หน่วยความจำรวมของ worker ทุกตัว (MB)')
+        parser.add_argument('--concurrency', type=parse_levels, default='25,50,100,200',
+                            help='จำนวนผู้ใช้พร้อมกันแต่ละรอบ (คั่นด้วย ,)')
+        parser.add_argument('--duration', type=int, default=30, help='ระยะเวลายิงโหลดต่อรอบ (วินาที)')
+        parser.add_argument('--warm-up', type=int, default=10, help='ระยะเวลา warm-up ก่อนวัด RSS ต่อ worker (วินาที)')
+        parser.add_argument('--think-time', type=float, default=0.0, help='เวลาคิดเฉลี่ยระหว่างคลิก (วินาที)')
+        parser.add_argument('--mix', type=parse_mix, default='student=70,teacher=10,company=20',
+                            help='สัดส่วนบทบาทของผู้ใช้จำลอง')
+        parser.add_argument('--p95-ms', type=float, default=1000, help='p95 สูงสุดที่ยังนับว่ารับโหลดไหว (มิลลิวินาที)')
+        parser.add_argument('--password', default='password123', help='รหัสผ่านของบัญชีทดสอบ (generate_mock_data)')
+        parser.add_argument('--timeout', type=int, default=30, help='timeout ต่อ request (วินาที)')
+
+    def load(self, port, users, duration, options):
+        load_test = LoadTest(
+            base_url=f'http://127.0.0.1:{port}', users=users, duration=duration, mix=options['mix'],
+            password=options['password'], think_time=options['think_time'], ramp_up=0,
+            timeout=options['timeout'],
+        )
+        try:
+            load_test.run()
+        except ValueError as error:
+            raise CommandError(str(error))
+        # login (hash รหัสผ่าน) กิน CPU เท่ากันทั้งสองโหมด ไม่นับรวม
+        return load_test.stats.total(load_test.elapsed, exclude=('login',))
+
+    def worker_rss(self, process):
+        return [rss_mb(pid) for pid in worker_pids(process.pid)]
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc'):
+            raise CommandError("ต้องรันบน Linux (อ่านหน่วยความจำของ worker จาก /proc)")
+        levels = options['concurrency']
+
+        header = (f"{'mode':<14} {'workers':>7} {'users':>6} {'req/s':>8} {'p50':>8} {'p95':>8} "
+                  f"{'err':>6} {'rss MB':>8}")
+        rows = []
+        for mode, application, worker_class in MODES:
+            port = free_port()
+            # 1) วัด RSS ต่อ worker หลัง warm-up (โหลด code/template/cache ครบแล้ว)
+            with gunicorn(application, worker_class, 1, port) as process:
+                self.load(port, levels[0], options['warm_up'], options)
+                per_worker = max(self.worker_rss(process), default=0.0)
+            if not per_worker:
+                raise CommandError(f"{mode}: อ่านหน่วยความจำของ worker ไม่ได้")
+            workers = max(1, int(options['memory_mb'] // per_worker))
+            self.stdout.write(f"{mode}: {per_worker:.0f} MB ต่อ worker -> {workers} worker ใน {options['memory_mb']} MB")
+
+            # 2) ยิงโหลดทีละระดับด้วยจำนวน worker ที่พอดีกับงบหน่วยความจำ
+            with gunicorn(application, worker_class, workers, port) as process:
+                for users in levels:
+                    _label, count, errors, rps, p50, p95, _p99, _slowest = self.load(
+                        port, users, options['duration'], options)
+                    rows.append((mode, workers, users, rps, p50, p95, errors, count,
+                                 sum(self.worker_rss(process))))
+
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode, workers, users, rps, p50, p95, errors, count, rss in rows:
+            line = (f"{mode:<14} {workers:>7} {users:>6} {rps:>8.1f} {p50:>8.0f} {p95:>8.0f} "
+                    f"{errors:>6} {rss:>8.0f}")
+            self.stdout.write(self.style.ERROR(line) if errors else line)
+
+        for mode, _application, _worker_class in MODES:
+            passed = [row[2] for row in rows
+                      if row[0] == mode and not row[6] and row[7] and row[5] <= options['p95_ms']]
+            self.stdout.write(self.style.SUCCESS(
+                f"{mode}: รับผู้ใช้พร้อมกันได้ {max(passed) if passed else 0} คน "
+                f"(p95 <= {options['p95_ms']:.0f} ms และไม่มี error)"
+            ))
@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from coopstack.models import User, Student
+
+ENGINES = [
+    ('db', 'django.contrib.sessions.backends.db'),
+    ('cached_db', 'django.contrib.sessions.backends.cached_db'),
+]
+
+# หน้าที่นักศึกษาเปิดบ่อย (หน้าเต็ม + HTMX partial)
+PAGES = [
+    ('student-dashboard', {}),
+    ('student-news', {}),
+    ('student-training', {}),
+    ('student-job', {'HX-Request': 'true'}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request SQL queries and latency of the db and cached_db session engines '
+        'for a logged-in student. Runs inside a transaction that is rolled back, so no data is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='จำนวน request ต่อ session engine')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        header = f"{'engine':<12} {'queries/req':>12} {'session/req':>12} {'ms/req':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        results = {}
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            user = User.objects.create_user(username='benchmark_sessions', role=User.Role.STUDENT)
+            Student.objects.create(user=user, student_code='benchmark', firstname='ทดสอบ', lastname='ระบบ', major='-')
+
+            for label, engine in ENGINES:
+                with override_settings(SESSION_ENGINE=engine):
+                    client = Client()
+                    client.force_login(user)
+                    client.get(reverse(PAGES[0][0]))  # warm-up (โหลด template / เติม cache)
+
+                    started = time.perf_counter()
+                    with CaptureQueriesContext(connection) as queries:
+                        for index in range(total):
+                            url_name, headers = PAGES[index % len(PAGES)]
+                            client.get(reverse(url_name), headers=headers)
+                    elapsed = time.perf_counter() - started
+                    client.logout()
+
+                session_queries = sum('django_session' in query['sql'] for query in queries.captured_queries)
+                results[label] = len(queries) / total
+                self.stdout.write(
+                    f"{label:<12} {len(queries) / total:>12.2f} {session_queries / total:>12.2f} "
+                    f"{elapsed / total * 1000:>8.2f}"
+                )
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"cached_db ประหยัด {results['db'] - results['cached_db']:.2f} query ต่อ request"
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from coopstack.models import JobApplication, current_academic_year
+from coopstack.utils import CoopFormBatch
+
+
+class Command(BaseCommand):
+    help = 'Render coop forms of every APPROVED job application in an academic year into one ZIP file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=None, help='ปีการศึกษา (พ.ศ.) ค่าเริ่มต้นคือปีปัจจุบัน')
+        parser.add_argument('--output', default=None, help='ไฟล์ ZIP ปลายทาง (ค่าเริ่มต้น coop_forms_<ปี>.zip)')
+        parser.add_argument('--workers', type=int, default=None, help='จำนวน process ที่ใช้ render (ค่าเริ่มต้น = จำนวน CPU)')
+
+    def handle(self, *args, **options):
+        year = options['year'] or current_academic_year()
+        output = options['output'] or f"coop_forms_{year}.zip"
+
+        jobs = JobApplication.objects.filter(status='APPROVED', academic_year=year).select_related(
+            'student__user', 'company'
+        ).order_by('student__student_code')
+        batch = CoopFormBatch(jobs.iterator(chunk_size=200), workers=options['workers'])
+
+        self.stdout.write(f"กำลังสร้างแบบฟอร์มปีการศึกษา {year} ด้วย {batch.workers} process...")
+        with open(output, 'wb') as f:
+            for chunk in batch:
+                f.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'เสร็จสิ้น! {batch.count} ฉบับ ใน {batch.elapsed:.1f} วินาที '
+            f'({batch.throughput:.1f} ฉบับ/วินาที) -> {output}'
+        ))
@@ -0,0 +1,184 @@
+import random
+import time
+from datetime import date, timedelta
+from faker import Faker
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from coopstack.models import (
+    User, Student, CompanyMaster, CompanyProfile, TrainingRecord,
+    JobApplication, WeeklyReport, Evaluation, current_academic_year
+)
+from coopstack.progress import rebuild_all_progress
+
+POSITIONS = [
+    "Frontend Developer", "Backend Developer", "Full Stack Developer",
+    "UX/UI Designer", "Software Tester", "Data Analyst",
+    "Network Engineer", "System Admin",
+]
+COMPANY_SUFFIXES = ["เทคโนโลยี", "โซลูชั่น", "ซอฟต์แวร์", "ดิจิทัล", "อินโนเวชั่น", "จำกัด", "มหาชน"]
+TRAINING_TOPICS = ["อบรม Python เบื้องต้น", "อบรม Git", "Workshop Data Science", "Camp Fullstack", "สัมมนา Cloud"]
+MAJORS = ["วิทยาการข้อมูลและนวัตกรรมซอฟต์แวร์", "วิทยาการคอมพิวเตอร์", "เทคโนโลยีสารสนเทศ"]
+EVALUATION_QUESTIONS = [f"q{part}_{item}" for part in range(1, 6) for item in range(1, 4)]
+
+# รหัสนักศึกษาจำลองขึ้นต้นด้วย 99 จะได้ไม่ชนกับรหัสจริง
+MOCK_CODE_PREFIX = "99"
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a deterministic mock dataset (students, companies, jobs, reports, evaluations) for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='จำนวนนักศึกษา')
+        parser.add_argument('--companies', type=int, default=100, help='จำนวนบริษัท')
+        parser.add_argument('--years', type=int, default=3, help='จำนวนปีการศึกษาย้อนหลัง (รวมปีปัจจุบัน)')
+        parser.add_argument('--reports', type=int, default=16, help='จำนวนรายงานประจำสัปดาห์ต่องานที่ฝึกแล้ว')
+        parser.add_argument('--evaluations', type=float, default=0.8, help='สัดส่วนงานที่ฝึกแล้วที่มีผลประเมิน (0-1)')
+        parser.add_argument('--seed', type=int, default=42, help='seed ของการสุ่ม (ค่าเดิม = ข้อมูลเดิม)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='จำนวนนักศึกษาต่อรอบ bulk_create')
+        parser.add_argument('--password', default='password123', help='รหัสผ่านของทุกบัญชีที่สร้าง')
+
+    def handle(self, *args, **options):
+        if Student.objects.filter(student_code__startswith=MOCK_CODE_PREFIX).exists():
+            raise CommandError("มีข้อมูลจำลองอยู่แล้ว ให้ล้างฐานข้อมูลก่อน (python manage.py flush)")
+
+        started = time.monotonic()
+        self.rng = random.Random(options['seed'])
+        fake = Faker(['th_TH'])
+        fake.seed_instance(options['seed'])
+
+        # สุ่มชื่อไว้เป็นชุดเดียวแล้วหยิบซ้ำ (เรียก Faker ทีละแถว 100k ครั้งช้าเกินไป)
+        self.first_names = [fake.first_name() for _ in range(300)]
+        self.last_names = [fake.last_name() for _ in range(300)]
+        # hash รหัสผ่านครั้งเดียว ใช้ร่วมกันทุกบัญชี (make_password ทีละคนคือส่วนที่ช้าที่สุดของสคริปต์เดิม)
+        self.password = make_password(options['password'])
+
+        self.today = date.today()
+        self.current_year = current_academic_year()
+        self.years = [self.current_year - offset for offset in range(options['years'])]
+        self.options = options
+        self.counts = dict.fromkeys(['students', 'companies', 'trainings', 'jobs', 'reports', 'evaluations'], 0)
+
+        with transaction.atomic():
+            User.objects.get_or_create(
+                username='teacher',
+                defaults={'password': self.password, 'first_name': 'สมศรี', 'last_name': 'ใจดี', 'role': User.Role.TEACHER},
+            )
+            companies = self.create_companies(fake, options['companies'])
+
+            batch_size = options['batch_size']
+            for offset in range(0, options['students'], batch_size):
+                self.create_student_batch(offset, min(batch_size, options['students'] - offset), companies)
+                done = min(offset + batch_size, options['students'])
+                self.stdout.write(f"  นักศึกษา {done:,}/{options['students']:,}", ending='\r')
+            self.stdout.write('')
+
+        # bulk_create ไม่ส่ง signals จึงต้องสร้างตารางสรุปความก้าวหน้าเองครั้งเดียวตอนท้าย
+        rebuild_all_progress(batch_size=batch_size)
+
+        elapsed = time.monotonic() - started
+        summary = ', '.join(f'{name} {count:,}' for name, count in self.counts.items())
+        self.stdout.write(self.style.SUCCESS(f'เสร็จสิ้น! {summary} ใน {elapsed:.1f} วินาที'))
+
+    def create_companies(self, fake, count):
+        companies = CompanyMaster.objects.bulk_create([
+            CompanyMaster(
+                name=f"{fake.company()} {self.rng.choice(COMPANY_SUFFIXES)} #{index}",
+                address=fake.address(),
+                phone=fake.phone_number()[:20],
+            )
+            for index in range(1, count + 1)
+        ], batch_size=self.options['batch_size'])
+
+        # บัญชีพี่เลี้ยง 1 บัญชีต่อบริษัทต่อปีการศึกษา
+        accounts = [(company, year) for company in companies for year in self.years]
+        users = User.objects.bulk_create([
+            User(username=f"company_{company.pk}_{year}", password=self.password, role=User.Role.COMPANY)
+            for company, year in accounts
+        ], batch_size=self.options['batch_size'])
+        CompanyProfile.objects.bulk_create([
+            CompanyProfile(user=user, company=company, academic_year=year, position="HR / ผู้ดูแล")
+            for user, (company, year) in zip(users, accounts)
+        ], batch_size=self.options['batch_size'])
+
+        self.counts['companies'] += len(companies)
+        return companies
+
+    def create_student_batch(self, offset, count, companies):
+        rng = self.rng
+        codes = [f"{MOCK_CODE_PREFIX}{offset + index:07d}" for index in range(count)]
+        names = [(rng.choice(self.first_names), rng.choice(self.last_names)) for _ in codes]
+
+        users = User.objects.bulk_create([
+            User(username=code, password=self.password, first_name=first, last_name=last, role=User.Role.STUDENT)
+            for code, (first, last) in zip(codes, names)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=user, student_code=code, firstname=first, lastname=last,
+                    major=rng.choice(MAJORS), gpa=round(rng.uniform(2.0, 4.0), 2))
+            for user, code, (first, last) in zip(users, codes, names)
+        ])
+
+        trainings, jobs = [], []
+        for student in students:
+            for _ in range(rng.randint(1, 4)):
+                status = rng.choice(['APPROVED', 'APPROVED', 'PENDING', 'REJECTED'])
+                hours = rng.randint(3, 12)
+                trainings.append(TrainingRecord(
+                    student=student, topic=rng.choice(TRAINING_TOPICS), hours=hours,
+                    get_hours=hours if status == 'APPROVED' else 0, status=status,
+                    date=self.today - timedelta(days=rng.randint(0, 365 * len(self.years))),
+                    proof_file='mock/proof.pdf',
+                ))
+            # นักศึกษาราว 80% มีใบสมัครงาน กระจายตามปีการศึกษา
+            if rng.random() < 0.8:
+                jobs.append(self.build_job(student, rng.choice(companies), rng.choice(self.years)))
+
+        TrainingRecord.objects.bulk_create(trainings)
+        JobApplication.objects.bulk_create(jobs)
+
+        reports, evaluations = [], []
+        for job in jobs:
+            if job.status not in ('APPROVED', 'COMPLETED'):
+                continue
+            weeks = self.options['reports'] if job.status == 'COMPLETED' else rng.randint(0, self.options['reports'])
+            for week in range(1, weeks + 1):
+                reports.append(WeeklyReport(
+                    job_application=job, week_number=week,
+                    work_summary=f"สัปดาห์ที่ {week}: พัฒนาระบบตามที่ได้รับมอบหมาย ({job.position})",
+                    problems=rng.choice(["", "ยังไม่ชินกับเครื่องมือ", "งานเยอะช่วงปลายสัปดาห์"]),
+                    knowledge_gained=rng.choice(["Django ORM", "SQL", "Docker", "การทำงานเป็นทีม"]),
+                    status='ACKNOWLEDGED' if job.status == 'COMPLETED' or rng.random() < 0.7 else 'PENDING',
+                ))
+            if rng.random() < self.options['evaluations']:
+                evaluation = Evaluation(
+                    job_application=job,
+                    status='APPROVED' if job.status == 'COMPLETED' else rng.choice(['DRAFT', 'SUBMITTED']),
+                    strengths="เรียนรู้งานไว ขยัน", weaknesses="ควรกล้าถามมากขึ้น",
+                    **{question: rng.randint(2, 5) for question in EVALUATION_QUESTIONS},
+                )
+                evaluation.calculate_total()  # bulk_create ไม่เรียก save()
+                evaluations.append(evaluation)
+
+        WeeklyReport.objects.bulk_create(reports, batch_size=self.options['batch_size'])
+        Evaluation.objects.bulk_create(evaluations)
+
+        for key, created in [('students', students), ('trainings', trainings), ('jobs', jobs),
+                             ('reports', reports), ('evaluations', evaluations)]:
+            self.counts[key] += len(created)
+
+    def build_job(self, student, company, year):
+        rng = self.rng
+        # ปีการศึกษา (พ.ศ.) -> ฝึกช่วง มิ.ย.-ก.ย. ของปี ค.ศ. เดียวกัน
+        start_date = date(year - 543, rng.randint(6, 7), 1)
+        if year == self.current_year:
+            status = rng.choice(['PENDING', 'APPROVED', 'APPROVED', 'APPROVED', 'REJECTED'])
+        else:
+            status = rng.choice(['COMPLETED', 'COMPLETED', 'COMPLETED', 'CANCELLED'])
+        return JobApplication(
+            student=student, company=company, position=rng.choice(POSITIONS),
+            start_date=start_date, end_date=start_date + timedelta(days=120),
+            academic_year=year,  # bulk_create ไม่เรียก save() ที่คำนวณปีการศึกษา
+            status=status, supervisor_name=f"พี่เลี้ยง {rng.choice(self.first_names)}",
+            supervisor_phone=f"08{rng.randint(10000000, 99999999)}",
+        )
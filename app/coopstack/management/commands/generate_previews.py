@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from coopstack.previews import PREVIEW_FIELDS, generate_preview, preview_model
+
+
+class Command(BaseCommand):
+    help = 'Create missing previews (thumbnail / first PDF page) for training proofs and announcement attachments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='สร้างใหม่ทั้งหมด แม้มีภาพตัวอย่างอยู่แล้ว')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = skipped = 0
+
+        for label, (source_field, preview_field) in PREVIEW_FIELDS.items():
+            queryset = preview_model(label).objects.exclude(**{source_field: ''}).exclude(**{f'{source_field}__isnull': True})
+            if not options['force']:
+                queryset = queryset.filter(**{preview_field: ''})
+
+            for instance in queryset.iterator(chunk_size=200):
+                try:
+                    made = generate_preview(instance)
+                except Exception as error:  # ไฟล์หาย/เสีย ไม่ให้หยุดทั้งรอบ
+                    self.stderr.write(f"{label} #{instance.pk}: {error}")
+                    made = False
+                if made:
+                    created += 1
+                else:
+                    skipped += 1
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'เสร็จสิ้น! สร้างภาพตัวอย่าง {created} ไฟล์ (ข้าม {skipped}) ใน {elapsed:.1f} วินาที'
+        ))
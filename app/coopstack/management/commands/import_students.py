@@ -1,73 +1,117 @@
 import csv
+import io
 import os
-from django.core.management.base import BaseCommand
+import sys
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from coopstack.models import AllowedStudent 
+from django.db import transaction
+from coopstack.models import AllowedStudent
 
-class Command(BaseCommand):
-    help = 'Import data from Dataname.csv to AllowedStudent model'
+# รายการคำนำหน้าที่ต้องการตรวจสอบเพื่อแยกออกจากชื่อ
+PREFIXES = ['นาย', 'นางสาว', 'นาง', 'ว่าที่ร้อยตรี', 'ดร.', 'ผศ.', 'รศ.']
 
-    def handle(self, *args, **kwargs):
-        # ระบุตำแหน่งไฟล์ CSV (สมมติว่าอยู่ที่ Root ของโปรเจกต์)
-        file_path = os.path.join(settings.BASE_DIR, 'Dataname.csv')
+# ใส่ค่า Default สาขาไว้ก่อน (เนื่องจากใน CSV ไม่มี)
+DEFAULT_MAJOR = "วิทยาการข้อมูลและนวัตกรรมซอฟต์แวร์"
 
-        if not os.path.exists(file_path):
-            self.stdout.write(self.style.ERROR(f'ไม่พบไฟล์: {file_path}'))
-            return
+UPDATE_FIELDS = ['title', 'firstname', 'lastname', 'major']
+
+
+def split_thai_name(full_name_str):
+    """ แยก "นายสมชาย ใจดี" -> ("นาย", "สมชาย", "ใจดี") """
+    # 1. แยก นามสกุล ออกจาก ชื่อรวมคำนำหน้า (แยกด้วยช่องว่าง)
+    parts = full_name_str.split(maxsplit=1)
+    name_with_title = parts[0] if parts else ""  # เช่น "นายสมชาย"
+    lastname = parts[1] if len(parts) > 1 else ""  # เช่น "ใจดี"
+
+    # 2. แยก คำนำหน้า ออกจาก ชื่อจริง
+    for prefix in PREFIXES:
+        if name_with_title.startswith(prefix):
+            return prefix, name_with_title[len(prefix):], lastname
+    return "", name_with_title, lastname
+
+
+class Command(BaseCommand):
+    help = 'Import students (CSV columns: ID, Name) into the AllowedStudent model using bulk inserts/updates'
 
-        # รายการคำนำหน้าที่ต้องการตรวจสอบเพื่อแยกออกจากชื่อ
-        prefixes = ['นาย', 'นางสาว', 'นาง', 'ว่าที่ร้อยตรี', 'ดร.', 'ผศ.', 'รศ.']
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file', nargs='?', default=os.path.join(settings.BASE_DIR, 'Dataname.csv'),
+            help='ไฟล์ CSV (ใช้ - เพื่ออ่านจาก stdin) ค่าเริ่มต้น BASE_DIR/Dataname.csv'
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='จำนวนแถวต่อรอบการบันทึก')
+        parser.add_argument('--major', default=DEFAULT_MAJOR, help='สาขาวิชาที่ใส่ให้ทุกคน')
+        parser.add_argument('--dry-run', action='store_true', help='ตรวจสอบและนับอย่างเดียว ไม่บันทึกลงฐานข้อมูล')
 
-        count_created = 0
-        count_updated = 0
+    def handle(self, *args, **options):
+        file_path = options['file']
+        if file_path == '-':
+            f = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig')
+        elif os.path.exists(file_path):
+            f = open(file_path, 'r', encoding='utf-8-sig')
+        else:
+            raise CommandError(f'ไม่พบไฟล์: {file_path}')
 
         self.stdout.write("กำลังเริ่มนำเข้าข้อมูล...")
+        started = time.monotonic()
+        self.major = options['major']
+        self.counts = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': 0}
 
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
+        # ดึงรหัสที่มีอยู่แล้วทั้งหมดใน Query เดียว แล้ว diff ในหน่วยความจำ
+        self.existing = {
+            student.student_code: student
+            for student in AllowedStudent.objects.only('id', 'student_code', *UPDATE_FIELDS)
+        }
+
+        with f, transaction.atomic():
             reader = csv.DictReader(f)
-            
-            for row in reader:
-                try:
-                    student_code = row['ID'].strip()
-                    full_name_str = row['Name'].strip()
-
-                    # 1. แยก นามสกุล ออกจาก ชื่อรวมคำนำหน้า (แยกด้วยช่องว่าง)
-                    parts = full_name_str.split(maxsplit=1)
-                    name_with_title = parts[0]  # เช่น "นายสมชาย"
-                    lastname = parts[1] if len(parts) > 1 else "" # เช่น "ใจดี"
-
-                    # 2. แยก คำนำหน้า ออกจาก ชื่อจริง
-                    title = ""
-                    firstname = name_with_title
-
-                    for prefix in prefixes:
-                        if name_with_title.startswith(prefix):
-                            title = prefix
-                            # ตัดคำนำหน้าออก เหลือแค่ชื่อ
-                            firstname = name_with_title[len(prefix):] 
-                            break
-                    
-                    # 3. บันทึกลง Database
-                    # ใช้ update_or_create เพื่อป้องกันข้อมูลซ้ำ (เช็คจาก student_code)
-                    obj, created = AllowedStudent.objects.update_or_create(
-                        student_code=student_code,
-                        defaults={
-                            'title': title,
-                            'firstname': firstname,
-                            'lastname': lastname,
-                            # ใส่ค่า Default สาขาไว้ก่อน (เนื่องจากใน CSV ไม่มี)
-                            'major': "วิทยาการข้อมูลและนวัตกรรมซอฟต์แวร์", 
-                        }
-                    )
-
-                    if created:
-                        count_created += 1
-                    else:
-                        count_updated += 1
-
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Error row {row.get('ID')}: {e}"))
+            while True:
+                chunk = list(islice(reader, options['chunk_size']))
+                if not chunk:
+                    break
+                self.import_chunk(chunk, options['chunk_size'], options['dry_run'])
 
+        elapsed = time.monotonic() - started
+        rate = self.counts['rows'] / elapsed if elapsed else 0
+        prefix = '[dry-run] ' if options['dry_run'] else ''
         self.stdout.write(self.style.SUCCESS(
-            f'เสร็จสิ้น! สร้างใหม่: {count_created} คน, อัปเดต: {count_updated} คน'
-        ))
\ No newline at end of file
+            f"{prefix}เสร็จสิ้น! สร้างใหม่: {self.counts['created']} คน, อัปเดต: {self.counts['updated']} คน, "
+            f"ไม่เปลี่ยนแปลง: {self.counts['unchanged']} คน, ผิดพลาด: {self.counts['errors']} แถว "
+            f"({self.counts['rows']} แถว ใน {elapsed:.1f} วินาที, {rate:.0f} แถว/วินาที)"
+        ))
+
+    def import_chunk(self, rows, batch_size, dry_run):
+        to_create, to_update = {}, {}
+
+        for row in rows:
+            self.counts['rows'] += 1
+            student_code = (row.get('ID') or '').strip()
+            if not student_code:
+                self.counts['errors'] += 1
+                self.stdout.write(self.style.ERROR(f"Error row {self.counts['rows']}: ไม่มีรหัสนักศึกษา"))
+                continue
+
+            title, firstname, lastname = split_thai_name((row.get('Name') or '').strip())
+            values = {'title': title, 'firstname': firstname, 'lastname': lastname, 'major': self.major}
+
+            student = self.existing.get(student_code)
+            if student is None:
+                student = self.existing[student_code] = AllowedStudent(student_code=student_code, **values)
+                to_create[student_code] = student
+            elif all(getattr(student, field) == value for field, value in values.items()):
+                self.counts['unchanged'] += 1
+            else:
+                for field, value in values.items():
+                    setattr(student, field, value)
+                if student_code not in to_create:
+                    to_update[student_code] = student
+
+        self.counts['created'] += len(to_create)
+        self.counts['updated'] += len(to_update)
+        if dry_run:
+            return
+
+        # บันทึกทั้งก้อนด้วย INSERT/UPDATE แบบ bulk (อยู่ใน transaction เดียวกับทั้งไฟล์)
+        AllowedStudent.objects.bulk_create(to_create.values(), batch_size=batch_size)
+        AllowedStudent.objects.bulk_update(to_update.values(), UPDATE_FIELDS, batch_size=batch_size)
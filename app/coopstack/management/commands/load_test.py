@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from coopstack.loadtest import LoadTest
+
+
+def parse_mix(value):
+    """ "student=70,teacher=10,company=20" -> {'student': 70, 'teacher': 10, 'company': 20} """
+    mix = {}
+    for part in value.split(','):
+        role, _, weight = part.partition('=')
+        if role.strip() not in ('student', 'teacher', 'company') or not weight.strip().isdigit():
+            raise CommandError(f"รูปแบบ --mix ไม่ถูกต้อง: {part}")
+        mix[role.strip()] = int(weight)
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay role-based traffic (student/teacher/company pages and HTMX partials) against a running server '
+        'and report throughput and p50/p95/p99 latency per endpoint. '
+        'Run it inside the web container so accounts and ids are sampled from the same database. '
+        'Against the docker-compose stack go through nginx over HTTPS (port 80 only redirects to HTTPS) and send a '
+        'Host that is in ALLOWED_HOSTS; --insecure skips verifying the mkcert certificate, e.g. '
+        '"docker compose exec web python manage.py load_test --base-url https://nginx --host localhost --insecure '
+        '--users 200"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000', help='URL ของเซิร์ฟเวอร์ที่จะทดสอบ')
+        parser.add_argument('--host', help='Host header ที่ส่งไป (ต้องอยู่ใน ALLOWED_HOSTS) ค่าเริ่มต้นคือชื่อใน --base-url')
+        parser.add_argument('--insecure', action='store_true', help='ไม่ตรวจ TLS certificate (เช่น cert ของ mkcert)')
+        parser.add_argument('--users', type=int, default=20, help='จำนวนผู้ใช้จำลองพร้อมกัน')
+        parser.add_argument('--duration', type=int, default=60, help='ระยะเวลายิงโหลด (วินาที) หลัง ramp-up')
+        parser.add_argument('--ramp-up', type=int, default=10, help='ทยอยปล่อยผู้ใช้จนครบภายในกี่วินาที')
+        parser.add_argument('--think-time', type=float, default=0.5, help='เวลาคิดเฉลี่ยระหว่างคลิก (วินาที)')
+        parser.add_argument('--mix', type=parse_mix, default='student=70,teacher=10,company=20',
+                            help='สัดส่วนบทบาทของผู้ใช้จำลอง')
+        parser.add_argument('--password', default='password123', help='รหัสผ่านของบัญชีทดสอบ (generate_mock_data)')
+        parser.add_argument('--timeout', type=int, default=30, help='timeout ต่อ request (วินาที)')
+        parser.add_argument('--seed', type=int, default=1, help='seed ของการสุ่มผู้ใช้/ขั้นตอน')
+
+    def handle(self, *args, **options):
+        load_test = LoadTest(
+            base_url=options['base_url'], users=options['users'], duration=options['duration'],
+            mix=options['mix'], password=options['password'], think_time=options['think_time'],
+            ramp_up=options['ramp_up'], timeout=options['timeout'], seed=options['seed'],
+            host=options['host'], insecure=options['insecure'],
+        )
+        self.stdout.write(
+            f"กำลังยิงโหลด {options['base_url']} ด้วยผู้ใช้ {options['users']} คน "
+            f"นาน {options['ramp_up'] + options['duration']} วินาที..."
+        )
+        try:
+            rows = load_test.run()
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        header = f"{'endpoint':<42} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, count, errors, rps, p50, p95, p99, slowest in rows:
+            line = f"{label:<42} {count:>7} {errors:>5} {rps:>8.1f} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f} {slowest:>8.0f}"
+            self.stdout.write(self.style.ERROR(line) if errors else line)
+
+        total = sum(row[1] for row in rows)
+        total_errors = sum(row[2] for row in rows)
+        self.stdout.write(self.style.SUCCESS(
+            f"รวม {total} requests ใน {load_test.elapsed:.1f} วินาที "
+            f"({total / load_test.elapsed:.1f} req/s), error {total_errors} (เวลาเป็นมิลลิวินาที)"
+        ))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from coopstack.progress import rebuild_all_progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the StudentProgress summary table from training, job, report and evaluation data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='จำนวนนักศึกษาต่อรอบการบันทึก')
+
+    def handle(self, *args, **options):
+        self.stdout.write("กำลังคำนวณความก้าวหน้านักศึกษาใหม่ทั้งหมด...")
+        started = time.monotonic()
+
+        total = rebuild_all_progress(batch_size=options['batch_size'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'เสร็จสิ้น! อัปเดต {total} คน ใน {elapsed:.1f} วินาที'
+        ))
@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from coopstack.tasks import HEARTBEAT_INTERVAL, claim_next_task, reclaim_stale_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = 'Process queued BackgroundTask rows (document generation, bulk jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sleep', type=float, default=2.0, help='วินาทีที่รอเมื่อไม่มีงานในคิว')
+        parser.add_argument('--once', action='store_true', help='ทำงานที่ค้างในคิวให้หมดแล้วออก')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Worker เริ่มทำงาน...")
+        last_reclaim = None
+        while True:
+            close_old_connections()
+            # งานที่ worker ตัวอื่นถือค้างไว้ (ตาย/ถูก kill) กลับเข้าคิว
+            if last_reclaim is None or time.monotonic() - last_reclaim >= HEARTBEAT_INTERVAL:
+                requeued, failed = reclaim_stale_tasks()
+                last_reclaim = time.monotonic()
+                if requeued or failed:
+                    self.stdout.write(self.style.WARNING(f"งานค้าง: กลับเข้าคิว {requeued}, ล้มเหลว {failed}"))
+            task = claim_next_task()
+            if task is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            started = time.monotonic()
+            task = run_task(task)
+            style = self.style.SUCCESS if task.status == task.Status.DONE else self.style.ERROR
+            self.stdout.write(style(
+                f"{task.task_name} #{task.pk}: {task.get_status_display()} ({time.monotonic() - started:.2f} วินาที)"
+            ))
@@ -0,0 +1,55 @@
+"""
+ส่งไฟล์ที่ผู้ใช้อัปโหลด (MEDIA_ROOT) หลัง view ตรวจสิทธิ์แล้ว
+
+- production: ตั้ง MEDIA_ACCEL_REDIRECT (เช่น /protected-media/) Django ตอบกลับแค่ header X-Accel-Redirect
+  แล้ว nginx ส่งไฟล์เองจาก location ที่เป็น internal ด้วย sendfile (ไม่มี Python อยู่ในเส้นทางข้อมูล
+  และไม่กิน gunicorn worker ระหว่างดาวน์โหลด) ดู nginx/default.conf
+- dev/test (ไม่ได้ตั้งค่า): ส่งไฟล์ผ่าน FileResponse ของ Django แทน
+
+เปิดในเบราว์เซอร์ (inline) ได้เฉพาะ PDF/รูปภาพใน INLINE_TYPES ไฟล์อื่น (เช่น .html / .svg ที่นักศึกษาอัปโหลด)
+บังคับดาวน์โหลดเป็น application/octet-stream เสมอ และทุกไฟล์มี nosniff + CSP sandbox
+สคริปต์ในไฟล์อัปโหลดจึงไม่รันใน session ของอาจารย์ที่เปิดดู
+"""
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import content_disposition_header
+
+
+# นามสกุลที่เปิดดูในเบราว์เซอร์ได้ (ต้องตรงกับ types ใน location /protected-media/ ของ nginx/default.conf)
+INLINE_TYPES = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+
+def serve_media(fieldfile, as_attachment=False, filename=None):
+    """ คืน response ของไฟล์ใน FileField (เรียกหลังตรวจสิทธิ์แล้วเท่านั้น) """
+    if not fieldfile:
+        raise Http404("ไม่พบไฟล์")
+    filename = filename or os.path.basename(fieldfile.name)
+
+    content_type = INLINE_TYPES.get(os.path.splitext(fieldfile.name)[1].lower())
+    if content_type is None:
+        content_type, as_attachment = 'application/octet-stream', True
+
+    prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT', '')
+    if prefix:
+        response = HttpResponse(content_type=content_type)
+        # nginx ถอด %xx ก่อนหาไฟล์ จึงรองรับชื่อไฟล์ภาษาไทยได้
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(fieldfile.name)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        # ไฟล์ส่วนตัว: ห้าม proxy/CDN กลางทาง cache ไว้
+        response['Cache-Control'] = 'private, max-age=3600'
+    else:
+        response = FileResponse(fieldfile.open('rb'), as_attachment=as_attachment, filename=filename,
+                                content_type=content_type)
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Content-Security-Policy'] = 'sandbox'
+    return response
@@ -0,0 +1,107 @@
+"""
+Prometheus metrics ของระบบ (ดึงผ่าน /metrics)
+
+- ตัวเลขต่อ request ถูกบันทึกโดย PerformanceMiddleware (coopstack.instrumentation) -> observe_request()
+- หลาย gunicorn worker: ตั้ง env PROMETHEUS_MULTIPROC_DIR ก่อนเริ่ม process แล้วแต่ละ worker จะเขียนค่าลงไฟล์
+  ของตัวเอง /metrics รวมค่าจากทุกไฟล์ให้ (ดู gunicorn.conf.py ที่ล้างไฟล์รอบก่อนและลบ worker ที่ตายแล้ว)
+- container worker (run_worker) ใช้โฟลเดอร์เดียวกันผ่าน volume ที่แชร์กับ web (docker-compose.yml)
+  เวลา render แบบฟอร์มในงานเบื้องหลังจึงออกที่ /metrics ของ web ด้วย ชื่อไฟล์ใช้ hostname + pid
+  เพราะ pid ของแต่ละ container เริ่มนับใหม่ (pid ชนกันได้)
+- จำนวนงานค้างตรวจอ่านจากฐานข้อมูลตอนถูก scrape (ไม่ขึ้นกับ worker)
+"""
+import os
+import socket
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess, values,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .models import TrainingRecord, JobApplication, WeeklyReport, Evaluation, BackgroundTask
+
+
+
+def process_identifier():
+    """ ส่วนท้ายชื่อไฟล์ metrics ของ process นี้ (ไม่มี _ เพราะ prometheus_client แยกชื่อไฟล์ด้วย _) """
+    return f"{socket.gethostname().replace('_', '-')}-{os.getpid()}"
+
+
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    # ต้องตั้งก่อนสร้าง metric ตัวแรก
+    values.ValueClass = values.MultiProcessValue(process_identifier)
+
+REQUEST_LATENCY = Histogram(
+    'coop_http_request_duration_seconds', 'เวลาตอบ request ต่อ URL name', ['view', 'method'],
+)
+RESPONSES = Counter(
+    'coop_http_responses_total', 'จำนวน response แยกตาม status code', ['view', 'status'],
+)
+DB_QUERIES = Counter(
+    'coop_db_queries_total', 'จำนวน SQL query ที่ request ยิง', ['view'],
+)
+DB_DURATION = Histogram(
+    'coop_db_duration_seconds', 'เวลา DB รวมต่อ request', ['view'],
+)
+UPLOAD_SIZE = Histogram(
+    'coop_upload_size_bytes', 'ขนาดไฟล์ที่อัปโหลด', ['view'],
+    buckets=(10_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 25_000_000),
+)
+DOCX_RENDER = Histogram(
+    'coop_docx_render_seconds', 'เวลา render แบบฟอร์มสหกิจ (.docx) ที่ไม่ได้มาจาก cache',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+DOCX_REQUESTS = Counter(
+    'coop_docx_requests_total', 'จำนวนครั้งที่ขอแบบฟอร์มสหกิจ แยก cache hit/miss', ['cache'],
+)
+FRAGMENT_REQUESTS = Counter(
+    'coop_fragment_cache_requests_total', 'จำนวนครั้งที่ขอ HTMX partial แยก cache hit/miss', ['fragment', 'cache'],
+)
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+def observe_request(request, response, view_name, duration, queries, db_time):
+    view = view_name or UNRESOLVED_VIEW
+    REQUEST_LATENCY.labels(view, request.method).observe(duration)
+    RESPONSES.labels(view, str(response.status_code)).inc()
+    DB_QUERIES.labels(view).inc(queries)
+    DB_DURATION.labels(view).observe(db_time)
+    # นับเฉพาะ request ที่ view อ่าน request.FILES ไปแล้ว (ไม่บังคับ parse body เพิ่ม)
+    if '_files' in request.__dict__:
+        for _field, files in request.FILES.lists():
+            for uploaded in files:
+                UPLOAD_SIZE.labels(view).observe(uploaded.size)
+
+
+class PendingQueueCollector:
+    """ จำนวนรายการที่ค้างรอตรวจ (คำนวณตอน scrape) """
+
+    QUEUES = {
+        'training': (TrainingRecord, {'status': 'PENDING'}),
+        'jobs': (JobApplication, {'status': 'PENDING'}),
+        'reports': (WeeklyReport, {'status': 'PENDING'}),
+        'evaluations': (Evaluation, {'status': 'SUBMITTED'}),
+        'background_tasks': (BackgroundTask, {'status': BackgroundTask.Status.QUEUED}),
+    }
+
+    def describe(self):
+        return []  # ไม่ให้ registry เรียก collect() (ยิง query) ตอน register
+
+    def collect(self):
+        gauge = GaugeMetricFamily('coop_pending_items', 'รายการที่รอดำเนินการ', labels=['queue'])
+        for name, (model, filters) in self.QUEUES.items():
+            gauge.add_metric([name], model.objects.filter(**filters).count())
+        yield gauge
+
+
+def render_metrics():
+    """ ข้อความรูปแบบ Prometheus text exposition ของทุก metric """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    pending = CollectorRegistry()
+    pending.register(PendingQueueCollector())
+    return generate_latest(registry) + generate_latest(pending)
@@ -0,0 +1,41 @@
+"""
+middleware ที่รองรับทั้ง WSGI และ ASGI
+
+เมื่อรันด้วย uvicorn worker (coopV2/asgi.py) ถ้ามี middleware ตัวใดเป็น sync อย่างเดียว Django ต้องสลับ
+event loop <-> thread ให้ทุก request ก่อนถึง view แบบ async ทำให้เสียประโยชน์ไป middleware ในลิสต์
+MIDDLEWARE จึงต้องเป็น async-capable ทั้งหมด (ของ Django เองเป็นอยู่แล้ว)
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware ที่ใช้ใน event loop ได้
+    production ให้ nginx ส่ง /static/ เอง request ที่มาถึงนี่จึงเหลือแค่การหา path ใน dict (ไม่ blocking)
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    def find_static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    async def __acall__(self, request):
+        static_file = self.find_static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0013_allowedstudent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('training_hours', models.PositiveIntegerField(default=0, verbose_name='ชั่วโมงอบรมที่ได้รับ')),
+                ('job_status', models.CharField(blank=True, choices=[('PENDING', 'รออนุมัติ'), ('APPROVED', 'กำลังฝึกงาน'), ('REJECTED', 'ไม่อนุมัติ'), ('COMPLETED', 'ฝึกงานเสร็จสิ้น'), ('CANCELLED', 'ยกเลิกโดยนักศึกษา')], max_length=10, verbose_name='สถานะใบสมัครล่าสุด')),
+                ('academic_year', models.IntegerField(blank=True, null=True, verbose_name='ปีการศึกษา')),
+                ('current_week', models.IntegerField(default=0, verbose_name='สัปดาห์ล่าสุดที่ส่ง')),
+                ('report_count', models.IntegerField(default=0, verbose_name='จำนวนรายงานที่ส่ง')),
+                ('acknowledged_reports', models.IntegerField(default=0, verbose_name='จำนวนรายงานที่ตรวจแล้ว')),
+                ('evaluation_status', models.CharField(blank=True, max_length=20, verbose_name='สถานะการประเมิน')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('current_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='coopstack.jobapplication', verbose_name='งานที่ติดตามผล')),
+                ('latest_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='coopstack.jobapplication', verbose_name='ใบสมัครล่าสุด')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='coopstack.student')),
+            ],
+            options={
+                'verbose_name': 'ความก้าวหน้านักศึกษา',
+                'verbose_name_plural': 'ความก้าวหน้านักศึกษา',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0014_studentprogress'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['student', 'status'], name='job_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['company', 'status', 'academic_year'], name='job_company_status_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['status', '-created_at'], name='job_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trainingrecord',
+            index=models.Index(fields=['student', 'status'], name='training_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trainingrecord',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['-date'], name='training_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyreport',
+            index=models.Index(fields=['job_application', 'status', 'week_number'], name='report_job_status_week_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyreport',
+            index=models.Index(fields=['-submitted_at'], name='report_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyreport',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['-submitted_at'], name='report_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# (table, column) ที่ใช้ค้นหาบ่อย -> GIN index แบบ gin_trgm_ops (เฉพาะ PostgreSQL)
+# index บน UPPER(column) เพราะ icontains ของ Django บน PostgreSQL สร้างเป็น UPPER(col) LIKE UPPER(...)
+# pg_trgm แยก trigram ตาม LC_CTYPE ของฐานข้อมูล: ต้องเป็น UTF-8 (เช่น en_US.utf8 ค่าเริ่มต้นของ image postgres) ไม่ใช่ C
+# คำค้นภาษาไทยไม่ใช้ similarity (ดู search.has_trigram_letters) ส่วน LIKE ที่แยก trigram ไม่ได้จะ recheck ทุกแถว (ช้าแต่ผลถูก)
+TRIGRAM_INDEXES = [
+    ('coopstack_student', 'student_code'),
+    ('coopstack_student', 'firstname'),
+    ('coopstack_student', 'lastname'),
+    ('coopstack_companymaster', 'name'),
+    ('coopstack_companymaster', 'teacher_notes'),
+    ('coopstack_trainingrecord', 'topic'),
+    ('coopstack_weeklyreport', 'work_summary'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_{column}_trgm" ON "{table}" USING gin (UPPER("{column}") gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0015_hot_path_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:54
+
+import coopstack.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0016_trigram_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(max_length=50, verbose_name='ชื่องาน')),
+                ('arguments', models.JSONField(blank=True, default=dict, verbose_name='พารามิเตอร์')),
+                ('status', models.CharField(choices=[('QUEUED', 'รอคิว'), ('RUNNING', 'กำลังทำงาน'), ('DONE', 'เสร็จสิ้น'), ('FAILED', 'ผิดพลาด')], default='QUEUED', max_length=10, verbose_name='สถานะ')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='ความคืบหน้า (%)')),
+                ('message', models.CharField(blank=True, max_length=255, verbose_name='ข้อความ')),
+                ('result_file', models.FileField(blank=True, upload_to=coopstack.models.task_result_path, verbose_name='ไฟล์ผลลัพธ์')),
+                ('error', models.TextField(blank=True, verbose_name='รายละเอียดข้อผิดพลาด')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='background_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'งานเบื้องหลัง',
+                'verbose_name_plural': 'งานเบื้องหลัง',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'QUEUED')), fields=['created_at'], name='task_queued_idx')],
+            },
+        ),
+    ]
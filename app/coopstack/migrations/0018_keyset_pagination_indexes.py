@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0017_backgroundtask'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='weeklyreport',
+            name='report_submitted_idx',
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['-created_at', '-id'], name='job_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trainingrecord',
+            index=models.Index(fields=['-date', '-id'], name='training_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyreport',
+            index=models.Index(fields=['-submitted_at', '-id'], name='report_submitted_id_idx'),
+        ),
+    ]
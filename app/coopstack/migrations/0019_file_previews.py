@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:44
+
+import coopstack.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0018_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='attachment_preview',
+            field=models.FileField(blank=True, editable=False, upload_to=coopstack.models.announcement_preview_path, verbose_name='ภาพตัวอย่างไฟล์แนบ'),
+        ),
+        migrations.AddField(
+            model_name='trainingrecord',
+            name='proof_preview',
+            field=models.FileField(blank=True, editable=False, upload_to=coopstack.models.training_preview_path, verbose_name='ภาพตัวอย่างหลักฐาน'),
+        ),
+    ]
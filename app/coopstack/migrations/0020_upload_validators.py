@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-17 23:25
+
+import coopstack.models
+import coopstack.validators
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0019_file_previews'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcement',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, upload_to=coopstack.models.announcement_file_path, validators=[django.core.validators.FileExtensionValidator(['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'jpg', 'jpeg', 'png', 'gif', 'webp']), coopstack.validators.FileContentValidator()], verbose_name='ไฟล์แนบ'),
+        ),
+        migrations.AlterField(
+            model_name='trainingrecord',
+            name='proof_file',
+            field=models.FileField(upload_to=coopstack.models.training_proof_path, validators=[django.core.validators.FileExtensionValidator(['pdf', 'jpg', 'jpeg', 'png', 'gif', 'webp']), coopstack.validators.FileContentValidator()], verbose_name='หลักฐาน (Cert/รูปภาพ)'),
+        ),
+    ]
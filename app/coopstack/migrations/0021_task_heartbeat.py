@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-17 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0020_upload_validators'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundtask',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='จำนวนครั้งที่หยิบไปทำ'),
+        ),
+        migrations.AddField(
+            model_name='backgroundtask',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='backgroundtask',
+            index=models.Index(condition=models.Q(('status', 'RUNNING')), fields=['heartbeat_at'], name='task_running_idx'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+from django.db import migrations
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+# สำเนาของ progress.build_progress ที่ใช้ model ตามสถานะ migration นี้ (apps.get_model)
+# ห้าม import โค้ดจาก coopstack.progress: model ปัจจุบันอาจมี field ที่ตารางยังไม่มีตอน migrate ฐานข้อมูลใหม่
+BATCH_SIZE = 500
+PLACED_STATUSES = ['APPROVED', 'COMPLETED']
+PROGRESS_FIELDS = [
+    'training_hours', 'latest_job', 'job_status', 'academic_year',
+    'current_job', 'current_week', 'report_count', 'acknowledged_reports',
+    'evaluation_status', 'updated_at',
+]
+
+
+def _build_batch(apps, student_ids, now):
+    TrainingRecord = apps.get_model('coopstack', 'TrainingRecord')
+    JobApplication = apps.get_model('coopstack', 'JobApplication')
+    WeeklyReport = apps.get_model('coopstack', 'WeeklyReport')
+    Evaluation = apps.get_model('coopstack', 'Evaluation')
+    StudentProgress = apps.get_model('coopstack', 'StudentProgress')
+
+    hours = dict(
+        TrainingRecord.objects.filter(student_id__in=student_ids, status='APPROVED')
+        .values('student_id').annotate(total=Sum('get_hours')).order_by()
+        .values_list('student_id', 'total')
+    )
+
+    # ใบสมัครล่าสุด / งานที่ติดตาม (เรียงเก่า -> ใหม่ ตัวท้ายสุดชนะ)
+    latest, current = {}, {}
+    jobs = JobApplication.objects.filter(student_id__in=student_ids).order_by('created_at', 'id').values_list(
+        'id', 'student_id', 'status', 'academic_year'
+    )
+    for job in jobs:
+        latest[job[1]] = job
+        if job[2] in PLACED_STATUSES:
+            current[job[1]] = job
+    for student_id, job in latest.items():
+        current.setdefault(student_id, job)
+
+    job_ids = {job[0] for job in current.values()} | {job[0] for job in latest.values()}
+    reports = {
+        row['job_application_id']: row
+        for row in WeeklyReport.objects.filter(job_application_id__in=job_ids)
+        .values('job_application_id').order_by()
+        .annotate(
+            current_week=Max('week_number'),
+            report_count=Count('id'),
+            acknowledged=Count('id', filter=Q(status='ACKNOWLEDGED')),
+        )
+    }
+    evaluations = dict(
+        Evaluation.objects.filter(job_application_id__in=job_ids).values_list('job_application_id', 'status')
+    )
+
+    rows = []
+    for student_id in student_ids:
+        latest_job = latest.get(student_id)
+        current_job = current.get(student_id)
+        latest_report = reports.get(latest_job[0], {}) if latest_job else {}
+        current_report = reports.get(current_job[0], {}) if current_job else {}
+        rows.append(StudentProgress(
+            student_id=student_id,
+            training_hours=hours.get(student_id) or 0,
+            latest_job_id=latest_job[0] if latest_job else None,
+            job_status=latest_job[2] if latest_job else '',
+            academic_year=latest_job[3] if latest_job else None,
+            current_job_id=current_job[0] if current_job else None,
+            current_week=latest_report.get('current_week') or 0,
+            report_count=latest_report.get('report_count', 0),
+            acknowledged_reports=current_report.get('acknowledged', 0),
+            evaluation_status=evaluations.get(current_job[0], '') if current_job else '',
+            updated_at=now,
+        ))
+    return rows
+
+
+def backfill_progress(apps, schema_editor):
+    """ สร้างแถว StudentProgress ของนักศึกษาที่มีอยู่ก่อนตารางนี้ (รันซ้ำได้ แถวเดิมถูกคำนวณทับ) """
+    Student = apps.get_model('coopstack', 'Student')
+    StudentProgress = apps.get_model('coopstack', 'StudentProgress')
+    now = timezone.now()
+
+    student_ids = list(Student.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(student_ids), BATCH_SIZE):
+        StudentProgress.objects.bulk_create(
+            _build_batch(apps, student_ids[start:start + BATCH_SIZE], now),
+            update_conflicts=True,
+            unique_fields=['student'],
+            update_fields=PROGRESS_FIELDS,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coopstack', '0021_task_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop, elidable=True),
+    ]
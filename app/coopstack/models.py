@@ -5,6 +5,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .validators import validate_attachment_extension, validate_file_content, validate_proof_extension
 import os
 import uuid
 import datetime
@@ -20,6 +21,13 @@ def training_proof_path(instance, filename):
 def announcement_file_path(instance, filename):
     return f'uploads/announcements/{filename}'
 
+def training_preview_path(instance, filename):
+    # เก็บข้างไฟล์ต้นฉบับ e.g. uploads/student_6601001/training/cert.preview.jpg (สร้างโดย coopstack/previews.py)
+    return os.path.join(os.path.dirname(instance.proof_file.name), filename)
+
+def announcement_preview_path(instance, filename):
+    return os.path.join(os.path.dirname(instance.attachment.name), filename)
+
 
 # ==========================================
 # 1. Custom User Model (จัดการสิทธิ์)
@@ -95,7 +103,9 @@ class Announcement(models.Model):
     """ ประกาศข่าวสาร """
     title = models.CharField(max_length=200, verbose_name="หัวข้อประกาศ")
     content = models.TextField(verbose_name="เนื้อหา")
-    attachment = models.FileField(upload_to=announcement_file_path, null=True, blank=True, verbose_name="ไฟล์แนบ")
+    attachment = models.FileField(upload_to=announcement_file_path, null=True, blank=True, verbose_name="ไฟล์แนบ",
+                                  validators=[validate_attachment_extension, validate_file_content])
+    attachment_preview = models.FileField(upload_to=announcement_preview_path, blank=True, editable=False, verbose_name="ภาพตัวอย่างไฟล์แนบ")
     is_published = models.BooleanField(default=True, verbose_name="เผยแพร่ทันที")
     is_pinned = models.BooleanField(default=False, verbose_name="ปักหมุดข่าวสำคัญ")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -184,7 +194,9 @@ class TrainingRecord(models.Model):
     date = models.DateField(verbose_name="วันที่อบรม")
     hours = models.IntegerField(verbose_name="จำนวนชั่วโมงที่เคลม")
     get_hours = models.PositiveIntegerField(default=0, verbose_name="จำนวนชั่วโมงที่ได้รับจริง")
-    proof_file = models.FileField(upload_to=training_proof_path, verbose_name="หลักฐาน (Cert/รูปภาพ)")
+    proof_file = models.FileField(upload_to=training_proof_path, verbose_name="หลักฐาน (Cert/รูปภาพ)",
+                                  validators=[validate_proof_extension, validate_file_content])
+    proof_preview = models.FileField(upload_to=training_preview_path, blank=True, editable=False, verbose_name="ภาพตัวอย่างหลักฐาน")
     
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name="สถานะ")
     teacher_comment = models.TextField(blank=True, verbose_name="ความเห็นอาจารย์")
@@ -193,6 +205,14 @@ class TrainingRecord(models.Model):
     class Meta:
         verbose_name = "ประวัติการอบรม"
         verbose_name_plural = "ประวัติการอบรม"
+        indexes = [
+            # ชั่วโมงอบรมต่อนักศึกษา (student + status='APPROVED')
+            models.Index(fields=['student', 'status'], name='training_student_status_idx'),
+            # คิวรอตรวจของอาจารย์
+            models.Index(fields=['-date'], name='training_pending_idx', condition=models.Q(status='PENDING')),
+            # ประวัติการตรวจ (keyset pagination เรียง date, id)
+            models.Index(fields=['-date', '-id'], name='training_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.topic} (ขอ {self.hours} -> ได้ {self.get_hours})"
@@ -242,6 +262,15 @@ class JobApplication(models.Model):
     class Meta:
         verbose_name = "ใบสมัครงาน/การฝึกงาน"
         verbose_name_plural = "ใบสมัครงาน/การฝึกงาน"
+        indexes = [
+            models.Index(fields=['student', 'status'], name='job_student_status_idx'),
+            # รายชื่อ นศ. ของบริษัทต่อปีการศึกษา (หน้าประเมินของบริษัท / สรุปบริษัท)
+            models.Index(fields=['company', 'status', 'academic_year'], name='job_company_status_year_idx'),
+            # คิวรออนุมัติของอาจารย์ (status='PENDING' เรียงตาม created_at)
+            models.Index(fields=['status', '-created_at'], name='job_status_created_idx'),
+            # ประวัติการตรวจ (keyset pagination เรียง created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='job_created_id_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Logic คำนวณปีการศึกษาอัตโนมัติก่อนบันทึก
@@ -286,6 +315,13 @@ class WeeklyReport(models.Model):
         unique_together = ('job_application', 'week_number') # ห้ามส่ง week ซ้ำใน job เดิม
         verbose_name = "รายงานประจำสัปดาห์"
         verbose_name_plural = "รายงานประจำสัปดาห์"
+        indexes = [
+            models.Index(fields=['job_application', 'status', 'week_number'], name='report_job_status_week_idx'),
+            # ประวัติการตรวจ (keyset pagination เรียง submitted_at, id)
+            models.Index(fields=['-submitted_at', '-id'], name='report_submitted_id_idx'),
+            # คิวรอตรวจของอาจารย์
+            models.Index(fields=['-submitted_at'], name='report_pending_idx', condition=models.Q(status='PENDING')),
+        ]
 
     def __str__(self):
         return f"Week {self.week_number} - {self.job_application.student.firstname}"
@@ -356,4 +392,85 @@ class Evaluation(models.Model):
 
     def save(self, *args, **kwargs):
         self.calculate_total()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+# ==========================================
+# 6. Progress Summary (ข้อมูลสรุปความก้าวหน้า)
+# ==========================================
+
+class StudentProgress(models.Model):
+    """ ตารางสรุปความก้าวหน้าต่อนักศึกษา 1 แถว (อัปเดตผ่าน signals ใน coopstack/signals.py) """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='progress')
+    training_hours = models.PositiveIntegerField(default=0, verbose_name="ชั่วโมงอบรมที่ได้รับ")
+
+    # ใบสมัครล่าสุด (ทุกสถานะ) และรายงานของใบสมัครนี้ (dashboard นักศึกษา / ตารางรายชื่อของอาจารย์)
+    latest_job = models.ForeignKey(JobApplication, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="ใบสมัครล่าสุด")
+    job_status = models.CharField(max_length=10, choices=JobApplication.Status.choices, blank=True, verbose_name="สถานะใบสมัครล่าสุด")
+    academic_year = models.IntegerField(null=True, blank=True, verbose_name="ปีการศึกษา")
+    current_week = models.IntegerField(default=0, verbose_name="สัปดาห์ล่าสุดที่ส่ง")
+    report_count = models.IntegerField(default=0, verbose_name="จำนวนรายงานที่ส่ง")
+
+    # งานที่ใช้ติดตามผล (APPROVED/COMPLETED ล่าสุด ถ้าไม่มีใช้ใบสมัครล่าสุด) สำหรับหน้ารายละเอียดนักศึกษา
+    current_job = models.ForeignKey(JobApplication, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="งานที่ติดตามผล")
+    acknowledged_reports = models.IntegerField(default=0, verbose_name="จำนวนรายงานที่ตรวจแล้ว")
+    evaluation_status = models.CharField(max_length=20, blank=True, verbose_name="สถานะการประเมิน")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "ความก้าวหน้านักศึกษา"
+        verbose_name_plural = "ความก้าวหน้านักศึกษา"
+
+    def __str__(self):
+        return f"{self.student.student_code} ({self.training_hours} ชม. / {self.job_status or '-'})"
+
+
+# ==========================================
+# 7. Background Tasks (คิวงานเบื้องหลัง)
+# ==========================================
+
+def task_result_path(instance, filename):
+    return f'exports/tasks/{instance.pk}/{filename}'
+
+
+class BackgroundTask(models.Model):
+    """ งานที่ใช้เวลานาน (สร้างเอกสาร/ทำรายการจำนวนมาก) ประมวลผลโดย manage.py run_worker """
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'รอคิว'
+        RUNNING = 'RUNNING', 'กำลังทำงาน'
+        DONE = 'DONE', 'เสร็จสิ้น'
+        FAILED = 'FAILED', 'ผิดพลาด'
+
+    task_name = models.CharField(max_length=50, verbose_name="ชื่องาน")
+    arguments = models.JSONField(default=dict, blank=True, verbose_name="พารามิเตอร์")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED, verbose_name="สถานะ")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="ความคืบหน้า (%)")
+    message = models.CharField(max_length=255, blank=True, verbose_name="ข้อความ")
+    result_file = models.FileField(upload_to=task_result_path, blank=True, verbose_name="ไฟล์ผลลัพธ์")
+    error = models.TextField(blank=True, verbose_name="รายละเอียดข้อผิดพลาด")
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_tasks')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # worker ที่ถือ RUNNING อยู่ยังมีชีวิต (ดู tasks.heartbeat / tasks.reclaim_stale_tasks)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="จำนวนครั้งที่หยิบไปทำ")
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "งานเบื้องหลัง"
+        verbose_name_plural = "งานเบื้องหลัง"
+        indexes = [
+            # worker ดึงงานที่รอคิวเก่าสุดก่อน
+            models.Index(fields=['created_at'], name='task_queued_idx', condition=models.Q(status='QUEUED')),
+            # worker ไล่หางาน RUNNING ที่ heartbeat ค้าง
+            models.Index(fields=['heartbeat_at'], name='task_running_idx', condition=models.Q(status='RUNNING')),
+        ]
+
+    def __str__(self):
+        return f"{self.task_name} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
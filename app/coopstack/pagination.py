@@ -0,0 +1,198 @@
+"""
+Keyset (cursor) pagination สำหรับรายการประวัติที่โตขึ้นทุกปีการศึกษา
+
+Paginator ของ Django ใช้ OFFSET (หน้าลึก ๆ ต้องสแกนข้ามแถวทั้งหมดก่อนหน้า) และ COUNT ทุกครั้ง
+ที่นี่ใช้ค่าของแถวสุดท้ายในหน้าเป็น cursor (?after=...) แล้ว WHERE ต่อจากค่านั้น ทุกหน้าจึงใช้ index
+ได้เท่ากับหน้าแรก ส่วนจำนวนรวมเป็นค่าประมาณที่ cache ไว้ (KEYSET_COUNT_TIMEOUT วินาที)
+
+ยกเว้นเมื่อเรียงตามค่าที่คำนวณตอน query (เช่น search_rank ของ similarity() ที่เป็น float4) ค่าที่ผ่าน cursor
+JSON ไปกลับไม่เท่ากับค่าใน SQL พอดี แถวที่ขอบหน้าจะซ้ำหรือหายได้ กรณีนี้ cursor จึงเก็บ OFFSET แทน
+(ผลค้นหาที่ผู้ใช้ไล่ดูมีไม่กี่หน้า)
+"""
+import base64
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+KEYSET_COUNT_TIMEOUT = 60
+
+
+def _json_default(value):
+    # ไม่ใช้ DjangoJSONEncoder เพราะตัด microsecond ของ datetime ทิ้ง (cursor ต้องเท่ากับค่าในฐานข้อมูลพอดี)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values):
+    data = json.dumps(values, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+class KeysetPage:
+    """ ใช้แทน Page ของ Django ใน template: วนลูปได้ + has_next / has_previous / next_cursor / previous_cursor """
+
+    def __init__(self, object_list, paginator, has_next, has_previous, offset=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.offset = offset  # None = keyset, ตัวเลข = ตำแหน่งแถวแรกของหน้า (เรียงตาม annotation)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self.offset is not None:
+            return encode_cursor([self.offset + len(self.object_list)])
+        return self.paginator.cursor_for(self.object_list[-1]) if self.object_list else None
+
+    @property
+    def previous_cursor(self):
+        if self.offset is not None:
+            return encode_cursor([self.offset])
+        return self.paginator.cursor_for(self.object_list[0]) if self.object_list else None
+
+
+class KeysetPaginator:
+    """
+    เรียงตาม order_by ของ queryset (เช่น '-created_at' หรือ '-search_rank', '-submitted_at')
+    แล้วต่อท้ายด้วย pk เพื่อให้ทุกแถวมีตำแหน่งไม่ซ้ำกัน
+    ถ้ามี key เป็น annotation (search_rank) จะแบ่งหน้าด้วย OFFSET แทน keyset
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+        ordering = [str(key) for key in queryset.query.order_by]
+        if not any(key.lstrip('-') in ('id', 'pk') for key in ordering):
+            ordering.append('-id' if ordering and ordering[-1].startswith('-') else 'id')
+        self.ordering = ordering
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in ordering]
+        self.by_offset = any(name in queryset.query.annotations for name, _descending in self.keys)
+
+    @property
+    def count(self):
+        """ จำนวนรวมโดยประมาณ (cache ตาม SQL ของ queryset) """
+        digest = hashlib.md5(str(self.queryset.query).encode()).hexdigest()
+        key = f"keyset_count:{self.queryset.model._meta.label_lower}:{digest}"
+        total = cache.get(key)
+        if total is None:
+            total = self.queryset.count()
+            cache.set(key, total, KEYSET_COUNT_TIMEOUT)
+        return total
+
+    def cursor_for(self, obj):
+        values = []
+        for name, _descending in self.keys:
+            value = obj
+            for attr in name.split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return encode_cursor(values)
+
+    def _parse_cursor(self, cursor):
+        """ แปลง cursor กลับเป็นค่าตามชนิดของ field (None = cursor เสีย ให้กลับไปหน้าแรก) """
+        try:
+            values = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            return None
+
+        parsed = []
+        for (name, _descending), value in zip(self.keys, values):
+            try:
+                parsed.append(self._field(name).to_python(value))
+            except (FieldDoesNotExist, ValidationError):
+                return None
+        return parsed
+
+    def _field(self, name):
+        model = self.queryset.model
+        *relations, last = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        if last == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(last)
+
+    def _seek(self, values, forward):
+        """ WHERE (k1, k2, ...) มาก่อน/หลัง values ตามทิศทางการเรียง """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.keys, values):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        # เงื่อนไขซ้ำบน key แรกให้ index range scan เริ่มจาก cursor ได้ทันที
+        first_name, first_descending = self.keys[0]
+        bound = 'lte' if first_descending == forward else 'gte'
+        return Q(**{f'{first_name}__{bound}': values[0]}) & condition
+
+    def _parse_offset(self, cursor):
+        try:
+            values = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(values, list) or len(values) != 1 or type(values[0]) is not int or values[0] < 0:
+            return None
+        return values[0]
+
+    def _get_offset_page(self, after, before):
+        offset = self._parse_offset(after or before) if (after or before) else None
+        if offset is None:
+            offset = 0
+        elif not after:
+            offset = max(offset - self.per_page, 0)
+        rows = list(self.queryset.order_by(*self.ordering)[offset:offset + self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, offset > 0, offset=offset)
+
+    def get_page(self, params):
+        """ params = request.GET (ใช้ after=... หรือ before=...) """
+        after = params.get('after')
+        before = params.get('before')
+        if self.by_offset:
+            return self._get_offset_page(after, before)
+        values = self._parse_cursor(after or before) if (after or before) else None
+
+        if values is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        if after:
+            rows = list(self.queryset.filter(self._seek(values, forward=True))
+                        .order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, True)
+
+        # ย้อนหน้า: เรียงกลับด้าน เอา per_page แถวก่อน cursor แล้วกลับลำดับคืน
+        reverse = [key[1:] if key.startswith('-') else f'-{key}' for key in self.ordering]
+        rows = list(self.queryset.filter(self._seek(values, forward=False))
+                    .order_by(*reverse)[:self.per_page + 1])
+        if len(rows) <= self.per_page:
+            return self.get_page({})  # ถึงต้นรายการแล้ว แสดงหน้าแรกเต็มหน้า
+        return KeysetPage(rows[:self.per_page][::-1], self, True, True)
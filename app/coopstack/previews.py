@@ -0,0 +1,95 @@
+"""
+ภาพตัวอย่างของไฟล์ที่ผู้ใช้อัปโหลด (หลักฐานการอบรม / ไฟล์แนบประกาศ)
+
+ไฟล์ต้นฉบับมักเป็นรูปจากมือถือหลาย MB หรือ PDF ที่ต้องโหลดทั้งไฟล์เพื่อดูแค่ผ่าน ๆ
+หลังอัปโหลดจะมีงานเบื้องหลัง 'file_preview' (tasks.py) สร้าง
+- รูปภาพ: ย่อเหลือไม่เกิน PREVIEW_SIZE บีบอัดเป็น JPEG
+- PDF: render หน้าแรกเป็น PNG
+เก็บไว้ข้างไฟล์ต้นฉบับ (<ชื่อเดิม>.preview.jpg / .png) แล้วส่งผ่าน view ที่ตรวจสิทธิ์เหมือนไฟล์ต้นฉบับ
+"""
+import io
+import os
+
+import pypdfium2 as pdfium
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .caching import ANNOUNCEMENTS, bump_version
+from .models import Announcement
+
+PREVIEW_SIZE = (640, 640)
+JPEG_QUALITY = 70
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+# model -> (field ไฟล์ต้นฉบับ, field ภาพตัวอย่าง)
+PREVIEW_FIELDS = {
+    'coopstack.trainingrecord': ('proof_file', 'proof_preview'),
+    'coopstack.announcement': ('attachment', 'attachment_preview'),
+}
+
+
+def _open_image(source):
+    image = Image.open(source)
+    image.draft('RGB', PREVIEW_SIZE)  # JPEG: ถอดรหัสที่ความละเอียดต่ำตั้งแต่แรก (เร็วและใช้ memory น้อย)
+    return ImageOps.exif_transpose(image)
+
+
+def _pdf_first_page(data):
+    pdf = pdfium.PdfDocument(data)
+    try:
+        page = pdf[0]
+        scale = min(PREVIEW_SIZE[0] / page.get_width(), PREVIEW_SIZE[1] / page.get_height())
+        return page.render(scale=scale).to_pil()
+    finally:
+        pdf.close()
+
+
+def render_preview(fieldfile):
+    """ คืน (นามสกุลไฟล์, bytes) ของภาพตัวอย่าง หรือ None ถ้าไม่ใช่รูปภาพ/PDF """
+    extension = os.path.splitext(fieldfile.name)[1].lower()
+    if extension != '.pdf' and extension not in IMAGE_EXTENSIONS:
+        return None
+
+    with fieldfile.open('rb') as source:
+        if extension == '.pdf':
+            image, output = _pdf_first_page(source.read()), ('.png', 'PNG', {'optimize': True})
+        else:
+            image, output = _open_image(source), ('.jpg', 'JPEG', {'quality': JPEG_QUALITY, 'optimize': True})
+        image.thumbnail(PREVIEW_SIZE)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+    suffix, image_format, options = output
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return suffix, buffer.getvalue()
+
+
+def generate_preview(instance):
+    """ สร้าง (หรือสร้างใหม่) ภาพตัวอย่างของ instance คืนค่า True ถ้าสร้างได้ """
+    source_field, preview_field = PREVIEW_FIELDS[instance._meta.label_lower]
+    source = getattr(instance, source_field)
+    if not source:
+        return False
+    result = render_preview(source)
+    if result is None:
+        return False
+
+    suffix, content = result
+    preview = getattr(instance, preview_field)
+    if preview:
+        preview.delete(save=False)
+    stem = os.path.splitext(os.path.basename(source.name))[0]
+    preview.save(f'{stem}.preview{suffix}', ContentFile(content), save=False)
+    # update() แทน save() เพื่อไม่ให้ signals คำนวณ StudentProgress ใหม่โดยไม่จำเป็น
+    type(instance).objects.filter(pk=instance.pk).update(**{preview_field: preview.name})
+    if isinstance(instance, Announcement):
+        bump_version(ANNOUNCEMENTS)  # รายการประกาศใน cache ต้องเห็นภาพตัวอย่างใหม่
+    return True
+
+
+def preview_model(label):
+    if label not in PREVIEW_FIELDS:
+        raise ValueError(f"Unknown preview model: {label}")
+    return apps.get_model(label)
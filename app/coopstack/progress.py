@@ -0,0 +1,153 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .caching import bump_models
+from .models import (
+    Student, TrainingRecord, JobApplication, WeeklyReport,
+    Evaluation, StudentProgress
+)
+
+# สถานะที่ถือว่าได้ที่ฝึกงานแล้ว (ใช้เลือก current_job)
+PLACED_STATUSES = ['APPROVED', 'COMPLETED']
+
+PROGRESS_FIELDS = [
+    'training_hours', 'latest_job', 'job_status', 'academic_year',
+    'current_job', 'current_week', 'report_count', 'acknowledged_reports',
+    'evaluation_status', 'updated_at',
+]
+
+
+def build_progress(student_ids):
+    """
+    คำนวณ StudentProgress (ยังไม่บันทึก) ของนักศึกษาหลายคนพร้อมกัน
+    ใช้ Query แบบ GROUP BY จำนวนคงที่ ไม่ขึ้นกับจำนวนนักศึกษา
+    """
+    student_ids = list(student_ids)
+
+    # 1. ชั่วโมงอบรมที่อนุมัติแล้ว
+    hours = dict(
+        TrainingRecord.objects.filter(student_id__in=student_ids, status='APPROVED')
+        .values('student_id').annotate(total=Sum('get_hours')).order_by()
+        .values_list('student_id', 'total')
+    )
+
+    # 2. ใบสมัครล่าสุด / งานที่ใช้ติดตามผล (เรียงเก่า -> ใหม่ ตัวท้ายสุดชนะ)
+    latest, current = {}, {}
+    jobs = JobApplication.objects.filter(student_id__in=student_ids).order_by('created_at', 'id').values_list(
+        'id', 'student_id', 'status', 'academic_year'
+    )
+    for job in jobs:
+        latest[job[1]] = job
+        if job[2] in PLACED_STATUSES:
+            current[job[1]] = job
+    for student_id, job in latest.items():
+        current.setdefault(student_id, job)
+
+    # 3. รายงานประจำสัปดาห์ (สัปดาห์ล่าสุด/จำนวนที่ส่งของใบสมัครล่าสุด, จำนวนที่ตรวจแล้วของงานที่ติดตาม)
+    #    และผลประเมินของงานที่ติดตาม
+    job_ids = {job[0] for job in current.values()} | {job[0] for job in latest.values()}
+    reports = {
+        row['job_application_id']: row
+        for row in WeeklyReport.objects.filter(job_application_id__in=job_ids)
+        .values('job_application_id').order_by()
+        .annotate(
+            current_week=Max('week_number'),
+            report_count=Count('id'),
+            acknowledged=Count('id', filter=Q(status='ACKNOWLEDGED')),
+        )
+    }
+    evaluations = dict(
+        Evaluation.objects.filter(job_application_id__in=job_ids).values_list('job_application_id', 'status')
+    )
+
+    progress_list = []
+    for student_id in student_ids:
+        latest_job = latest.get(student_id)
+        current_job = current.get(student_id)
+        latest_report = reports.get(latest_job[0], {}) if latest_job else {}
+        current_report = reports.get(current_job[0], {}) if current_job else {}
+        progress_list.append(StudentProgress(
+            student_id=student_id,
+            training_hours=hours.get(student_id) or 0,
+            latest_job_id=latest_job[0] if latest_job else None,
+            job_status=latest_job[2] if latest_job else '',
+            academic_year=latest_job[3] if latest_job else None,
+            current_job_id=current_job[0] if current_job else None,
+            current_week=latest_report.get('current_week') or 0,
+            report_count=latest_report.get('report_count', 0),
+            acknowledged_reports=current_report.get('acknowledged', 0),
+            evaluation_status=evaluations.get(current_job[0], '') if current_job else '',
+        ))
+    return progress_list
+
+
+def refresh_student_progress(student_id, create=True):
+    """
+    คำนวณแถว StudentProgress ของนักศึกษา 1 คนใหม่
+    create=False ใช้ตอนลบข้อมูล (post_delete) เพื่อไม่สร้างแถวใหม่ระหว่างที่ Student กำลังถูกลบแบบ cascade
+    """
+    progress = build_progress([student_id])[0]
+    values = {
+        field.attname: getattr(progress, field.attname)
+        for field in StudentProgress._meta.concrete_fields
+        if field.name in PROGRESS_FIELDS
+    }
+    values['updated_at'] = timezone.now()
+
+    if create:
+        StudentProgress.objects.update_or_create(student_id=student_id, defaults=values)
+    else:
+        StudentProgress.objects.filter(student_id=student_id).update(**values)
+        bump_models(StudentProgress)
+
+
+def refresh_many_progress(student_ids):
+    """ คำนวณใหม่หลายคนพร้อมกัน (ใช้หลัง queryset.update() ซึ่งไม่ส่ง signals) """
+    student_ids = list(student_ids)
+    if student_ids:
+        _save_batch(student_ids)
+
+
+def get_student_progress(student, *related):
+    """ ดึงแถว StudentProgress ของนักศึกษา (ถ้ายังไม่มีให้คำนวณและสร้างใหม่) """
+    progress = StudentProgress.objects.select_related(*related).filter(student=student).first()
+    if progress is None:
+        refresh_student_progress(student.pk)
+        progress = StudentProgress.objects.select_related(*related).get(student=student)
+    return progress
+
+
+async def aget_student_progress(student, *related):
+    """ get_student_progress สำหรับ view แบบ async """
+    progress = await StudentProgress.objects.select_related(*related).filter(student=student).afirst()
+    if progress is None:
+        await sync_to_async(refresh_student_progress)(student.pk)
+        progress = await StudentProgress.objects.select_related(*related).aget(student=student)
+    return progress
+
+
+def rebuild_all_progress(batch_size=500):
+    """ สร้างตาราง StudentProgress ใหม่ทั้งหมดแบบ bulk คืนค่าจำนวนแถวที่บันทึก """
+    total = 0
+    student_ids = Student.objects.order_by('id').values_list('id', flat=True)
+    batch = []
+    for student_id in student_ids.iterator(chunk_size=batch_size):
+        batch.append(student_id)
+        if len(batch) >= batch_size:
+            total += _save_batch(batch)
+            batch = []
+    if batch:
+        total += _save_batch(batch)
+    return total
+
+
+def _save_batch(student_ids):
+    bump_models(StudentProgress)  # bulk_create ไม่ส่ง signals (ดู caching.py)
+    StudentProgress.objects.bulk_create(
+        build_progress(student_ids),
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=PROGRESS_FIELDS,
+    )
+    return len(student_ids)
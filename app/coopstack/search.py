@@ -0,0 +1,57 @@
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+# ตัวอักษรที่สูงกว่า Latin Extended-B (เช่นภาษาไทย) pg_trgm ตัดคำตาม LC_CTYPE ของฐานข้อมูล
+# ctype "C"/"POSIX" ไม่นับเป็นตัวอักษรเลย (ไม่ได้ trigram สักตัว) และแม้ ctype เป็น UTF-8 สระ/วรรณยุกต์ไทย
+# (combining mark) ก็ไม่ใช่ตัวอักษร คำจึงถูกตัดกลางคำ similarity ใช้เรียงผลไม่ได้
+LATIN_MAX = 0x024F
+
+
+def has_trigram_letters(query):
+    """ True ถ้าตัวอักษรทุกตัวใน query เป็น Latin (pg_trgm แยก trigram ได้ตามปกติ) """
+    return all(ord(char) <= LATIN_MAX for char in query if char.isalpha())
+
+
+def search_queryset(queryset, query, fields, rank=True):
+    """
+    ค้นหาแบบ substring บนหลาย field
+    - PostgreSQL: ใช้ pg_trgm (GIN index บน UPPER(col) ใน migration 0016) ทั้ง icontains และ word similarity
+      จึงทนต่อการพิมพ์ผิดเล็กน้อย และเรียงผลตามความใกล้เคียง (search_rank) ถ้า rank=True
+      query ที่มีตัวอักษรนอก Latin (เช่นชื่อภาษาไทย) ใช้ icontains อย่างเดียว และ search_rank = 1 ถ้าขึ้นต้นด้วยคำค้น
+      (ฐานข้อมูลควรสร้างด้วย LC_CTYPE แบบ UTF-8 เช่น en_US.utf8 ของ image postgres ให้ GIN index ใช้กับ Latin ได้)
+    - DB อื่น (เช่น SQLite ตอนเทส): ถอยกลับไปใช้ icontains แบบเดิม ลำดับผลไม่เปลี่ยน
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': query})
+
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.filter(condition)
+
+    if not has_trigram_letters(query):
+        queryset = queryset.filter(condition)
+        if rank:
+            prefix = Q()
+            for field in fields:
+                prefix |= Q(**{f'{field}__istartswith': query})
+            search_rank = Case(When(prefix, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+            queryset = queryset.annotate(search_rank=search_rank).order_by('-search_rank', *queryset.query.order_by)
+        return queryset
+
+    # icontains บน PostgreSQL คือ UPPER(col) LIKE ... จึงเทียบบน UPPER(col) ให้ใช้ index ตัวเดียวกัน
+    for field in fields:
+        condition |= Q(TrigramWordSimilar(Upper(field), query.upper()))
+    queryset = queryset.filter(condition)
+
+    if rank:
+        similarities = [TrigramWordSimilarity(query, field) for field in fields]
+        search_rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        queryset = queryset.annotate(search_rank=search_rank).order_by('-search_rank', *queryset.query.order_by)
+    return queryset
@@ -0,0 +1,79 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .caching import ANNOUNCEMENTS, bump_models, bump_version
+from .models import (
+    User, Student, CompanyMaster, TrainingRecord, JobApplication, WeeklyReport, Evaluation,
+    StudentProgress, Announcement
+)
+from .progress import refresh_student_progress
+
+# ==========================================
+# อัปเดตตาราง StudentProgress เมื่อข้อมูลต้นทางเปลี่ยน
+# ==========================================
+
+def _student_id_of_job(job_id):
+    return JobApplication.objects.filter(pk=job_id).values_list('student_id', flat=True).first()
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    if created:
+        refresh_student_progress(instance.pk)
+
+
+@receiver(post_save, sender=TrainingRecord)
+@receiver(post_save, sender=JobApplication)
+def student_record_saved(sender, instance, **kwargs):
+    refresh_student_progress(instance.student_id)
+
+
+@receiver(post_delete, sender=TrainingRecord)
+@receiver(post_delete, sender=JobApplication)
+def student_record_deleted(sender, instance, **kwargs):
+    refresh_student_progress(instance.student_id, create=False)
+
+
+@receiver(post_save, sender=WeeklyReport)
+@receiver(post_save, sender=Evaluation)
+def job_record_saved(sender, instance, **kwargs):
+    student_id = _student_id_of_job(instance.job_application_id)
+    if student_id:
+        refresh_student_progress(student_id)
+
+
+@receiver(post_delete, sender=WeeklyReport)
+@receiver(post_delete, sender=Evaluation)
+def job_record_deleted(sender, instance, **kwargs):
+    student_id = _student_id_of_job(instance.job_application_id)
+    if student_id:
+        refresh_student_progress(student_id, create=False)
+
+
+# ==========================================
+# เปลี่ยนเวอร์ชัน cache รายการประกาศ (caching.py)
+# ==========================================
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def announcement_changed(sender, instance, **kwargs):
+    bump_version(ANNOUNCEMENTS)
+
+
+# ==========================================
+# เปลี่ยน generation ของ HTMX partial ที่ cache ไว้ (caching.render_cached_fragment)
+# ==========================================
+
+FRAGMENT_MODELS = (User, Student, CompanyMaster, TrainingRecord, JobApplication, WeeklyReport, Evaluation, StudentProgress)
+
+
+def fragment_model_changed(sender, instance, update_fields=None, **kwargs):
+    # login บันทึกแค่ last_login ไม่กระทบข้อมูลที่แสดงในตาราง
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_models(sender)
+
+
+for _model in FRAGMENT_MODELS:
+    post_save.connect(fragment_model_changed, sender=_model, dispatch_uid=f'fragment_save_{_model.__name__}')
+    post_delete.connect(fragment_model_changed, sender=_model, dispatch_uid=f'fragment_delete_{_model.__name__}')
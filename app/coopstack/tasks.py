@@ -0,0 +1,229 @@
+import logging
+import random
+import tempfile
+import threading
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.files.base import ContentFile, File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    User, CompanyMaster, CompanyProfile, JobApplication,
+    BackgroundTask, current_academic_year
+)
+from .previews import generate_preview, preview_model
+from .utils import CoopFormBatch, generate_coop_docx, generate_random_password
+
+logger = logging.getLogger(__name__)
+
+# ผลลัพธ์ของงาน: ข้อความแจ้งผู้ใช้ + (ถ้ามี) ไฟล์ให้ดาวน์โหลด (content เป็น bytes หรือ File ที่เขียนไว้แล้ว)
+TaskResult = namedtuple('TaskResult', ['message', 'filename', 'content'], defaults=['', None, None])
+
+# ชื่องาน -> ฟังก์ชัน (ลงทะเบียนด้วย @register_task)
+TASKS = {}
+
+# worker ที่กำลังทำงานอัปเดต heartbeat_at ทุก HEARTBEAT_INTERVAL วินาที (thread แยก ไม่ขึ้นกับตัวงาน)
+HEARTBEAT_INTERVAL = 30
+# งาน RUNNING ที่ heartbeat เงียบไปนานกว่านี้ = worker ตาย/ถูก kill ระหว่างทำ (ดู reclaim_stale_tasks)
+TASK_STALE_AFTER = timedelta(minutes=5)
+# จำนวนครั้งที่ให้ worker หยิบงานเดิมได้ ก่อนตัดสินว่า FAILED (งานที่ทำให้ worker ตายทุกครั้งจะไม่วนไม่จบ)
+MAX_ATTEMPTS = 3
+
+
+def register_task(name):
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, user=None, **arguments):
+    """ เพิ่มงานเข้าคิว (worker จะหยิบไปทำ) คืนค่า BackgroundTask """
+    if task_name not in TASKS:
+        raise ValueError(f"Unknown task: {task_name}")
+    return BackgroundTask.objects.create(
+        task_name=task_name,
+        arguments=arguments,
+        created_by=user if user and user.is_authenticated else None,
+    )
+
+
+def claim_next_task():
+    """ หยิบงานที่รอคิวเก่าสุด 1 งาน (SKIP LOCKED ให้รันหลาย worker พร้อมกันได้บน PostgreSQL) """
+    with transaction.atomic():
+        task = (
+            BackgroundTask.objects.select_for_update(skip_locked=True)
+            .filter(status=BackgroundTask.Status.QUEUED)
+            .order_by('created_at')
+            .first()
+        )
+        if task is None:
+            return None
+        task.status = BackgroundTask.Status.RUNNING
+        task.started_at = task.heartbeat_at = timezone.now()
+        task.attempts += 1
+        task.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts'])
+    return task
+
+
+def reclaim_stale_tasks(stale_after=TASK_STALE_AFTER):
+    """
+    งาน RUNNING ที่ heartbeat หยุดไปนานกว่า stale_after: ส่งกลับเข้าคิว หรือ FAILED ถ้าหยิบไปครบ MAX_ATTEMPTS แล้ว
+    คืนค่า (จำนวนที่กลับเข้าคิว, จำนวนที่ FAILED)
+    """
+    now = timezone.now()
+    cutoff = now - stale_after
+    stale = BackgroundTask.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=BackgroundTask.Status.RUNNING,
+    )
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=BackgroundTask.Status.FAILED, finished_at=now,
+        message="worker หยุดทำงานระหว่างประมวลผลหลายครั้ง",
+    )
+    requeued = stale.update(
+        status=BackgroundTask.Status.QUEUED, progress=0, message="", started_at=None, heartbeat_at=None,
+    )
+    if failed or requeued:
+        logger.warning("Reclaimed stale background tasks: %s re-queued, %s failed", requeued, failed)
+    return requeued, failed
+
+
+@contextmanager
+def heartbeat(task, interval=HEARTBEAT_INTERVAL):
+    """ อัปเดต heartbeat_at ของงานเป็นระยะจาก thread แยก ระหว่างที่งานกำลังประมวลผล """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                BackgroundTask.objects.filter(pk=task.pk, status=BackgroundTask.Status.RUNNING).update(
+                    heartbeat_at=timezone.now())
+        finally:
+            connection.close()  # connection ของ thread นี้
+
+    thread = threading.Thread(target=beat, name=f'task-heartbeat-{task.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_task(task):
+    """ ประมวลผลงาน 1 งาน บันทึกผลลัพธ์/ข้อผิดพลาดลง BackgroundTask """
+    def report(progress, message=''):
+        BackgroundTask.objects.filter(pk=task.pk).update(progress=min(progress, 100), message=message[:255])
+
+    try:
+        with heartbeat(task):
+            result = TASKS[task.task_name](report, **task.arguments) or TaskResult()
+    except Exception:
+        logger.exception("Background task %s #%s failed", task.task_name, task.pk)
+        task.status = BackgroundTask.Status.FAILED
+        task.message = "เกิดข้อผิดพลาดระหว่างประมวลผล"
+        task.error = traceback.format_exc()
+    else:
+        task.status = BackgroundTask.Status.DONE
+        task.progress = 100
+        task.message = result.message
+        if result.content is not None:
+            content = result.content if isinstance(result.content, File) else ContentFile(result.content)
+            with content:
+                task.result_file.save(result.filename, content, save=False)
+    task.finished_at = timezone.now()
+    task.save(update_fields=['status', 'progress', 'message', 'error', 'result_file', 'finished_at'])
+    return task
+
+
+# ==========================================
+# งานที่ลงทะเบียนไว้
+# ==========================================
+
+@register_task('coop_form')
+def coop_form_task(report, job_id):
+    """ สร้างแบบฟอร์มสหกิจ (.docx) ของใบสมัคร 1 ใบ """
+    job_app = JobApplication.objects.select_related('student__user', 'company').get(pk=job_id)
+    report(10, "กำลังสร้างเอกสาร")
+    buffer = generate_coop_docx(job_app)
+    return TaskResult(
+        message="สร้างแบบฟอร์มเรียบร้อย",
+        filename=f"coop_form_{job_app.student.student_code}.docx",
+        content=buffer.getvalue(),
+    )
+
+
+@register_task('coop_forms_zip')
+def coop_forms_zip_task(report, year):
+    """
+    แบบฟอร์มสหกิจของใบสมัครที่อนุมัติแล้วทั้งปีการศึกษาเป็น ZIP ไฟล์เดียว
+    Process Pool ของ CoopFormBatch จึงถูกสร้างใน worker ทีละงาน ไม่ใช่ใน worker ของเว็บทุก request
+    """
+    jobs = JobApplication.objects.filter(status='APPROVED', academic_year=year).select_related(
+        'student__user', 'company'
+    ).order_by('student__student_code')
+    total = jobs.count()
+    batch = CoopFormBatch(jobs.iterator(chunk_size=200))
+
+    output = tempfile.TemporaryFile()  # เขียนลงดิสก์ทีละส่วน ไม่ถือทั้งไฟล์ไว้ใน Memory
+    for chunk in batch:
+        output.write(chunk)
+        if total:
+            report(int(batch.count * 100 / total), f"สร้างแล้ว {batch.count}/{total} ฉบับ")
+    output.seek(0)
+    return TaskResult(
+        message=f"สร้างแบบฟอร์มปีการศึกษา {year} เรียบร้อย {batch.count} ฉบับ",
+        filename=f"coop_forms_{year}.zip",
+        content=File(output),
+    )
+
+
+@register_task('auto_generate_accounts')
+def auto_generate_accounts_task(report):
+    """ สร้างบัญชีพี่เลี้ยงให้บริษัทที่มีนักศึกษาฝึกงาน (APPROVED) และยังไม่มีบัญชีในปีการศึกษานี้ """
+    current_year = current_academic_year()
+
+    # บริษัทที่มีใบสมัครอนุมัติแล้ว แต่ยังไม่มีบัญชีในปีนี้ (เช็คใน Query เดียว)
+    companies = list(
+        CompanyMaster.objects.filter(job_applications__status='APPROVED')
+        .exclude(staffs__academic_year=current_year)
+        .distinct()
+    )
+
+    created_count = 0
+    for index, company in enumerate(companies, start=1):
+        # Generate Username (เช่น comp_abc123)
+        clean_name = "".join(e for e in company.name if e.isalnum())[:8]
+        username = f"{clean_name.lower()}_{random.randint(100,999)}"
+        password = generate_random_password(8)
+
+        if not User.objects.filter(username=username).exists():
+            with transaction.atomic():
+                user = User.objects.create_user(username=username, password=password, role=User.Role.COMPANY)
+                CompanyProfile.objects.create(
+                    user=user,
+                    company=company,
+                    position="HR / ผู้ดูแล",
+                    academic_year=current_year
+                )
+            created_count += 1
+        report(int(index * 100 / len(companies)), f"ตรวจสอบแล้ว {index}/{len(companies)} บริษัท")
+
+    if created_count > 0:
+        return TaskResult(message=f"สร้างบัญชีอัตโนมัติสำเร็จ {created_count} รายการ")
+    return TaskResult(message="ข้อมูลครบถ้วนแล้ว ไม่มีบัญชีที่ต้องสร้างเพิ่ม")
+
+
+@register_task('file_preview')
+def file_preview_task(report, model, pk):
+    """ สร้างภาพตัวอย่างของไฟล์ที่เพิ่งอัปโหลด (ดู previews.py) """
+    instance = preview_model(model).objects.filter(pk=pk).first()
+    if instance is None or not generate_preview(instance):
+        return TaskResult(message="ไม่มีภาพตัวอย่างสำหรับไฟล์นี้")
+    return TaskResult(message="สร้างภาพตัวอย่างเรียบร้อย")
@@ -0,0 +1,334 @@
+"""
+จำนวน SQL query ของทุก route ใน coopstack/urls.py ต้องคงที่ไม่ว่าข้อมูลจะมีกี่แถว
+
+แต่ละ route ถูกเรียก 2 รอบ: หลังสร้างข้อมูลชุดเล็ก (SMALL) และหลังเพิ่มข้อมูลจนเกินหน้า pagination (LARGE)
+- รอบใหญ่ต้องใช้ query ไม่มากกว่ารอบเล็ก (ถ้ามากกว่า = N+1 ตามจำนวนแถวที่แสดง)
+- ทั้งสองรอบต้องไม่เกิน max_queries ของ route นั้น
+"""
+import datetime
+import tempfile
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, get_resolver
+
+from .models import (
+    User, Student, CompanyMaster, CompanyProfile, TrainingRecord, JobApplication,
+    WeeklyReport, Evaluation, Announcement, BackgroundTask, current_academic_year
+)
+from .pagination import KeysetPaginator
+
+# role: None = ไม่ login, args/data/params: ฟังก์ชันรับ test case คืนค่าที่ต้องใช้ (เลือก object หลังสร้างข้อมูลแล้ว)
+Route = namedtuple(
+    'Route', ['name', 'role', 'max_queries', 'method', 'args', 'data', 'params', 'hx_target', 'label'],
+    defaults=['get', None, None, None, None, None],
+)
+
+SMALL, LARGE = 3, 13
+
+JOB_STATUSES = ['APPROVED', 'PENDING', 'COMPLETED', 'APPROVED', 'REJECTED']
+
+
+# ==========================================
+# Factories
+# ==========================================
+
+def make_user(username, role=User.Role.STUDENT, **extra):
+    return User.objects.create_user(username=username, password='password123', role=role, **extra)
+
+
+def make_student(code, company, job_status='APPROVED'):
+    """ นักศึกษา 1 คนพร้อมข้อมูลครบตามสถานะใบสมัคร (อบรม / ใบสมัคร / รายงาน / ผลประเมิน) """
+    user = make_user(code, first_name='สมชาย', last_name=f'นามสกุล{code}')
+    student = Student.objects.create(user=user, student_code=code, firstname='สมชาย', lastname=f'นามสกุล{code}', major='DSSI')
+    make_training(student, 'APPROVED')
+    make_training(student, 'PENDING')
+    job = make_job(student, company, job_status)
+    if job_status in ('APPROVED', 'COMPLETED'):
+        make_report(job, 1, 'ACKNOWLEDGED')
+        make_report(job, 2, 'PENDING')
+        Evaluation.objects.create(job_application=job, q1_1=5, status='APPROVED' if job_status == 'COMPLETED' else 'SUBMITTED')
+    return student
+
+
+def make_training(student, status):
+    return TrainingRecord.objects.create(
+        student=student, topic='อบรม Python', date=datetime.date.today(), hours=10,
+        get_hours=10 if status == 'APPROVED' else 0, status=status, proof_file='training_proofs/proof.pdf',
+        proof_preview='training_proofs/proof.preview.png',
+    )
+
+
+def make_job(student, company, status):
+    start = datetime.date(current_academic_year() - 543, 6, 1)
+    return JobApplication.objects.create(
+        student=student, company=company, position='Developer', status=status,
+        start_date=start, end_date=start + datetime.timedelta(days=120), supervisor_name='พี่เลี้ยง',
+    )
+
+
+def make_report(job, week, status='PENDING'):
+    return WeeklyReport.objects.create(job_application=job, week_number=week, work_summary=f'งานสัปดาห์ที่ {week}', status=status)
+
+
+def make_company(name):
+    company = CompanyMaster.objects.create(name=name, teacher_notes='ดูแลดี')
+    CompanyProfile.objects.create(user=make_user(f'hr_{company.pk}', User.Role.COMPANY), company=company,
+                                  academic_year=current_academic_year())
+    return company
+
+
+# ==========================================
+# ตัวช่วยเลือก object ที่ใช้เป็น args ของ URL
+# ==========================================
+
+def latest(model, **filters):
+    return model.objects.filter(**filters).latest('id').pk
+
+
+def pending_ids(model):
+    return list(model.objects.filter(status='PENDING').values_list('pk', flat=True))
+
+
+def history_cursor(model, ordering):
+    """ cursor ของหน้าที่ 2 ในรายการประวัติ (แถวที่ไม่ใช่ PENDING) """
+    return KeysetPaginator(model.objects.exclude(status='PENDING').order_by(ordering), 10).get_page({}).next_cursor
+
+
+ROUTES = [
+    # --- Public / Auth ---
+    Route('home', None, 0),
+    Route('login', None, 0),
+    Route('logout', 'student', 3, method='post'),
+    Route('register', None, 0),
+    Route('get-register-modal', None, 0),
+    Route('get-forgot-modal', None, 0),
+
+    # --- Common ---
+    Route('announcement-list', 'student', 2),
+    Route('task-status', 'student', 2, args=lambda t: [t.task.pk], hx_target='coop-form-task'),
+    Route('task-download', 'student', 2, args=lambda t: [t.task.pk]),
+    Route('training-proof', 'company', 3, args=lambda t: [latest(TrainingRecord, student=t.my_job.student)]),
+    Route('announcement-attachment', 'student', 2,
+          args=lambda t: [latest(Announcement, attachment='uploads/announcements/doc.pdf')]),
+    Route('training-proof-preview', 'company', 3, args=lambda t: [latest(TrainingRecord, student=t.my_job.student)]),
+    Route('announcement-preview', 'student', 2,
+          args=lambda t: [latest(Announcement, attachment='uploads/announcements/doc.pdf')]),
+    Route('metrics', 'admin', 6),
+
+    # --- Student ---
+    Route('student-dashboard', 'student', 2),
+    Route('student-news', 'student', 2),
+    Route('student-training', 'student', 3),
+    Route('student-job', 'student', 2),
+    Route('student-report', 'student', 3),
+    Route('report-detail-modal', 'student', 2, args=lambda t: [latest(WeeklyReport, job_application=t.my_job)],
+          hx_target='modal-container'),
+    Route('search-company', 'student', 2, params={'company_search': 'บริษัท'}, hx_target='company-results'),
+    Route('download-coop-form', 'student', 2, args=lambda t: [t.my_job.pk]),
+    Route('request-coop-form', 'student', 3, method='post', args=lambda t: [t.my_job.pk], hx_target='coop-form-task'),
+    Route('get-cancel-job-modal', 'student', 2, args=lambda t: [t.my_job.pk], hx_target='modal-container'),
+    Route('cancel-job-application', 'student', 11, method='post', args=lambda t: [t.my_job.pk],
+          data={'cancel_reason': 'ทดสอบ'}),
+
+    # --- Teacher: Dashboard ---
+    Route('teacher-dashboard', 'teacher', 5),
+    Route('teacher-dashboard', 'teacher', 5, params={'year': current_academic_year()}, hx_target='student-results',
+          label='teacher-dashboard-htmx'),
+    Route('teacher-coop-forms-zip', 'teacher', 3, method='post', data={'year': current_academic_year()},
+          hx_target='coop-forms-task'),
+    Route('get-student-detail-modal', 'teacher', 3, args=lambda t: [latest(Student)], hx_target='modal-container'),
+
+    # --- Teacher: Training ---
+    Route('teacher-verify-train', 'teacher', 4),
+    Route('teacher-verify-train', 'teacher', 5, params=lambda t: {'after': history_cursor(TrainingRecord, '-date')},
+          hx_target='training-list-container',
+          label='teacher-verify-train-htmx'),
+    Route('get-approve-modal', 'teacher', 3, args=lambda t: [latest(TrainingRecord, status='PENDING')],
+          hx_target='modal-container'),
+    Route('approve-training', 'teacher', 11, method='post', args=lambda t: [latest(TrainingRecord, status='PENDING')],
+          data={'approved_hours': 8, 'teacher_comment': ''}, hx_target='training-row'),
+    Route('get-reject-modal', 'teacher', 3, args=lambda t: [latest(TrainingRecord, status='PENDING')],
+          hx_target='modal-container'),
+    Route('reject-training', 'teacher', 11, method='post', args=lambda t: [latest(TrainingRecord, status='PENDING')],
+          data={'teacher_comment': 'หลักฐานไม่ชัด'}, hx_target='training-row'),
+
+    # --- Teacher: Companies ---
+    Route('bulk-verify-training', 'teacher', 13, method='post', hx_target='training-list-container',
+          data=lambda t: {'ids': pending_ids(TrainingRecord), 'action': 'approve', 'teacher_comment': ''}),
+    Route('teacher-company-summary', 'teacher', 5),
+    Route('teacher-company-summary', 'teacher', 5, params={'page': 1}, hx_target='company-list-container',
+          label='teacher-company-summary-htmx'),
+    Route('get-company-comment-modal', 'teacher', 1, args=lambda t: [t.company.pk], hx_target='modal-container'),
+    Route('save-company-comment', 'teacher', 6, method='post', args=lambda t: [t.company.pk],
+          data={'teacher_notes': 'ใหม่'}),
+
+    # --- Teacher: Jobs ---
+    Route('teacher-verify-job', 'teacher', 5),
+    Route('teacher-verify-job', 'teacher', 5, params={'year': current_academic_year()}, hx_target='job-list-container',
+          label='teacher-verify-job-htmx'),
+    Route('get-job-approve-modal', 'teacher', 2, args=lambda t: [latest(JobApplication, status='PENDING')],
+          hx_target='modal-container'),
+    Route('approve-job', 'teacher', 11, method='post', args=lambda t: [latest(JobApplication, status='PENDING')],
+          data={'teacher_note': 'ok'}, hx_target='job-row'),
+    Route('get-job-reject-modal', 'teacher', 2, args=lambda t: [latest(JobApplication, status='PENDING')],
+          hx_target='modal-container'),
+    Route('reject-job', 'teacher', 11, method='post', args=lambda t: [latest(JobApplication, status='PENDING')],
+          data={'teacher_note': 'no'}, hx_target='job-row'),
+    Route('bulk-verify-job', 'teacher', 14, method='post', hx_target='job-list-container',
+          data=lambda t: {'ids': pending_ids(JobApplication), 'action': 'reject', 'teacher_note': 'no'}),
+    Route('get-job-detail-modal', 'teacher', 1, args=lambda t: [latest(JobApplication)], hx_target='modal-container'),
+
+    # --- Teacher: Reports ---
+    Route('teacher-verify-report', 'teacher', 5),
+    Route('teacher-verify-report', 'teacher', 5, params={'week': 1}, hx_target='report-list-container',
+          label='teacher-verify-report-htmx'),
+    Route('get-report-detail-modal', 'teacher', 1, args=lambda t: [latest(WeeklyReport, status='PENDING')],
+          hx_target='modal-container'),
+    Route('acknowledge-report', 'teacher', 12, method='post', args=lambda t: [latest(WeeklyReport, status='PENDING')],
+          data={'teacher_comment': 'รับทราบ'}, hx_target='report-row'),
+
+    # --- Teacher: Evaluations ---
+    Route('bulk-acknowledge-report', 'teacher', 14, method='post', hx_target='report-list-container',
+          data=lambda t: {'ids': pending_ids(WeeklyReport), 'teacher_comment': ''}),
+    Route('teacher-verify-evaluation', 'teacher', 5),
+    Route('teacher-verify-evaluation', 'teacher', 5, params={'q': 'สมชาย'}, hx_target='evaluation-list-container',
+          label='teacher-verify-evaluation-htmx'),
+    Route('get-eval-detail-modal', 'teacher', 5, args=lambda t: [latest(JobApplication, evaluation__isnull=False)],
+          hx_target='modal-container'),
+    Route('acknowledge-evaluation', 'teacher', 21, method='post',
+          args=lambda t: [latest(Evaluation, status='SUBMITTED')], hx_target='evaluation-row'),
+
+    # --- Teacher: Export ---
+    Route('teacher-export', 'teacher', 2, args=lambda t: ['jobs'], label='teacher-export-jobs'),
+    Route('teacher-export', 'teacher', 2, args=lambda t: ['trainings'], label='teacher-export-trainings'),
+    Route('teacher-export', 'teacher', 2, args=lambda t: ['reports'], params={'format': 'xlsx'}, label='teacher-export-reports'),
+    Route('teacher-export', 'teacher', 2, args=lambda t: ['evaluations'], label='teacher-export-evaluations'),
+
+    # --- Teacher: News ---
+    Route('teacher-news', 'teacher', 2),
+    Route('create-announcement', 'teacher', 2, method='post', data={'title': 'ประกาศ', 'content': 'รายละเอียด'},
+          hx_target='news-list-container'),
+    Route('delete-announcement', 'teacher', 3, method='post', args=lambda t: [latest(Announcement)],
+          hx_target='news-list-container'),
+
+    # --- Teacher: Company accounts ---
+    Route('teacher-company-account', 'teacher', 2),
+    Route('teacher-company-account', 'teacher', 2, params={'q': 'hr'}, hx_target='account-list-container',
+          label='teacher-company-account-htmx'),
+    Route('get-account-modal', 'teacher', 1, hx_target='modal-container'),
+    Route('get-account-modal-edit', 'teacher', 3, args=lambda t: [latest(CompanyProfile)], hx_target='modal-container'),
+    Route('save-account', 'teacher', 11, method='post', hx_target='account-list-container',
+          data=lambda t: {'new_company_name': f'บริษัทใหม่ {t.size}', 'username': f'new_hr_{t.size}', 'password': 'x', 'position': 'HR', 'phone': ''}),
+    Route('update-account', 'teacher', 8, method='post', args=lambda t: [latest(CompanyProfile)],
+          hx_target='account-list-container',
+          data=lambda t: {'company_id': CompanyProfile.objects.latest('id').company_id, 'username': f'renamed_hr_{t.size}', 'position': 'HR', 'phone': ''}),
+    Route('delete-account', 'teacher', 12, method='post', args=lambda t: [latest(CompanyProfile)],
+          hx_target='account-list-container'),
+    Route('auto-gen-accounts', 'teacher', 2, method='post', hx_target='task-status-container'),
+
+    # --- Company ---
+    Route('company-evaluation-list', 'company', 2),
+    Route('get-evaluation-modal', 'company', 2,
+          args=lambda t: [latest(JobApplication, company=t.company, evaluation__isnull=False)],
+          hx_target='modal-container'),
+    Route('save-evaluation', 'company', 5, method='post',
+          args=lambda t: [latest(JobApplication, company=t.company, evaluation__status='SUBMITTED')],
+          data={f'q{part}_{item}': 4 for part in range(1, 6) for item in range(1, 4)}, hx_target='modal-container'),
+]
+
+# route ที่ทดสอบไม่ได้ในตอนนี้ (ไม่มี template ใน repo)
+SKIPPED_ROUTES = {
+    'password_reset': 'ไม่มี auth/password_reset.html',
+    'password_reset_done': 'ไม่มี auth/password_reset_done.html',
+    'password_reset_confirm': 'ไม่มี auth/password_reset_confirm.html',
+    'password_reset_complete': 'ไม่มี auth/password_reset_complete.html',
+    'announcement-create': 'ไม่มี common/announcement_form.html',
+    'get-training-modal': 'ไม่มี partials/training_form_modal.html',
+}
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_ACCEL_REDIRECT='/protected-media/', PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryCountTests(TestCase):
+    """ จำนวน query ต่อ route ต้องไม่โตตามจำนวนแถว (ดูคำอธิบายด้านบนของไฟล์) """
+
+    def setUp(self):
+        cache.clear()  # วัดกรณี cache miss (ข้อมูลที่ cache ไว้จาก test ก่อนหน้าไม่ควรทำให้ตัวเลขต่ำผิดจริง)
+        self.company = make_company('บริษัท ทดสอบ จำกัด')
+        self.users = {
+            'teacher': make_user('teacher', User.Role.TEACHER, first_name='สมศรี'),
+            'company': self.company.staffs.get().user,
+            'admin': make_user('admin', User.Role.ADMIN, is_staff=True),
+        }
+        me = make_student('6600000', self.company, 'APPROVED')
+        self.users['student'] = me.user
+        self.my_job = me.job_applications.get()
+        self.task = BackgroundTask.objects.create(task_name='coop_form', created_by=me.user,
+                                                  status=BackgroundTask.Status.DONE)
+        self.task.result_file.save('coop_form.docx', ContentFile(b'docx'))
+        self.size = 0
+
+    def grow(self, size):
+        """ เพิ่มข้อมูลทุกชนิดจนมี size ชุด (นักศึกษา / บริษัท / ประกาศ / รายงานและอบรมของนักศึกษาที่ login) """
+        my_student = self.my_job.student
+        for index in range(self.size, size):
+            make_student(f'66{index + 1:05d}', self.company, JOB_STATUSES[index % len(JOB_STATUSES)])
+            make_company(f'บริษัท ลำดับ {index}')
+            make_training(my_student, 'APPROVED' if index % 2 else 'PENDING')
+            make_report(self.my_job, index + 3, 'ACKNOWLEDGED' if index % 2 else 'PENDING')
+            Announcement.objects.create(title=f'ประกาศ {index}', content='...',
+                                        attachment='uploads/announcements/doc.pdf' if index % 2 else None,
+                                        attachment_preview='uploads/announcements/doc.preview.png' if index % 2 else '')
+        self.size = size
+
+    def request(self, route):
+        user = self.users.get(route.role)
+        if user is not None:
+            self.client.force_login(user)
+        url = reverse(route.name, args=route.args(self) if route.args else None)
+        data = route.data(self) if callable(route.data) else route.data
+        headers = {'HX-Request': 'true', 'HX-Target': route.hx_target} if route.hx_target else {}
+
+        with CaptureQueriesContext(connection) as queries:
+            if route.method == 'post':
+                response = self.client.post(url, data or {}, headers=headers)
+            else:
+                params = route.params(self) if callable(route.params) else route.params
+                response = self.client.get(url, params or {}, headers=headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, f"{route.label or route.name}: HTTP {response.status_code}")
+        return len(queries), queries
+
+    def assertConstantQueries(self, route):
+        self.grow(SMALL)
+        small, _ = self.request(route)
+        self.grow(LARGE)
+        large, queries = self.request(route)
+
+        label = route.label or route.name
+        captured = '\n'.join(query['sql'] for query in queries.captured_queries)
+        self.assertLessEqual(
+            large, small,
+            f"{label}: query เพิ่มจาก {small} เป็น {large} เมื่อข้อมูลเพิ่มจาก {SMALL} เป็น {LARGE} ชุด (N+1)\n{captured}"
+        )
+        self.assertLessEqual(large, route.max_queries, f"{label}: {large} queries เกินกำหนด {route.max_queries}\n{captured}")
+
+    def test_every_route_is_covered(self):
+        names = {pattern.name for pattern in get_resolver('coopstack.urls').url_patterns if pattern.name}
+        covered = {route.name for route in ROUTES} | set(SKIPPED_ROUTES)
+        self.assertEqual(names - covered, set(), "route ใหม่ต้องเพิ่มใน ROUTES ของ test_query_counts.py")
+
+
+def _make_test(route):
+    def test(self):
+        self.assertConstantQueries(route)
+    return test
+
+
+for _route in ROUTES:
+    setattr(QueryCountTests, f"test_{(_route.label or _route.name).replace('-', '_')}", _make_test(_route))
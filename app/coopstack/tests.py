@@ -1,3 +1,1398 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.request
+import zipfile
+from importlib import import_module
+from unittest import mock, skipUnless
+from urllib.parse import quote
 
-# Create your tests here.
+import pypdfium2 as pdfium
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from .models import (
+    User, Student, CompanyMaster, CompanyProfile, TrainingRecord, JobApplication, WeeklyReport,
+    Evaluation, AllowedStudent, StudentProgress, BackgroundTask, Announcement
+)
+from .backends import ProfileModelBackend
+from .caching import announcement_lists
+from .exports import export_rows
+from .forms import AnnouncementForm, TrainingRecordForm
+from .loadtest import Client as LoadTestClient, Stats
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+from .previews import generate_preview
+from .search import has_trigram_letters, search_queryset
+from .tasks import MAX_ATTEMPTS, TASK_STALE_AFTER, claim_next_task, enqueue, reclaim_stale_tasks, run_task
+from .utils import generate_coop_docx
+
+
+class HotPathIndexTests(TestCase):
+    """ ตรวจว่า Query หลักของหน้าอาจารย์/บริษัท ใช้ index ที่ประกาศไว้ใน Meta.indexes (ผ่าน EXPLAIN) """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        user = User.objects.create(username="6601001")
+        cls.student = Student.objects.create(
+            user=user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI"
+        )
+        cls.job = JobApplication.objects.create(
+            student=cls.student, company=cls.company, position="Developer",
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30),
+            supervisor_name="พี่เลี้ยง",
+        )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # ตารางทดสอบมีไม่กี่แถว ต้องปิด seq scan ไม่งั้น planner จะไม่เลือก index
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_training_hours_per_student(self):
+        qs = TrainingRecord.objects.filter(student=self.student, status='APPROVED')
+        self.assertUsesIndex(qs, 'training_student_status_idx')
+
+    def test_training_pending_queue(self):
+        qs = TrainingRecord.objects.filter(status='PENDING').order_by('-date')
+        self.assertUsesIndex(qs, 'training_pending_idx')
+
+    def test_job_by_student_and_status(self):
+        qs = JobApplication.objects.filter(student=self.student, status='APPROVED')
+        self.assertUsesIndex(qs, 'job_student_status_idx')
+
+    def test_company_students_per_year(self):
+        qs = JobApplication.objects.filter(company=self.company, status='APPROVED', academic_year=2568)
+        self.assertUsesIndex(qs, 'job_company_status_year_idx')
+
+    def test_job_pending_queue(self):
+        qs = JobApplication.objects.filter(status='PENDING').order_by('-created_at')
+        self.assertUsesIndex(qs, 'job_status_created_idx')
+
+    def test_reports_by_job_and_status(self):
+        qs = WeeklyReport.objects.filter(job_application=self.job, status='ACKNOWLEDGED').order_by('week_number')
+        self.assertUsesIndex(qs, 'report_job_status_week_idx')
+
+    def test_report_pending_queue(self):
+        qs = WeeklyReport.objects.filter(status='PENDING').order_by('-submitted_at')
+        self.assertUsesIndex(qs, 'report_pending_idx')
+
+
+class SearchQuerysetTests(TestCase):
+    """ ค้นหาชื่อภาษาไทย/รหัสนักศึกษา (SQLite ใช้ icontains, PostgreSQL ใช้ pg_trgm) """
+
+    @classmethod
+    def setUpTestData(cls):
+        for code, firstname in [("6601001", "สมชาย"), ("6601002", "สมหญิง"), ("6602003", "ประเสริฐ")]:
+            user = User.objects.create(username=code)
+            Student.objects.create(user=user, student_code=code, firstname=firstname, lastname="ใจดี", major="DSSI")
+
+    def search(self, query):
+        qs = search_queryset(Student.objects.order_by('student_code'), query, ['student_code', 'firstname', 'lastname'])
+        return set(qs.values_list('student_code', flat=True))
+
+    def test_thai_name_substring(self):
+        self.assertEqual(self.search("สมห"), {"6601002"})
+
+    def test_student_code_prefix(self):
+        self.assertEqual(self.search("6601"), {"6601001", "6601002"})
+
+    def test_blank_query_returns_everything(self):
+        self.assertEqual(len(self.search("  ")), 3)
+
+    def test_thai_query_skips_trigrams(self):
+        self.assertTrue(has_trigram_letters("Somchai 6601"))
+        self.assertFalse(has_trigram_letters("สมชาย"))
+
+    @skipUnless(connection.vendor == 'postgresql', "pg_trgm ใช้ได้เฉพาะ PostgreSQL")
+    def test_thai_query_ranks_by_icontains_on_postgres(self):
+        qs = search_queryset(Student.objects.order_by('student_code'), "ประ", ['student_code', 'firstname', 'lastname'])
+        self.assertNotIn('SIMILARITY', str(qs.query).upper())
+        self.assertEqual(list(qs.values_list('student_code', 'search_rank')), [("6602003", 1.0)])
+
+        qs = search_queryset(Student.objects.order_by('student_code'), "ชาย", ['student_code', 'firstname', 'lastname'])
+        self.assertEqual(list(qs.values_list('student_code', flat=True)), ["6601001"])
+
+
+class ProfileBackendTests(TestCase):
+    """ User ที่โหลดจาก session มีโปรไฟล์ตาม role ติดมาใน query เดียว """
+
+    def setUp(self):
+        self.backend = ProfileModelBackend()
+        self.company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+
+    def test_student_profile_loaded_with_user(self):
+        user = User.objects.create(username="6601001")
+        Student.objects.create(user=user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        with self.assertNumQueries(1):
+            loaded = self.backend.get_user(user.pk)
+            self.assertEqual(loaded.student_profile.student_code, "6601001")
+
+    def test_company_profile_and_company_loaded_with_user(self):
+        user = User.objects.create(username="hr", role=User.Role.COMPANY)
+        CompanyProfile.objects.create(user=user, company=self.company)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.backend.get_user(user.pk).company_profile.company.name, "บริษัท ทดสอบ จำกัด")
+
+    def test_missing_profile_does_not_query_again(self):
+        user = User.objects.create(username="teacher", role=User.Role.TEACHER)
+        with self.assertNumQueries(1):
+            loaded = self.backend.get_user(user.pk)
+            self.assertFalse(hasattr(loaded, 'student_profile'))
+
+    def test_inactive_user_is_rejected(self):
+        user = User.objects.create(username="6601001", is_active=False)
+        self.assertIsNone(self.backend.get_user(user.pk))
+
+
+class CachedSessionTests(TestCase):
+    """ session อ่านจาก cache (cached_db): ไม่มี query ตาราง django_session แต่ logout/เปลี่ยนรหัสผ่านต้องมีผลทันที """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="6601001", password="old-password")
+        Student.objects.create(user=self.user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        self.assertTrue(self.client.login(username="6601001", password="old-password"))
+
+    def test_request_does_not_read_session_table(self):
+        self.client.get(reverse('student-news'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('student-news')).status_code, 200)
+        self.assertFalse([query['sql'] for query in queries.captured_queries if 'django_session' in query['sql']])
+
+    def test_logout_invalidates_cached_session(self):
+        stolen = Client()
+        stolen.cookies['sessionid'] = self.client.session.session_key  # cookie เดียวกันจากอีกเครื่อง
+        self.assertEqual(stolen.get(reverse('student-news')).status_code, 200)
+
+        self.client.post(reverse('logout'))
+        self.assertEqual(stolen.get(reverse('student-news')).status_code, 302)
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.get(reverse('student-news'))  # ให้ session อยู่ใน cache แล้ว
+        self.user.set_password("new-password")
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('student-news')).status_code, 302)
+
+
+class AsyncViewTests(TestCase):
+    """ view แบบ async ผ่าน ASGI handler (AsyncClient): ไม่มี ORM แบบ sync ใน event loop และยังนับ query ได้ """
+
+    def setUp(self):
+        cache.clear()
+        self.company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        self.student = Student.objects.create(
+            user=User.objects.create(username="6601001"),
+            student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI",
+        )
+        self.hr = User.objects.create(username="hr", role=User.Role.COMPANY)
+        job = JobApplication.objects.create(
+            student=self.student, company=self.company, position="Developer", status='APPROVED',
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+        )
+        CompanyProfile.objects.create(user=self.hr, company=self.company, academic_year=job.academic_year)
+        Announcement.objects.create(title="ประกาศรับสมัคร", content="รายละเอียด")
+
+    def server_timing_queries(self, response):
+        return int(response['Server-Timing'].split('desc="')[1].split(' ')[0])
+
+    async def test_student_pages(self):
+        await self.async_client.aforce_login(self.student.user)
+        for name, params, text in [
+            ('student-dashboard', {}, "Developer"),
+            ('student-news', {}, "ประกาศรับสมัคร"),
+            ('announcement-list', {}, ""),
+            ('search-company', {'company_search': "ทดสอบ"}, "บริษัท ทดสอบ จำกัด"),
+        ]:
+            response = await self.async_client.get(reverse(name), params)
+            self.assertContains(response, text)
+            self.assertGreater(self.server_timing_queries(response), 0)  # execute_wrapper เห็น query ของ ORM แบบ async
+
+    async def test_company_evaluation_list(self):
+        await self.async_client.aforce_login(self.hr)
+        response = await self.async_client.get(reverse('company-evaluation-list'))
+        self.assertContains(response, "Developer")
+        self.assertContains(response, "1 คน")
+
+    async def test_login_and_role_checks(self):
+        url = reverse('student-dashboard')
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].endswith(f"?next={url}"))
+
+        await self.async_client.aforce_login(self.hr)
+        self.assertRedirects(await self.async_client.get(url), reverse('home'), fetch_redirect_response=False)
+
+    def test_middleware_is_async_capable(self):
+        # middleware ที่เป็น sync อย่างเดียวทำให้ทุก request ใต้ ASGI ต้องสลับไป thread ก่อนถึง view
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), 'async_capable', False), path)
+
+
+class TeacherRosterTests(TestCase):
+    """ ตารางรายชื่อนักศึกษาของอาจารย์ (get_dashboard_context): ค่าที่แสดงต่อแถวและตัวเลขสรุปด้านบน """
+
+    def setUp(self):
+        cache.clear()
+        self.company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        self.client.force_login(User.objects.create(username="teacher", role=User.Role.TEACHER))
+
+    def student(self, code, *jobs, hours=0):
+        student = Student.objects.create(user=User.objects.create(username=code), student_code=code,
+                                         firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        if hours:
+            TrainingRecord.objects.create(student=student, topic="อบรม", date=datetime.date(2025, 6, 1), hours=hours,
+                                          get_hours=hours, status='APPROVED', proof_file="training_proofs/proof.pdf")
+        for status, year, weeks in jobs:
+            job = JobApplication.objects.create(
+                student=student, company=self.company, position="Developer", status=status,
+                start_date=datetime.date(year, 6, 1), end_date=datetime.date(year, 9, 30), supervisor_name="พี่เลี้ยง",
+            )
+            for week in range(1, weeks + 1):
+                WeeklyReport.objects.create(job_application=job, week_number=week, work_summary="งาน")
+        return student
+
+    def rows(self, **params):
+        context = self.client.get(reverse('teacher-dashboard'), params).context
+        return context, {
+            s.student_code: (s.display_year, s.job_status or None, s.current_week, s.training_hours)
+            for s in context['students']
+        }
+
+    def test_row_values_follow_latest_application(self):
+        self.student("6601001", hours=12)
+        self.student("6601002", ('PENDING', 2025, 0), hours=30)
+        self.student("6601003", ('APPROVED', 2025, 3))
+        self.student("6601004", ('COMPLETED', 2024, 2))
+        # ใบสมัครล่าสุดถูกปฏิเสธ: ไม่แสดงปีของงานเก่า ไม่แสดงสัปดาห์
+        self.student("6601005", ('APPROVED', 2024, 4), ('REJECTED', 2025, 0))
+
+        _context, rows = self.rows()
+        self.assertEqual(rows, {
+            "6601001": ('ยังไม่สมัครงาน', None, 0, 12),
+            "6601002": ('ยังไม่สมัครงาน', 'PENDING', 0, 30),
+            "6601003": (2568, 'APPROVED', 3, 0),
+            "6601004": (2567, 'COMPLETED', 0, 0),
+            "6601005": ('ยังไม่สมัครงาน', 'REJECTED', 0, 0),
+        })
+
+    def test_counters_count_each_student_once(self):
+        # นักศึกษาที่มีใบสมัครอนุมัติหลายใบนับเป็น 1 คน
+        self.student("6601001", ('APPROVED', 2024, 0), ('APPROVED', 2025, 0))
+        self.student("6601002", ('COMPLETED', 2024, 0), ('APPROVED', 2025, 0))
+        self.student("6601003")
+
+        context, _rows = self.rows()
+        self.assertEqual((context['total_count'], context['coop_count'], context['finished_count']), (3, 2, 1))
+        self.assertEqual(context['academic_year'], [2568, 2567, 'NONE'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(reverse('teacher-dashboard'))
+            return len(captured)
+
+        self.student("6601001", ('APPROVED', 2025, 2), hours=6)
+        few = queries()
+        for index in range(2, 6):
+            self.student(f"660100{index}", ('APPROVED', 2025, index), hours=6)
+        self.assertEqual(queries(), few)
+
+    def test_year_filter(self):
+        self.student("6601001", ('APPROVED', 2025, 0))
+        self.student("6601002", ('COMPLETED', 2024, 0))
+        self.student("6601003", ('PENDING', 2025, 0))
+
+        self.assertEqual(list(self.rows(year='2568')[1]), ["6601001"])
+        self.assertEqual(list(self.rows(year='NONE')[1]), ["6601003"])
+        self.assertEqual(list(self.rows(q='6601002')[1]), ["6601002"])
+
+
+class CompanySummaryTests(TestCase):
+    """ หน้าสรุปบริษัท (get_company_summary_context): นับตาม company_id และแบ่งหน้าใน DB """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create(username="teacher", role=User.Role.TEACHER))
+        self.codes = iter(range(6601001, 6602000))
+
+    def job(self, company, status='APPROVED', year=2025, position="Developer"):
+        code = str(next(self.codes))
+        student = Student.objects.create(user=User.objects.create(username=code), student_code=code,
+                                         firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        return JobApplication.objects.create(
+            student=student, company=company, position=position, status=status,
+            start_date=datetime.date(year, 6, 1), end_date=datetime.date(year, 9, 30), supervisor_name="พี่เลี้ยง",
+        )
+
+    def summary(self, **params):
+        context = self.client.get(reverse('teacher-company-summary'), params).context
+        return context, {c.name: (c.student_count, list(c.years), list(c.positions)) for c in context['page_obj']}
+
+    def test_counts_follow_the_company_not_its_name(self):
+        # เดิมจับคู่ด้วย company__name__icontains ทำให้ "ABC" นับรวมนักศึกษาของ "ABC Group"
+        abc = CompanyMaster.objects.create(name="ABC")
+        group = CompanyMaster.objects.create(name="ABC Group")
+        self.job(abc, year=2024, position="Tester")
+        self.job(abc, status='COMPLETED', year=2025)
+        self.job(abc, year=2025)
+        self.job(abc, status='PENDING', year=2023, position="Designer")  # ยังไม่อนุมัติ ไม่นับ
+        self.job(group, year=2023, position="Analyst")
+        self.job(group, status='REJECTED')
+
+        _context, rows = self.summary()
+        self.assertEqual(rows, {
+            "ABC": (3, [2568, 2567], ["Developer", "Tester"]),
+            "ABC Group": (1, [2566], ["Analyst"]),
+        })
+
+    def test_pages_and_search_in_database(self):
+        for index in range(12):
+            self.job(CompanyMaster.objects.create(name=f"บริษัท {index:02d}", teacher_notes="ดีมาก" if index == 3 else ""))
+
+        context, rows = self.summary(page=2)
+        self.assertEqual(context['all_companies'], 12)
+        self.assertEqual(list(rows), ["บริษัท 10", "บริษัท 11"])
+        self.assertEqual(context['page_obj'].paginator.count, 12)
+        self.assertEqual(list(self.summary(q="ดีมาก")[1]), ["บริษัท 03"])
+
+    def test_query_count_does_not_grow_with_companies(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(reverse('teacher-company-summary'))
+            return len(captured)
+
+        self.job(CompanyMaster.objects.create(name="บริษัท 00"))
+        few = queries()
+        for index in range(1, 10):
+            company = CompanyMaster.objects.create(name=f"บริษัท {index:02d}")
+            self.job(company, year=2024)
+            self.job(company, position="Tester")
+        self.assertEqual(queries(), few)
+
+
+class CoopDocxCacheTests(TestCase):
+    """ ไฟล์ใบสมัครถูก cache ตามข้อมูลที่ลงในไฟล์ แก้ข้อมูลแล้วต้องได้ไฟล์ใหม่ """
+
+    def setUp(self):
+        cache.clear()
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด", address="อุบลราชธานี")
+        user = User.objects.create(username="6601001", first_name="สมชาย", last_name="ใจดี")
+        student = Student.objects.create(
+            user=user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI"
+        )
+        self.job = JobApplication.objects.create(
+            student=student, company=company, position="Developer", status='APPROVED',
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30),
+            supervisor_name="พี่เลี้ยง",
+        )
+
+    def document_xml(self, buffer):
+        return zipfile.ZipFile(io.BytesIO(buffer.getvalue())).read('word/document.xml').decode('utf-8')
+
+    def test_repeat_download_served_from_cache(self):
+        first = generate_coop_docx(self.job)
+        self.assertIn("6601001", self.document_xml(first))
+        with self.assertNumQueries(0):
+            second = generate_coop_docx(self.job)
+        self.assertEqual(first.getvalue(), second.getvalue())
+
+    def test_changed_application_renders_again(self):
+        generate_coop_docx(self.job)
+        self.job.supervisor_name = "คุณวิชัย"
+        self.job.save()
+        self.assertIn("คุณวิชัย", self.document_xml(generate_coop_docx(self.job)))
+
+
+class AnnouncementCacheTests(TestCase):
+    """ รายการประกาศมาจาก cache ที่เปลี่ยนเวอร์ชันทุกครั้งที่ประกาศถูกบันทึก/ลบ """
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(username="teacher", role=User.Role.TEACHER)
+        self.student = User.objects.create(username="6601001")
+        self.news = Announcement.objects.create(title="กำหนดส่งรายงาน", content="...")
+        Announcement.objects.create(title="ร่างประกาศ", content="...", is_published=False)
+
+    def test_repeat_read_served_from_cache(self):
+        first = announcement_lists()
+        with self.assertNumQueries(0):
+            second = announcement_lists()
+        self.assertEqual([item.title for item in second['announcements']], ["กำหนดส่งรายงาน"])
+        self.assertEqual(first, second)
+
+    def test_lists_are_cached_per_audience(self):
+        self.assertEqual(len(announcement_lists()['announcements']), 1)
+        self.assertEqual(len(announcement_lists(include_unpublished=True)['announcements']), 2)
+
+    def test_documents_come_from_same_query(self):
+        Announcement.objects.create(title="แบบฟอร์ม", content="...", attachment="uploads/announcements/form.pdf")
+        with self.assertNumQueries(1):
+            lists = announcement_lists()
+        self.assertEqual([item.title for item in lists['documents']], ["แบบฟอร์ม"])
+
+    def test_htmx_create_and_delete_invalidate(self):
+        self.client.force_login(self.student)
+        self.assertNotContains(self.client.get(reverse('student-news')), "ประกาศผลสัมภาษณ์")
+
+        self.client.force_login(self.teacher)
+        response = self.client.post(reverse('create-announcement'),
+                                    {'title': 'ประกาศผลสัมภาษณ์', 'content': '...', 'is_published': 'on'})
+        self.assertContains(response, "ประกาศผลสัมภาษณ์")
+        self.assertContains(self.client.post(reverse('delete-announcement', args=[self.news.pk])), "ประกาศผลสัมภาษณ์")
+
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student-news'))
+        self.assertContains(response, "ประกาศผลสัมภาษณ์")
+        self.assertNotContains(response, "กำหนดส่งรายงาน")
+
+
+class FragmentCacheTests(TestCase):
+    """ HTMX partial ของหน้าอาจารย์ cache ตามตัวกรอง/หน้า และหมดอายุเมื่อ model ที่อ่านถูกเขียน """
+
+    def setUp(self):
+        cache.clear()
+        self.company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        user = User.objects.create(username="6601001")
+        self.student = Student.objects.create(user=user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        self.job = JobApplication.objects.create(
+            student=self.student, company=self.company, position="Developer",
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+        )
+        self.client.force_login(User.objects.create(username="teacher", role=User.Role.TEACHER))
+
+    def get_list(self, **params):
+        return self.client.get(reverse('teacher-verify-job'), params, headers={'HX-Request': 'true'})
+
+    def hits(self, fragment='job_list'):
+        return REGISTRY.get_sample_value('coop_fragment_cache_requests_total', {'fragment': fragment, 'cache': 'hit'}) or 0
+
+    def test_repeat_request_served_from_cache(self):
+        first = self.get_list(q="สมชาย")
+        hits = self.hits()
+        with self.assertNumQueries(1):  # โหลด user เท่านั้น (session อยู่ใน cache)
+            second = self.get_list(q="สมชาย")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(self.hits(), hits + 1)
+
+    def test_filter_and_page_are_part_of_key(self):
+        self.assertContains(self.get_list(), "Developer")
+        self.assertNotContains(self.get_list(q="ไม่มีชื่อนี้"), "Developer")
+
+    def test_writes_invalidate(self):
+        self.assertContains(self.get_list(), "Developer")
+        self.job.position = "Data Engineer"
+        self.job.save()
+        self.assertContains(self.get_list(), "Data Engineer")
+
+        self.client.post(reverse('bulk-verify-job'), {'ids': [self.job.pk], 'action': 'reject', 'teacher_note': 'ไม่ผ่าน'})
+        self.assertContains(self.get_list(), "ไม่อนุมัติ")
+
+    def test_related_model_write_invalidates_other_pages(self):
+        url = reverse('teacher-company-summary')
+        self.client.get(url, headers={'HX-Request': 'true'})
+        self.company.name = "บริษัท ใหม่ จำกัด"
+        self.company.save()
+        self.assertContains(self.client.get(url, headers={'HX-Request': 'true'}), "บริษัท ใหม่ จำกัด")
+        self.assertContains(self.get_list(), "บริษัท ใหม่ จำกัด")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BackgroundTaskTests(TestCase):
+    """ คิวงานเบื้องหลัง: view ส่งงานเข้าคิว -> run_worker ประมวลผล -> poll สถานะ/ดาวน์โหลด """
+
+    def setUp(self):
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        self.user = User.objects.create_user(username="6601001", password="x", first_name="สมชาย", last_name="ใจดี")
+        student = Student.objects.create(
+            user=self.user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI"
+        )
+        self.job = JobApplication.objects.create(
+            student=student, company=company, position="Developer", status='APPROVED',
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30),
+            supervisor_name="พี่เลี้ยง",
+        )
+
+    def test_coop_form_task_round_trip(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('request-coop-form', args=[self.job.pk]), HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'every 2s')
+        task = BackgroundTask.objects.get()
+        self.assertEqual(task.status, BackgroundTask.Status.QUEUED)
+
+        call_command('run_worker', once=True, stdout=io.StringIO())
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.Status.DONE)
+        response = self.client.get(reverse('task-status', args=[task.pk]), HTTP_HX_REQUEST='true')
+        self.assertEqual(response['HX-Trigger'], 'task-finished')
+        self.assertContains(response, reverse('task-download', args=[task.pk]))
+        download = self.client.get(reverse('task-download', args=[task.pk]))
+        self.assertIn("6601001", zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content))).read('word/document.xml').decode('utf-8'))
+
+    def test_claim_records_attempt_and_heartbeat(self):
+        enqueue('coop_form', job_id=self.job.pk)
+        task = claim_next_task()
+        self.assertEqual((task.status, task.attempts), (BackgroundTask.Status.RUNNING, 1))
+        self.assertIsNotNone(task.heartbeat_at)
+
+    def test_stale_running_tasks_are_reclaimed(self):
+        long_ago = timezone.now() - TASK_STALE_AFTER - datetime.timedelta(minutes=1)
+        running = dict(status=BackgroundTask.Status.RUNNING, task_name='coop_form', arguments={'job_id': self.job.pk})
+        crashed = BackgroundTask.objects.create(**running, attempts=1, started_at=long_ago, heartbeat_at=long_ago)
+        hopeless = BackgroundTask.objects.create(**running, attempts=MAX_ATTEMPTS, started_at=long_ago, heartbeat_at=long_ago)
+        legacy = BackgroundTask.objects.create(**running, attempts=0, started_at=long_ago)  # ก่อนมี heartbeat_at
+        alive = BackgroundTask.objects.create(**running, attempts=1, started_at=long_ago, heartbeat_at=timezone.now())
+
+        self.assertEqual(reclaim_stale_tasks(), (2, 1))
+        statuses = dict(BackgroundTask.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[crashed.pk], BackgroundTask.Status.QUEUED)
+        self.assertEqual(statuses[legacy.pk], BackgroundTask.Status.QUEUED)
+        self.assertEqual(statuses[hopeless.pk], BackgroundTask.Status.FAILED)
+        self.assertEqual(statuses[alive.pk], BackgroundTask.Status.RUNNING)
+
+        # worker หยิบงานที่กลับเข้าคิวไปทำจนเสร็จ
+        call_command('run_worker', once=True, stdout=io.StringIO())
+        crashed.refresh_from_db()
+        self.assertEqual((crashed.status, crashed.attempts), (BackgroundTask.Status.DONE, 2))
+
+    def test_auto_generate_accounts_task(self):
+        teacher = User.objects.create_user(username="teacher", password="x", role=User.Role.TEACHER)
+        self.client.force_login(teacher)
+        self.client.post(reverse('auto-gen-accounts'), HTTP_HX_REQUEST='true')
+        call_command('run_worker', once=True, stdout=io.StringIO())
+
+        task = BackgroundTask.objects.get()
+        self.assertEqual(task.status, BackgroundTask.Status.DONE, task.error)
+        self.assertEqual(CompanyProfile.objects.filter(company=self.job.company).count(), 1)
+
+    def test_other_users_cannot_see_task(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('request-coop-form', args=[self.job.pk]), HTTP_HX_REQUEST='true')
+        task = BackgroundTask.objects.get()
+        self.client.force_login(User.objects.create_user(username="6601002", password="x"))
+        self.assertEqual(self.client.get(reverse('task-status', args=[task.pk])).status_code, 403)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CoopFormBatchTests(TestCase):
+    """ ZIP แบบฟอร์มทั้งปีการศึกษา: มีเฉพาะใบสมัครที่อนุมัติแล้วในปีที่เลือก """
+
+    def setUp(self):
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        # ปีการศึกษาคำนวณจาก start_date (มิ.ย. 2025 = 2568, มิ.ย. 2024 = 2567)
+        for code, status, year in [("6601001", 'APPROVED', 2025), ("6601002", 'APPROVED', 2025),
+                                   ("6601003", 'PENDING', 2025), ("6601004", 'APPROVED', 2024)]:
+            user = User.objects.create(username=code)
+            student = Student.objects.create(user=user, student_code=code, firstname="สมชาย", lastname="ใจดี", major="DSSI")
+            JobApplication.objects.create(
+                student=student, company=company, position="Developer", status=status,
+                start_date=datetime.date(year, 6, 1), end_date=datetime.date(year, 9, 30),
+            )
+        self.teacher = User.objects.create_user(username="teacher", password="x", role=User.Role.TEACHER)
+
+    def test_teacher_downloads_year_as_zip(self):
+        # web แค่ส่งงานเข้าคิว (ไม่สร้าง Process Pool ใน request) worker เป็นคน render
+        self.client.force_login(self.teacher)
+        response = self.client.post(reverse('teacher-coop-forms-zip'), {'year': 2568}, HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'every 2s')
+        task = BackgroundTask.objects.get()
+        self.assertEqual((task.task_name, task.arguments), ('coop_forms_zip', {'year': 2568}))
+
+        call_command('run_worker', once=True, stdout=io.StringIO())
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.progress), (BackgroundTask.Status.DONE, 100))
+        self.assertIn("2 ฉบับ", task.message)
+        download = self.client.get(reverse('task-download', args=[task.pk]))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content)))
+        names = sorted(archive.namelist())
+        self.assertEqual(len(names), 2)
+        self.assertTrue(names[0].startswith("coop_form_6601001_"))
+        document = zipfile.ZipFile(io.BytesIO(archive.read(names[1]))).read('word/document.xml').decode('utf-8')
+        self.assertIn("6601002", document)
+
+    def test_rejects_bad_year_and_get(self):
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.post(reverse('teacher-coop-forms-zip'), {'year': 'NONE'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('teacher-coop-forms-zip')).status_code, 405)
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_command_reports_throughput(self):
+        output = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            call_command('export_coop_forms', year=2568, workers=2, output=f"{tmp}/forms.zip", stdout=output)
+            self.assertEqual(len(zipfile.ZipFile(f"{tmp}/forms.zip").namelist()), 2)
+        self.assertIn("ฉบับ/วินาที", output.getvalue())
+
+
+class ExportTests(TestCase):
+    """ Export CSV/XLSX ตามตัวกรองของหน้าตรวจสอบ """
+
+    def setUp(self):
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        for code, firstname, year in [("6601001", "สมชาย", 2025), ("6601002", "สมหญิง", 2024)]:
+            user = User.objects.create(username=code)
+            student = Student.objects.create(user=user, student_code=code, firstname=firstname, lastname="ใจดี", major="DSSI")
+            job = JobApplication.objects.create(
+                student=student, company=company, position="Developer", status='APPROVED',
+                start_date=datetime.date(year, 6, 1), end_date=datetime.date(year, 9, 30),
+            )
+            Evaluation.objects.create(job_application=job, q1_1=5, q5_3=4, status='SUBMITTED')
+        self.teacher = User.objects.create_user(username="teacher", password="x", role=User.Role.TEACHER)
+        self.client.force_login(self.teacher)
+
+    def export(self, dataset, **params):
+        response = self.client.get(reverse('teacher-export', args=[dataset]), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_jobs_csv_follows_year_filter(self):
+        rows = list(csv.reader(io.StringIO(self.export('jobs', year='2568').decode('utf-8-sig'))))
+        self.assertEqual(rows[0][0], 'รหัสนักศึกษา')
+        self.assertEqual([row[0] for row in rows[1:]], ["6601001"])
+
+    def test_evaluation_scores_xlsx(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export('evaluations', format='xlsx', q='สมหญิง')))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 2)
+        self.assertIn('Q5.3', sheet)
+        self.assertIn('6601002', sheet)
+        self.assertNotIn('6601001', sheet)
+
+    def page_codes(self, url_name, **params):
+        context = self.client.get(reverse(url_name), params).context
+        rows = [*context['pending_list'], *context['page_obj']]
+        return sorted(row.student.student_code for row in rows)
+
+    def export_codes(self, dataset, **params):
+        rows = list(csv.reader(io.StringIO(self.export(dataset, **params).decode('utf-8-sig'))))
+        return sorted(row[0] for row in rows[1:])
+
+    def test_export_rows_match_list_page(self):
+        # ใบสมัครที่ยังไม่อนุมัติแต่มีผลประเมินค้างอยู่ ไม่แสดงในหน้าตรวจผลประเมิน export ก็ต้องไม่มี
+        user = User.objects.create(username="6601003")
+        student = Student.objects.create(user=user, student_code="6601003", firstname="สมศรี", lastname="ใจดี", major="DSSI")
+        job = JobApplication.objects.create(
+            student=student, company=CompanyMaster.objects.get(), position="Developer", status='PENDING',
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30),
+        )
+        Evaluation.objects.create(job_application=job, status='SUBMITTED')
+
+        # ?year= ของหน้าใบสมัครเป็น icontains (พิมพ์ไม่ครบปีก็เจอ)
+        for params in [{'year': '256'}, {'year': '2568'}, {'q': 'สม'}, {}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.export_codes('jobs', **params), self.page_codes('teacher-verify-job', **params))
+        for params in [{'q': 'ใจดี'}, {'year': '2568'}, {}]:
+            with self.subTest(params=params):
+                codes = self.page_codes('teacher-verify-evaluation', **params)
+                self.assertNotIn("6601003", codes)
+                self.assertEqual(self.export_codes('evaluations', **params), codes)
+        self.assertEqual(self.page_codes('teacher-verify-job', year='256'), ["6601001", "6601002", "6601003"])
+
+    def test_unknown_dataset(self):
+        self.assertEqual(self.client.get(reverse('teacher-export', args=['users'])).status_code, 400)
+
+    def test_formula_cells_are_neutralised(self):
+        # ข้อความที่ผู้ใช้กรอกซึ่ง Excel ตีความเป็นสูตรได้ ต้องถูกเติม ' นำหน้าทั้ง CSV และ XLSX
+        JobApplication.objects.filter(student__student_code="6601001").update(
+            teacher_note='=HYPERLINK("http://evil.example","คลิก")', supervisor_phone="+66812345678",
+            position="@SUM(A1)",
+        )
+        rows = list(csv.reader(io.StringIO(self.export('jobs', year='2568').decode('utf-8-sig'))))
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row['หมายเหตุอาจารย์'], '\'=HYPERLINK("http://evil.example","คลิก")')
+        self.assertEqual(row['เบอร์พี่เลี้ยง'], "'+66812345678")
+        self.assertEqual(row['ตำแหน่ง'], "'@SUM(A1)")
+        self.assertEqual(row['ปีการศึกษา'], "2568")
+
+        archive = zipfile.ZipFile(io.BytesIO(self.export('jobs', year='2568', format='xlsx')))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn("<t xml:space=\"preserve\">'=HYPERLINK(", sheet)
+        self.assertIn("<t xml:space=\"preserve\">'+66812345678</t>", sheet)
+        self.assertNotIn('>=HYPERLINK', sheet)
+
+    async def test_streams_incrementally_under_asgi(self):
+        # ใต้ ASGI ต้องได้ async iterator ที่ดึงแถวทีละ chunk ไม่ใช่ sync_to_async(list) ทั้งไฟล์ก่อนส่ง
+        consumed = []
+
+        def tracked_export_rows(dataset, params):
+            filename, headers, rows = export_rows(dataset, params)
+
+            def tracked():
+                for row in rows:
+                    consumed.append(row)
+                    yield row
+            return filename, headers, tracked()
+
+        await self.async_client.aforce_login(self.teacher)
+        with mock.patch('coopstack.views.export_rows', tracked_export_rows), \
+                mock.patch('coopstack.exports.EXPORT_CHUNK_SIZE', 1):
+            response = await self.async_client.get(reverse('teacher-export', args=['jobs']))
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            self.assertIn('รหัสนักศึกษา'.encode('utf-8'), await anext(chunks))
+            self.assertEqual(consumed, [])
+            await anext(chunks)
+            self.assertEqual(len(consumed), 1)
+            self.assertEqual(len([chunk async for chunk in chunks]), 1)
+        self.assertEqual(len(consumed), 2)
+
+
+
+class ImportStudentsTests(TestCase):
+    """ import_students: diff กับข้อมูลเดิมแล้วบันทึกแบบ bulk """
+
+    def setUp(self):
+        AllowedStudent.objects.create(student_code="6601001", title="นาย", firstname="สมชาย", lastname="ใจดี",
+                                      major="วิทยาการข้อมูลและนวัตกรรมซอฟต์แวร์")
+        AllowedStudent.objects.create(student_code="6601002", title="นาย", firstname="ชื่อเดิม", lastname="ใจดี",
+                                      major="วิทยาการข้อมูลและนวัตกรรมซอฟต์แวร์")
+        self.csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8-sig', delete=False)
+        self.csv_file.write("ID,Name\n6601001,นายสมชาย ใจดี\n6601002,นางสาวสมหญิง ใจดี\n6601003,ว่าที่ร้อยตรีประเสริฐ มีสุข\n")
+        self.csv_file.close()
+
+    def tearDown(self):
+        os.remove(self.csv_file.name)
+
+    def test_bulk_import(self):
+        output = io.StringIO()
+        # 1 lookup + savepoint/insert/update (ไม่ขึ้นกับจำนวนแถว)
+        with self.assertNumQueries(5):
+            call_command('import_students', self.csv_file.name, chunk_size=2, stdout=output)
+        self.assertIn("สร้างใหม่: 1 คน, อัปเดต: 1 คน, ไม่เปลี่ยนแปลง: 1 คน", output.getvalue())
+        updated = AllowedStudent.objects.get(student_code="6601002")
+        self.assertEqual((updated.title, updated.firstname), ("นางสาว", "สมหญิง"))
+        self.assertEqual(AllowedStudent.objects.get(student_code="6601003").title, "ว่าที่ร้อยตรี")
+
+    def test_dry_run_writes_nothing(self):
+        call_command('import_students', self.csv_file.name, dry_run=True, stdout=io.StringIO())
+        self.assertEqual(AllowedStudent.objects.count(), 2)
+        self.assertEqual(AllowedStudent.objects.get(student_code="6601002").firstname, "ชื่อเดิม")
+
+
+class StudentProgressTests(TestCase):
+    """ StudentProgress ตาม signals (บันทึก/ลบข้อมูลต้นทาง), คำสั่ง rebuild_progress และ migration backfill """
+
+    def setUp(self):
+        cache.clear()
+        self.company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        self.student = Student.objects.create(
+            user=User.objects.create(username="6601001"),
+            student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI",
+        )
+
+    def progress(self):
+        return StudentProgress.objects.get(student=self.student)
+
+    def job(self, status='APPROVED', **fields):
+        return JobApplication.objects.create(
+            student=self.student, company=self.company, position="Developer", status=status,
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+            **fields,
+        )
+
+    def test_new_student_gets_empty_row(self):
+        progress = self.progress()
+        self.assertEqual((progress.training_hours, progress.job_status, progress.current_job_id), (0, '', None))
+
+    def test_saving_source_records_updates_row(self):
+        training = TrainingRecord.objects.create(student=self.student, topic="อบรม", date=datetime.date(2025, 6, 1),
+                                                 hours=6, proof_file="training_proofs/proof.pdf")
+        self.assertEqual(self.progress().training_hours, 0)  # ยังไม่อนุมัติ
+        training.status, training.get_hours = 'APPROVED', 5
+        training.save()
+        self.assertEqual(self.progress().training_hours, 5)
+
+        placed = self.job()
+        later = self.job(status='PENDING')  # ใบสมัครใหม่กว่าที่ยังไม่อนุมัติ ไม่แทนที่งานที่ติดตามอยู่
+        WeeklyReport.objects.create(job_application=placed, week_number=1, work_summary="งาน", status='ACKNOWLEDGED')
+        WeeklyReport.objects.create(job_application=placed, week_number=2, work_summary="งาน")
+        Evaluation.objects.create(job_application=placed, status='SUBMITTED')
+
+        progress = self.progress()
+        self.assertEqual((progress.latest_job_id, progress.job_status), (later.pk, 'PENDING'))
+        self.assertEqual(progress.academic_year, 2568)
+        self.assertEqual(progress.current_job_id, placed.pk)
+        # สัปดาห์/จำนวนรายงานนับจากใบสมัครล่าสุด ส่วนรายงานที่ตรวจแล้วและผลประเมินนับจากงานที่ติดตาม
+        self.assertEqual((progress.current_week, progress.report_count, progress.acknowledged_reports), (0, 0, 1))
+        self.assertEqual(progress.evaluation_status, 'SUBMITTED')
+
+        later.delete()
+        progress = self.progress()
+        self.assertEqual((progress.current_week, progress.report_count, progress.acknowledged_reports), (2, 2, 1))
+
+    def test_pages_keep_their_original_numbers(self):
+        # ค่าที่หน้าเว็บแสดงต้องเท่ากับก่อนย้ายมาอ่านจาก StudentProgress
+        TrainingRecord.objects.create(student=self.student, topic="อบรม", date=datetime.date(2025, 6, 1), hours=8,
+                                      get_hours=6, status='APPROVED', proof_file="training_proofs/proof.pdf")
+        TrainingRecord.objects.create(student=self.student, topic="อบรม", date=datetime.date(2025, 6, 2), hours=4,
+                                      proof_file="training_proofs/proof.pdf")
+        placed = self.job()
+        WeeklyReport.objects.create(job_application=placed, week_number=1, work_summary="งาน", status='ACKNOWLEDGED')
+        WeeklyReport.objects.create(job_application=placed, week_number=2, work_summary="งาน")
+        later = self.job(status='PENDING')
+
+        # dashboard นักศึกษา: ชั่วโมงที่ได้รับจริง (get_hours) และจำนวนรายงานของใบสมัครล่าสุด
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('student-dashboard'))
+        self.assertEqual((response.context['training_hours'], response.context['reports_count']), (6, 0))
+        later.delete()
+        self.assertEqual(self.client.get(reverse('student-dashboard')).context['reports_count'], 2)
+
+        # รายละเอียดนักศึกษาของอาจารย์: ชั่วโมงที่เคลม (hours) ของรายการที่อนุมัติ และรายงานที่ตรวจแล้วของงานที่ติดตาม
+        self.client.force_login(User.objects.create(username="teacher", role=User.Role.TEACHER))
+        response = self.client.get(reverse('get-student-detail-modal', args=[self.student.pk]))
+        self.assertEqual(response.context['training']['hours'], 8)
+        self.assertEqual(response.context['reports']['count'], 1)
+
+    def test_deleting_source_records_updates_row(self):
+        job = self.job()
+        report = WeeklyReport.objects.create(job_application=job, week_number=1, work_summary="งาน")
+        evaluation = Evaluation.objects.create(job_application=job, status='SUBMITTED')
+
+        report.delete()
+        evaluation.delete()
+        progress = self.progress()
+        self.assertEqual((progress.report_count, progress.current_week, progress.evaluation_status), (0, 0, ''))
+
+        WeeklyReport.objects.create(job_application=job, week_number=1, work_summary="งาน")
+        job.delete()  # ลบแบบ cascade ไปที่รายงาน
+        progress = self.progress()
+        self.assertEqual((progress.latest_job_id, progress.current_job_id, progress.report_count), (None, None, 0))
+
+    def test_deleting_student_does_not_recreate_row(self):
+        job = self.job()
+        WeeklyReport.objects.create(job_application=job, week_number=1, work_summary="งาน")
+        TrainingRecord.objects.create(student=self.student, topic="อบรม", date=datetime.date(2025, 6, 1),
+                                      hours=6, proof_file="training_proofs/proof.pdf")
+        self.student.user.delete()
+        self.assertFalse(StudentProgress.objects.exists())
+
+    def test_rebuild_progress_command(self):
+        job = self.job()
+        WeeklyReport.objects.create(job_application=job, week_number=3, work_summary="งาน")
+        # update() ไม่ส่ง signals: แถวล้าสมัยจนกว่าจะ rebuild
+        StudentProgress.objects.all().delete()
+        other = Student.objects.create(user=User.objects.create(username="6601002"), student_code="6601002",
+                                       firstname="สมหญิง", lastname="ใจดี", major="DSSI")
+        StudentProgress.objects.filter(student=other).update(training_hours=99)
+
+        output = io.StringIO()
+        call_command('rebuild_progress', batch_size=1, stdout=output)
+        self.assertIn("อัปเดต 2 คน", output.getvalue())
+        self.assertEqual((self.progress().current_job_id, self.progress().current_week), (job.pk, 3))
+        self.assertEqual(StudentProgress.objects.get(student=other).training_hours, 0)
+
+    def test_migration_backfills_existing_students(self):
+        StudentProgress.objects.all().delete()
+        self.job()
+        # ใช้ model ตามสถานะ migration (ไม่ใช่ model ปัจจุบัน) เหมือนตอน migrate จริง
+        state = MigrationLoader(connection).project_state(('coopstack', '0022_backfill_student_progress'))
+        migration = import_module('coopstack.migrations.0022_backfill_student_progress')
+        migration.backfill_progress(state.apps, None)
+        migration.backfill_progress(state.apps, None)  # รันซ้ำได้
+        progress = self.progress()
+        self.assertEqual((progress.job_status, progress.current_job_id), ('APPROVED', JobApplication.objects.get().pk))
+        self.assertEqual(StudentProgress.objects.count(), 1)
+
+
+class GenerateMockDataTests(TestCase):
+    """ generate_mock_data: สร้างข้อมูลจำลองแบบ bulk และ StudentProgress ครบทุกคน """
+
+    def test_generates_requested_volume(self):
+        call_command('generate_mock_data', students=30, companies=3, years=2, reports=2,
+                     batch_size=10, stdout=io.StringIO())
+        self.assertEqual(Student.objects.count(), 30)
+        self.assertEqual(CompanyMaster.objects.count(), 3)
+        self.assertEqual(CompanyProfile.objects.count(), 6)
+        self.assertEqual(StudentProgress.objects.count(), 30)
+        self.assertFalse(JobApplication.objects.filter(academic_year__isnull=True).exists())
+        self.assertTrue(User.objects.get(username="teacher").check_password("password123"))
+
+
+class LoadTestStatsTests(TestCase):
+    """ สถิติของ load_test: percentile แบบ nearest-rank และ error ต่อ endpoint """
+
+    def test_percentiles_and_errors(self):
+        stats = Stats()
+        for ms in range(1, 101):
+            stats.record('teacher-dashboard', ms / 1000, ok=ms != 100)
+        label, count, errors, rps, p50, p95, p99, slowest = stats.rows(elapsed=10)[0]
+        self.assertEqual((label, count, errors, rps), ('teacher-dashboard', 100, 1, 10))
+        self.assertEqual([round(value) for value in (p50, p95, p99, slowest)], [50, 95, 99, 100])
+
+    def test_total_over_endpoints(self):
+        stats = Stats()
+        for ms in range(1, 51):
+            stats.record('student-dashboard', ms / 1000, ok=True)
+            stats.record('student-news', (ms + 50) / 1000, ok=ms != 50)
+        label, count, errors, rps, p50, p95, p99, slowest = stats.total(elapsed=10)
+        self.assertEqual((label, count, errors, rps), ('total', 100, 1, 10))
+        self.assertEqual([round(value) for value in (p50, p95, slowest)], [50, 95, 100])
+        self.assertEqual(stats.total(elapsed=10, exclude=('student-news',))[1:3], (50, 0))
+
+    def test_client_sends_host_through_proxy(self):
+        """ ยิงผ่าน https://nginx แต่ Host / Referer ต้องเป็นชื่อที่อยู่ใน ALLOWED_HOSTS / CSRF_TRUSTED_ORIGINS """
+        client = LoadTestClient('https://nginx/', host='localhost', insecure=True)
+        https = next(h for h in client.opener.handlers if isinstance(h, urllib.request.HTTPSHandler))
+        self.assertFalse(https._context.check_hostname)
+
+        sent = []
+        response = mock.MagicMock(status=200)
+        response.__enter__.return_value = response
+        response.geturl.return_value = 'https://nginx/'
+        response.read.return_value = b'<input name="csrfmiddlewaretoken" value="abc">'
+        with mock.patch.object(client.opener, 'open', side_effect=lambda request, timeout: sent.append(request) or response):
+            client.login('student', 'password123')
+        self.assertEqual([request.full_url for request in sent], ['https://nginx' + reverse('login')] * 2)
+        self.assertEqual({request.get_header('Host') for request in sent}, {'localhost'})
+        self.assertEqual(sent[1].get_header('Referer'), 'https://localhost' + reverse('login'))
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """ Server-Timing header และ slow request log ของ coopstack.instrumentation """
+
+    def setUp(self):
+        self.teacher = User.objects.create(username="teacher", role=User.Role.TEACHER)
+        self.client.force_login(self.teacher)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('teacher-verify-job'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertNotIn('tpl;dur=0.0,', timing)
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs('coopstack.performance', 'WARNING') as logs:
+            self.client.get(reverse('teacher-verify-job'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'teacher-verify-job')
+        self.assertEqual(entry['status'], 200)
+        self.assertGreater(entry['queries'], 0)
+        self.assertTrue(entry['top_sql'][0]['sql'].startswith('SELECT'))
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        self.assertFalse(self.client.get(reverse('teacher-verify-job')).has_header('Server-Timing'))
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsTests(TestCase):
+    """ /metrics: ต้องยืนยันตัวตน และมี metric ของ request / คิวงานค้าง """
+
+    def setUp(self):
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        user = User.objects.create(username="6601001")
+        student = Student.objects.create(user=user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        JobApplication.objects.create(
+            student=student, company=company, position="Developer",
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+        )
+
+    def test_requires_token_or_admin(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.client.force_login(User.objects.create(username="teacher", role=User.Role.TEACHER))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.client.force_login(User.objects.create(username="admin", role=User.Role.ADMIN))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_exposes_request_and_queue_metrics(self):
+        self.client.get(reverse('login'))
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer scrape-token'})
+        body = response.content.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('coop_http_request_duration_seconds_bucket{le="0.005",method="GET",view="login"}', body)
+        self.assertIn('coop_http_responses_total{status="200",view="login"}', body)
+        self.assertIn('coop_pending_items{queue="jobs"} 1.0', body)
+        self.assertIn('coop_docx_render_seconds_count', body)
+
+    def test_worker_process_samples_reach_web_metrics(self):
+        # process แยก (แทน container worker) render แบบฟอร์มลงโฟลเดอร์ metrics เดียวกับ web (volume ที่แชร์กัน)
+        worker = (
+            "import django; django.setup()\n"
+            "from coopstack.utils import coop_form_renderer\n"
+            "coop_form_renderer.render({'student_id': '6601001'})\n"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            subprocess.run([sys.executable, '-c', worker], cwd=settings.BASE_DIR, check=True,
+                           env={**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory})
+            self.assertTrue(all(name.endswith('.db') and '-' in name for name in os.listdir(directory)))
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer scrape-token'})
+        self.assertIn('coop_docx_render_seconds_count 1.0', response.content.decode())
+
+
+class KeysetPaginationTests(TestCase):
+    """ KeysetPaginator: เดินหน้า/ย้อนหลังได้ครบทุกแถวแม้เวลาซ้ำกัน และหน้าลึกใช้ query เท่าหน้าแรก """
+
+    @classmethod
+    def setUpTestData(cls):
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        for index in range(23):
+            user = User.objects.create(username=f"66010{index:02d}")
+            student = Student.objects.create(user=user, student_code=f"66010{index:02d}", firstname="สมชาย",
+                                             lastname="ใจดี", major="DSSI")
+            JobApplication.objects.create(
+                student=student, company=company, position="Developer", status='APPROVED',
+                start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+            )
+        # เวลาซ้ำกันเป็นกลุ่ม ให้ลำดับต้องพึ่ง id
+        for job in JobApplication.objects.all():
+            JobApplication.objects.filter(pk=job.pk).update(
+                created_at=datetime.datetime(2025, 6, 1 + job.pk % 4, tzinfo=datetime.timezone.utc)
+            )
+        cls.queryset = JobApplication.objects.order_by('-created_at')
+        cls.expected = list(cls.queryset.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, direction, page, queryset=None):
+        queryset = self.queryset if queryset is None else queryset
+        seen = [[job.id for job in page]]
+        cursor = 'next_cursor' if direction == 'after' else 'previous_cursor'
+        has_more = page.has_next if direction == 'after' else page.has_previous
+        while has_more():
+            page = KeysetPaginator(queryset, 5).get_page({direction: getattr(page, cursor)})
+            has_more = page.has_next if direction == 'after' else page.has_previous
+            seen.append([job.id for job in page])
+        return seen, page
+
+    def test_forward_and_backward(self):
+        pages, last_page = self.walk('after', KeysetPaginator(self.queryset, 5).get_page({}))
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+
+        back, first_page = self.walk('before', last_page)
+        self.assertEqual(back[-1], self.expected[:5])
+        self.assertFalse(first_page.has_previous())
+
+    def test_deep_page_costs_the_same(self):
+        paginator = KeysetPaginator(self.queryset, 5)
+        cursor = paginator.get_page({'after': paginator.get_page({}).next_cursor}).next_cursor
+        with self.assertNumQueries(1):
+            KeysetPaginator(self.queryset, 5).get_page({})
+        with self.assertNumQueries(1):
+            KeysetPaginator(self.queryset, 5).get_page({'after': cursor})
+
+    def test_ranked_search_pages_by_offset(self):
+        # คะแนนแบบ float (เหมือน similarity() ที่เป็น float4) ซ้ำกันเป็นกลุ่ม: ห้ามใส่ลง cursor
+        ranked = JobApplication.objects.annotate(
+            search_rank=ExpressionWrapper(Cast(F('id') % 3, FloatField()) / 3.1, output_field=FloatField())
+        ).order_by('-search_rank', '-created_at')
+        expected = list(ranked.order_by('-search_rank', '-created_at', '-id').values_list('id', flat=True))
+
+        first = KeysetPaginator(ranked, 5).get_page({})
+        self.assertEqual(decode_cursor(first.next_cursor), [5])
+        pages, last_page = self.walk('after', first, ranked)
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+
+        back, first_page = self.walk('before', last_page, ranked)
+        self.assertEqual(sum(back[::-1], []), expected)
+        self.assertFalse(first_page.has_previous())
+
+        with self.assertNumQueries(1):
+            page = KeysetPaginator(ranked, 5).get_page({'after': encode_cursor([10])})
+        self.assertEqual([job.id for job in page], expected[10:15])
+        # cursor รูปแบบ keyset (หรือเสีย) ให้กลับไปหน้าแรก
+        page = KeysetPaginator(ranked, 5).get_page({'after': encode_cursor([0.5, '2025-06-01', 3])})
+        self.assertEqual([job.id for job in page], expected[:5])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        page = KeysetPaginator(self.queryset, 5).get_page({'after': 'not-a-cursor'})
+        self.assertEqual([job.id for job in page], self.expected[:5])
+
+    def test_count_is_cached(self):
+        cache.clear()
+        self.assertEqual(KeysetPaginator(self.queryset, 5).count, 23)
+        with self.assertNumQueries(0):
+            self.assertEqual(KeysetPaginator(self.queryset, 5).count, 23)
+
+
+class VerifiedRowTests(TestCase):
+    """ ปุ่มอนุมัติ/ปฏิเสธ ส่งกลับเฉพาะแถวที่เปลี่ยน + badge งานค้างแบบ hx-swap-oob (ไม่ render ทั้งรายการ) """
+
+    def setUp(self):
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        self.jobs = []
+        for code, firstname in [("6601001", "สมชาย"), ("6601002", "สมหญิง"), ("6601003", "สมหญิง")]:
+            user = User.objects.create(username=code)
+            student = Student.objects.create(user=user, student_code=code, firstname=firstname, lastname="ใจดี", major="DSSI")
+            self.jobs.append(JobApplication.objects.create(
+                student=student, company=company, position="Developer",
+                start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+            ))
+        self.client.force_login(User.objects.create(username="teacher", role=User.Role.TEACHER))
+
+    def test_approve_returns_row_and_oob_badge(self):
+        job = self.jobs[0]
+        response = self.client.post(reverse('approve-job', args=[job.pk]), {'teacher_note': 'ok'}, headers={'HX-Request': 'true'})
+        body = response.content.decode()
+        self.assertIn(f'id="job-row-{job.pk}"', body)
+        self.assertInHTML(
+            '<span id="job-pending-count" hx-swap-oob="true" class="badge badge-warning text-white font-bold shadow-sm">2</span>', body
+        )
+        self.assertNotIn('ประวัติการสมัครงานทั้งหมด', body)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'APPROVED')
+
+    def test_badge_follows_current_page_filters(self):
+        response = self.client.post(reverse('reject-job', args=[self.jobs[1].pk]), {'teacher_note': 'no'}, headers={
+            'HX-Request': 'true',
+            'HX-Current-URL': 'http://testserver' + reverse('teacher-verify-job') + '?q=สมหญิง',
+        })
+        self.assertIn('hx-swap-oob="true" class="badge badge-warning text-white font-bold shadow-sm">1</span>',
+                      response.content.decode())
+
+
+class BulkVerifyTests(TestCase):
+    """ อนุมัติ/ปฏิเสธ/รับทราบหลายรายการพร้อมกัน: UPDATE เดียว + คำนวณ StudentProgress ใหม่ """
+
+    def setUp(self):
+        company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        self.students = []
+        for code in ["6601001", "6601002"]:
+            user = User.objects.create(username=code)
+            student = Student.objects.create(user=user, student_code=code, firstname="สมชาย", lastname="ใจดี", major="DSSI")
+            TrainingRecord.objects.create(student=student, topic="อบรม", date=datetime.date(2025, 6, 1), hours=6,
+                                          proof_file="training_proofs/proof.pdf")
+            job = JobApplication.objects.create(
+                student=student, company=company, position="Developer", status='APPROVED',
+                start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+            )
+            WeeklyReport.objects.create(job_application=job, week_number=1, work_summary="งาน")
+            self.students.append(student)
+        self.teacher = User.objects.create(username="teacher", role=User.Role.TEACHER)
+        self.client.force_login(self.teacher)
+
+    def test_approve_trainings_grants_requested_hours(self):
+        ids = list(TrainingRecord.objects.values_list('pk', flat=True))
+        response = self.client.post(reverse('bulk-verify-training'), {'ids': ids, 'action': 'approve'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(TrainingRecord.objects.values_list('status', 'get_hours')), {('APPROVED', 6)})
+        self.assertEqual(set(StudentProgress.objects.values_list('training_hours', flat=True)), {6})
+
+    def test_only_pending_rows_change(self):
+        done = JobApplication.objects.first()
+        pending = JobApplication.objects.create(
+            student=self.students[1], company=done.company, position="Tester",
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+        )
+        self.client.post(reverse('bulk-verify-job'), {'ids': [done.pk, pending.pk], 'action': 'reject', 'teacher_note': 'ไม่ผ่าน'})
+        done.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual(done.status, 'APPROVED')
+        self.assertEqual((pending.status, pending.teacher_note), ('REJECTED', 'ไม่ผ่าน'))
+        self.assertEqual(StudentProgress.objects.get(student=self.students[1]).job_status, 'REJECTED')
+
+    def test_acknowledge_reports(self):
+        ids = list(WeeklyReport.objects.values_list('pk', flat=True))
+        self.client.post(reverse('bulk-acknowledge-report'), {'ids': ids, 'teacher_comment': 'ดี'})
+        self.assertEqual(set(WeeklyReport.objects.values_list('status', 'teacher_comment')), {('ACKNOWLEDGED', 'ดี')})
+        self.assertEqual(set(StudentProgress.objects.values_list('acknowledged_reports', flat=True)), {1})
+
+    def test_rejects_unknown_action_and_non_teachers(self):
+        self.assertEqual(self.client.post(reverse('bulk-verify-job'), {'action': 'delete'}).status_code, 400)
+        self.client.force_login(self.students[0].user)
+        ids = list(TrainingRecord.objects.values_list('pk', flat=True))
+        self.client.post(reverse('bulk-verify-training'), {'ids': ids, 'action': 'approve'})
+        self.assertFalse(TrainingRecord.objects.exclude(status='PENDING').exists())
+
+
+class ProtectedMediaTests(TestCase):
+    """ ไฟล์อัปโหลดต้องผ่านการตรวจสิทธิ์ แล้วให้ nginx ส่งต่อด้วย X-Accel-Redirect """
+
+    def setUp(self):
+        # โฟลเดอร์ media แยกต่อเทส (ชื่อไฟล์ซ้ำจะถูกเติม suffix ทำให้ path ไม่ตรง)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.company = CompanyMaster.objects.create(name="บริษัท ทดสอบ จำกัด")
+        user = User.objects.create(username="6601001")
+        self.student = Student.objects.create(user=user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        self.training = TrainingRecord(student=self.student, topic="อบรม", date=datetime.date(2025, 6, 1), hours=6)
+        self.training.proof_file.save("ใบประกาศ.pdf", ContentFile(b"%PDF-1.4"), save=False)
+        self.training.save()
+        self.url = reverse('training-proof', args=[self.training.pk])
+
+    def company_user(self, company):
+        user = User.objects.create(username=f"hr_{company.pk}", role=User.Role.COMPANY)
+        CompanyProfile.objects.create(user=user, company=company)
+        return user
+
+    def test_permissions(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)  # ยังไม่ login
+
+        other = User.objects.create(username="6601002")
+        Student.objects.create(user=other, student_code="6601002", firstname="สมหญิง", lastname="ใจดี", major="DSSI")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        hr = self.company_user(self.company)
+        self.client.force_login(hr)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        JobApplication.objects.create(
+            student=self.student, company=self.company, position="Developer", status='APPROVED',
+            start_date=datetime.date(2025, 6, 1), end_date=datetime.date(2025, 9, 30), supervisor_name="พี่เลี้ยง",
+        )
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        for user in (self.student.user, User.objects.create(username="teacher", role=User.Role.TEACHER)):
+            self.client.force_login(user)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4")
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_hands_transfer_to_nginx(self):
+        self.client.force_login(self.student.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/uploads/student_6601001/training/' + quote('ใบประกาศ.pdf'))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn("filename*=utf-8''", response['Content-Disposition'])
+
+
+    def proof(self, name, content):
+        training = TrainingRecord(student=self.student, topic="อบรม", date=datetime.date(2025, 6, 1), hours=6)
+        training.proof_file.save(name, ContentFile(content), save=False)
+        training.save()  # ข้าม form (ไฟล์เก่าที่อัปโหลดก่อนมี validators)
+        return reverse('training-proof', args=[training.pk])
+
+    def test_active_content_is_never_inline(self):
+        self.client.force_login(User.objects.create(username="teacher", role=User.Role.TEACHER))
+        for name, content in [("proof.html", b"<script>alert(1)</script>"),
+                              ("proof.svg", b'<svg xmlns="http://www.w3.org/2000/svg" onload="alert(1)"/>')]:
+            url = self.proof(name, content)
+            for accel in ('', '/protected-media/'):
+                with self.subTest(name=name, accel=accel), self.settings(MEDIA_ACCEL_REDIRECT=accel):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+                    self.assertEqual(response['Content-Type'], 'application/octet-stream')
+                    self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+                    self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+
+    def test_pdf_stays_inline_but_sandboxed(self):
+        self.client.force_login(self.student.user)
+        response = self.client.get(self.url)
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+        self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+
+    def test_upload_validation(self):
+        png = io.BytesIO()
+        Image.new('RGB', (4, 4)).save(png, 'PNG')
+        data = {'topic': "อบรม", 'date': '2025-06-01', 'hours': 3}
+        cases = [
+            ("proof.html", b"<script>alert(1)</script>", False),
+            ("proof.svg", b"<svg xmlns='http://www.w3.org/2000/svg'/>", False),
+            ("proof.pdf", b"<html><script>alert(1)</script></html>", False),  # นามสกุลปลอม
+            ("proof.png", b"%PDF-1.4", False),
+            ("proof.pdf", b"%PDF-1.4", True),
+            ("proof.png", png.getvalue(), True),
+        ]
+        for name, content, valid in cases:
+            with self.subTest(name=name, content=content[:10]):
+                form = TrainingRecordForm(data, {'proof_file': SimpleUploadedFile(name, content)})
+                self.assertEqual(form.is_valid(), valid, form.errors)
+
+        form = AnnouncementForm({'title': "ประกาศ", 'content': "-", 'is_published': 'on'},
+                                {'attachment': SimpleUploadedFile("evil.html", b"<script></script>")})
+        self.assertIn('attachment', form.errors)
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PreviewTests(TestCase):
+    """ ภาพตัวอย่างของไฟล์อัปโหลดถูกสร้างโดยงานเบื้องหลัง เก็บข้างไฟล์ต้นฉบับ และส่งผ่าน view ที่ตรวจสิทธิ์ """
+
+    def setUp(self):
+        user = User.objects.create(username="6601001")
+        self.student = Student.objects.create(user=user, student_code="6601001", firstname="สมชาย", lastname="ใจดี", major="DSSI")
+        self.teacher = User.objects.create(username="teacher", role=User.Role.TEACHER)
+
+    def run_queued_preview(self):
+        task = claim_next_task()
+        self.assertEqual(task.task_name, 'file_preview')
+        return run_task(task)
+
+    def test_image_is_downscaled_next_to_original(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (3000, 2000), 'navy').save(buffer, 'JPEG')
+        self.client.force_login(self.student.user)
+        self.client.post(reverse('student-training'), {
+            'topic': 'อบรม', 'date': '2025-06-01', 'hours': 6,
+            'proof_file': ContentFile(buffer.getvalue(), name="certificate.jpg"),
+        })
+        training = TrainingRecord.objects.get()
+        # ยังไม่มีภาพตัวอย่างจนกว่า worker จะทำงาน
+        self.assertEqual(self.client.get(reverse('training-proof-preview', args=[training.pk])).status_code, 404)
+        self.assertEqual(self.run_queued_preview().status, BackgroundTask.Status.DONE)
+
+        training.refresh_from_db()
+        self.assertEqual(training.proof_preview.name,
+                         os.path.join(os.path.dirname(training.proof_file.name), "certificate.preview.jpg"))
+        with Image.open(training.proof_preview.path) as preview:
+            self.assertEqual(preview.size, (640, 427))
+
+        response = self.client.get(reverse('training-proof-preview', args=[training.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_pdf_first_page_on_announcement_upload(self):
+        pdf = pdfium.PdfDocument.new()
+        pdf.new_page(595, 842)
+        buffer = io.BytesIO()
+        pdf.save(buffer)
+        pdf.close()
+        attachment = ContentFile(buffer.getvalue(), name="กำหนดการ.pdf")
+
+        self.client.force_login(self.teacher)
+        response = self.client.post(reverse('create-announcement'), {'title': 'ประกาศ', 'content': '...', 'is_published': 'on', 'attachment': attachment})
+        self.assertEqual(response.status_code, 200)
+        self.run_queued_preview()
+
+        announcement = Announcement.objects.get()
+        stem = os.path.splitext(announcement.attachment.name)[0]
+        self.assertEqual(announcement.attachment_preview.name, f"{stem}.preview.png")
+        with Image.open(announcement.attachment_preview.path) as preview:
+            self.assertEqual(max(preview.size), 640)
+
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('announcement-preview', args=[announcement.pk]))
+        self.assertEqual(b"".join(response.streaming_content)[:8], b"\x89PNG\r\n\x1a\n")
+        self.assertContains(self.client.get(reverse('student-news')), reverse('announcement-preview', args=[announcement.pk]))
+
+    def test_other_files_are_skipped(self):
+        training = TrainingRecord(student=self.student, topic="อบรม", date=datetime.date(2025, 6, 1), hours=6)
+        training.proof_file.save("slides.pptx", ContentFile(b"pptx"), save=False)
+        training.save()
+        self.assertFalse(generate_preview(training))
+        training.refresh_from_db()
+        self.assertFalse(training.proof_preview)
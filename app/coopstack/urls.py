@@ -39,11 +39,24 @@ urlpatterns = [
     path('announcements/', views.AnnouncementListView.as_view(), name='announcement-list'),
     path('announcements/create/', views.AnnouncementCreateView.as_view(), name='announcement-create'), # เฉพาะอาจารย์
 
+    # งานเบื้องหลัง (สถานะ + ดาวน์โหลดผลลัพธ์)
+    path('htmx/task/<int:pk>/', views.task_status, name='task-status'),
+    path('task/<int:pk>/download/', views.task_download, name='task-download'),
+    path('files/training/<int:pk>/', views.training_proof, name='training-proof'),
+    path('files/training/<int:pk>/preview/', views.training_proof, {'preview': True}, name='training-proof-preview'),
+    path('files/announcement/<int:pk>/', views.announcement_attachment, name='announcement-attachment'),
+    path('files/announcement/<int:pk>/preview/', views.announcement_attachment, {'preview': True},
+         name='announcement-preview'),
+
+    # Prometheus metrics (Bearer token หรือบัญชีผู้ดูแล)
+    path('metrics', views.metrics, name='metrics'),
+
 
     # ===========================================
     # 3. Student System
     # ===========================================
     path('download-form/<int:job_id>/', views.download_application_form, name='download-coop-form'),
+    path('htmx/job/form/<int:job_id>/', views.request_application_form, name='request-coop-form'),
     path('student/dashboard/', views.StudentDashboardView.as_view(), name='student-dashboard'),
     #path('student/profile/', views.StudentProfileView.as_view(), name='student-profile'),
     # Path หน้าข่าวสาร
@@ -65,6 +78,7 @@ urlpatterns = [
     # 4. Teacher System
     # ===========================================
     path('teacher/dashboard/', views.TeacherDashboardView.as_view(), name='teacher-dashboard'),
+    path('teacher/dashboard/coop-forms/', views.TeacherCoopFormsZipView.as_view(), name='teacher-coop-forms-zip'),
     path('teacher/dashboard/student/<int:student_id>/', views.get_student_detail_modal, name='get-student-detail-modal'),
 
     # Training Verification
@@ -73,6 +87,7 @@ urlpatterns = [
     path('htmx/training/approve/<int:pk>/', views.approve_training, name='approve-training'),
     path('htmx/training/modal/reject/<int:pk>/', views.get_reject_modal, name='get-reject-modal'),
     path('htmx/training/reject/<int:pk>/', views.reject_training, name='reject-training'),
+    path('htmx/training/bulk/', views.BulkVerifyTrainingView.as_view(), name='bulk-verify-training'),
     # Companies Info
     path('teacher/company-summary/', views.TeacherCompanySummaryView.as_view(), name='teacher-company-summary'),
     path('teacher/company/comment/<int:company_id>/', views.get_company_comment_modal, name='get-company-comment-modal'),
@@ -84,18 +99,23 @@ urlpatterns = [
     path('htmx/job/approve/<int:pk>/', views.approve_job, name='approve-job'),
     path('htmx/job/modal/reject/<int:pk>/', views.get_job_reject_modal, name='get-job-reject-modal'),
     path('htmx/job/reject/<int:pk>/', views.reject_job, name='reject-job'),
+    path('htmx/job/bulk/', views.BulkVerifyJobView.as_view(), name='bulk-verify-job'),
     path('htmx/job/modal/detail/<int:pk>/', views.get_job_detail_modal, name='get-job-detail-modal'),
     # Job Application Verification
     # Weekly Report Verification
     path('teacher/verify-report/', views.TeacherVerifyReportView.as_view(), name='teacher-verify-report'),
     path('htmx/report/modal/<int:pk>/', views.get_report_detail_modal, name='get-report-detail-modal'),
     path('htmx/report/acknowledge/<int:pk>/', views.acknowledge_report, name='acknowledge-report'),
+    path('htmx/report/bulk/', views.BulkAcknowledgeReportView.as_view(), name='bulk-acknowledge-report'),
 
     # Evaluation
     path('teacher/verify-evaluation/', views.TeacherVerifyEvaluationView.as_view(), name='teacher-verify-evaluation'),
     path('htmx/eval/modal/<int:job_id>/', views.get_evaluation_detail_modal, name='get-eval-detail-modal'),
     path('htmx/eval/acknowledge/<int:eval_id>/', views.acknowledge_evaluation, name='acknowledge-evaluation'),
 
+    # Export (CSV / XLSX)
+    path('teacher/export/<str:dataset>/', views.TeacherExportView.as_view(), name='teacher-export'),
+
     # Announcements Management
     path('teacher/news/', views.TeacherNewsView.as_view(), name='teacher-news'),
     path('htmx/announcement/create/', views.create_announcement, name='create-announcement'),
@@ -1,7 +1,17 @@
 import os
 import io
+import time
+import zipfile
+import hashlib
+import random
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from django.conf import settings
+from django.core.cache import cache
 from docxtpl import DocxTemplate
+from .metrics import DOCX_RENDER, DOCX_REQUESTS
+from jinja2 import Environment
 from datetime import datetime
 
 # ฟังก์ชันแปลงเดือนเป็นภาษาไทย
@@ -14,21 +24,84 @@ def format_thai_date(date_obj):
     year = date_obj.year + 543
     return f"{date_obj.day} {months[date_obj.month-1]} {year}"
 
-def generate_coop_docx(job_application):
+def generate_random_password(length=8):
+    chars = string.ascii_letters + string.digits
+    return ''.join(random.choice(chars) for _ in range(length))
+
+class _CompiledEnvironment(Environment):
+    """ Jinja Environment ที่ compile source เดิมแค่ครั้งเดียว (docxtpl เรียก from_string ทุกครั้งที่ render) """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._compiled = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals is not None or template_class is not None:
+            return super().from_string(source, globals, template_class)
+        template = self._compiled.get(source)
+        if template is None:
+            template = self._compiled[source] = super().from_string(source)
+        return template
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """ DocxTemplate ที่จำผล patch_xml ของ XML ต้นฉบับไว้ (XML ต้นฉบับเหมือนเดิมทุกครั้ง) """
+    _patched_xml = {}
+
+    def patch_xml(self, src_xml):
+        patched = self._patched_xml.get(src_xml)
+        if patched is None:
+            patched = self._patched_xml[src_xml] = super().patch_xml(src_xml)
+        return patched
+
+
+class CoopFormRenderer:
     """
-    สร้างไฟล์ Word (.docx) จาก Template โดยใช้ docxtpl
+    โหลดไฟล์ Template เข้า Memory ครั้งเดียวต่อ Process (โหลดใหม่เมื่อไฟล์ถูกแก้ไข)
+    และใช้ Jinja template ที่ compile แล้วซ้ำในทุกการ render
     """
-    # 1. ระบุตำแหน่งไฟล์ Template
-    template_path = os.path.join(settings.BASE_DIR, 'static', 'forms', 'form_template.docx')
-    
-    # 2. โหลด Template
-    doc = DocxTemplate(template_path)
-    
+    def __init__(self, template_path):
+        self.template_path = template_path
+        self._mtime = None
+        self._template_bytes = None
+        self._jinja_env = None
+
+    def _load(self):
+        mtime = os.path.getmtime(self.template_path)
+        if mtime != self._mtime:
+            with open(self.template_path, 'rb') as f:
+                self._template_bytes = f.read()
+            self._jinja_env = _CompiledEnvironment()
+            CachedDocxTemplate._patched_xml.clear()
+            self._mtime = mtime
+
+    @property
+    def version(self):
+        self._load()
+        return self._mtime
+
+    def render(self, context):
+        """ render context ลง Template แล้วคืนค่าเป็น bytes ของไฟล์ .docx """
+        with DOCX_RENDER.time():
+            self._load()
+            doc = CachedDocxTemplate(io.BytesIO(self._template_bytes))
+            doc.render(context, self._jinja_env)
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            return buffer.getvalue()
+
+
+coop_form_renderer = CoopFormRenderer(os.path.join(settings.BASE_DIR, 'static', 'forms', 'form_template.docx'))
+
+# ไฟล์ที่ render แล้วเก็บใน cache นานสุด 1 วัน (key มีวันที่ปัจจุบันอยู่แล้ว)
+COOP_DOCX_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_coop_docx_context(job_application):
+    """ เตรียมข้อมูล (Context) ให้ตรงกับ Tag {{ }} ใน Word """
     student = job_application.student
     user = student.user
     
-    # 3. เตรียมข้อมูล (Context) ให้ตรงกับ Tag {{ }} ใน Word
-    context = {
+    return {
         'date': format_thai_date(datetime.now()), # วันที่ปัจจุบัน
         'full_name': f"{user.first_name} {user.last_name}",
         'student_id': student.student_code,
@@ -50,13 +123,106 @@ def generate_coop_docx(job_application):
         'emergency_name': getattr(job_application, 'emergency_contact', "-"), 
         'emergency_phone': getattr(job_application, 'emergency_phone', "-"),
     }
-    
-    # 4. Render ข้อมูลลงใน Template
-    doc.render(context)
-    
-    # 5. บันทึกลง Memory Buffer
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    
-    return buffer
\ No newline at end of file
+
+
+def coop_docx_cache_key(job_application, context):
+    """ key = ใบสมัคร + สถานะ + ข้อมูลทุกช่องที่ลงในไฟล์ + เวอร์ชัน Template (แก้ข้อมูลเมื่อไหร่ key เปลี่ยนเอง) """
+    payload = repr(sorted((key, str(value)) for key, value in context.items()))
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f"coop_docx:{job_application.pk}:{job_application.status}:{coop_form_renderer.version}:{digest}"
+
+
+def generate_coop_docx(job_application):
+    """
+    สร้างไฟล์ Word (.docx) จาก Template โดยใช้ docxtpl
+    ถ้าข้อมูลใบสมัครไม่เปลี่ยนจะส่งไฟล์เดิมจาก cache
+    """
+    context = get_coop_docx_context(job_application)
+    cache_key = coop_docx_cache_key(job_application, context)
+
+    content = cache.get(cache_key)
+    DOCX_REQUESTS.labels('hit' if content is not None else 'miss').inc()
+    if content is None:
+        content = coop_form_renderer.render(context)
+        cache.set(cache_key, content, COOP_DOCX_CACHE_TIMEOUT)
+
+    return io.BytesIO(content)
+
+
+# ==========================================
+# สร้างแบบฟอร์มหลายฉบับพร้อมกันเป็นไฟล์ ZIP
+# ==========================================
+
+def _render_coop_form(item):
+    """ ทำงานใน process ลูก: แต่ละ process ใช้ coop_form_renderer ของตัวเอง (parse Template ครั้งเดียวต่อ process) """
+    filename, context = item
+    return filename, coop_form_renderer.render(context)
+
+
+class ZipStream:
+    """ file-like object (เขียนอย่างเดียว ไม่ seek) สำหรับ ZipFile เก็บเฉพาะข้อมูลที่ยังไม่ถูกส่งออก """
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class CoopFormBatch:
+    """
+    render แบบฟอร์มสหกิจของใบสมัครหลายใบด้วย Process Pool แล้วส่งออกเป็น ZIP ทีละส่วน (stream)
+    ถือเอกสารค้างใน Memory ไม่เกิน workers * 2 ฉบับ ไม่ว่าจะมีกี่ใบสมัคร
+    """
+    def __init__(self, job_applications, workers=None):
+        self.job_applications = job_applications
+        self.workers = workers or os.cpu_count() or 1
+        self.count = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        """ จำนวนเอกสารต่อวินาที """
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def _items(self):
+        for job_app in self.job_applications:
+            # ส่งเฉพาะข้อความ (ไม่ส่ง Model instance) ข้าม process
+            context = {key: str(value) for key, value in get_coop_docx_context(job_app).items()}
+            yield f"coop_form_{job_app.student.student_code}_{job_app.pk}.docx", context
+
+    def __iter__(self):
+        """ คืนค่า bytes ของไฟล์ ZIP ทีละส่วน (เขียนลงไฟล์ใน worker ดู tasks.coop_forms_zip_task) """
+        started = time.monotonic()
+        stream = ZipStream()
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive, \
+                ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            items = self._items()
+            for item in items:
+                pending.append(pool.submit(_render_coop_form, item))
+                if len(pending) >= self.workers * 2:
+                    yield self._write(archive, stream, pending.popleft().result())
+            while pending:
+                yield self._write(archive, stream, pending.popleft().result())
+        self.elapsed = time.monotonic() - started
+        yield stream.pop()
+
+    def _write(self, archive, stream, result):
+        filename, content = result
+        archive.writestr(filename, content)
+        self.count += 1
+        return stream.pop()
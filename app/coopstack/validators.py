@@ -0,0 +1,69 @@
+"""
+ตรวจไฟล์ที่ผู้ใช้อัปโหลดฝั่ง server (attribute accept ของ input เป็นแค่คำแนะนำให้ browser)
+
+- นามสกุลต้องอยู่ใน allow-list ของแต่ละ field (ห้าม .html / .svg / .js ที่รันสคริปต์ได้เมื่อเปิดใน browser)
+- เนื้อไฟล์ต้องตรงกับนามสกุล (PDF ขึ้นต้น %PDF-, รูปภาพเปิดด้วย Pillow ได้, เอกสาร Office มี signature ของ zip/OLE)
+"""
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.validators import FileExtensionValidator
+from django.utils.deconstruct import deconstructible
+from PIL import Image
+
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
+PROOF_EXTENSIONS = ['pdf', *IMAGE_EXTENSIONS]
+ATTACHMENT_EXTENSIONS = ['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', *IMAGE_EXTENSIONS]
+
+ZIP_SIGNATURE = b'PK\x03\x04'  # docx / xlsx / pptx
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # doc / xls / ppt รุ่นเก่า
+SIGNATURES = {
+    'pdf': b'%PDF-',
+    'docx': ZIP_SIGNATURE, 'xlsx': ZIP_SIGNATURE, 'pptx': ZIP_SIGNATURE,
+    'doc': OLE_SIGNATURE, 'xls': OLE_SIGNATURE, 'ppt': OLE_SIGNATURE,
+}
+# นามสกุล -> format ที่ Pillow รายงาน
+IMAGE_FORMATS = {'jpg': 'JPEG', 'jpeg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP'}
+
+validate_proof_extension = FileExtensionValidator(PROOF_EXTENSIONS)
+validate_attachment_extension = FileExtensionValidator(ATTACHMENT_EXTENSIONS)
+
+
+def _matches_extension(file, extension):
+    if extension in SIGNATURES:
+        signature = SIGNATURES[extension]
+        return file.read(len(signature)) == signature
+    if extension in IMAGE_FORMATS:
+        try:
+            with Image.open(file) as image:
+                image_format = image.format
+                image.verify()
+        except Exception:  # Pillow โยนได้หลายแบบเมื่อไฟล์ไม่ใช่รูปภาพ
+            return False
+        return image_format == IMAGE_FORMATS[extension]
+    return False
+
+
+@deconstructible
+class FileContentValidator:
+    """ เนื้อไฟล์ต้องเป็นชนิดเดียวกับนามสกุล (กันไฟล์ HTML ที่ตั้งชื่อเป็น .pdf/.png) """
+
+    message = "เนื้อไฟล์ไม่ตรงกับนามสกุล .%(extension)s"
+    code = 'invalid_content'
+
+    def __call__(self, value):
+        extension = os.path.splitext(value.name)[1].lower().lstrip('.')
+        position = value.tell() if hasattr(value, 'tell') else 0
+        try:
+            value.seek(0)
+            valid = _matches_extension(value, extension)
+        finally:
+            value.seek(position)
+        if not valid:
+            raise ValidationError(self.message, code=self.code, params={'extension': extension})
+
+    def __eq__(self, other):
+        return isinstance(other, FileContentValidator)
+
+
+validate_file_content = FileContentValidator()
@@ -1,23 +1,40 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.views import View
 from django.core.paginator import Paginator
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
-from django.db.models import Count, Q, Avg, Sum
-from django.db import transaction
+from django.db.models import Count, Q, Avg, Sum, F, Value
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import transaction, connection
 from django.utils import timezone
-from django.http import HttpResponse, HttpResponseForbidden, FileResponse
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, FileResponse, QueryDict
 from datetime import date, timedelta, datetime
 from django.contrib.auth.models import User
-import random, string
-from .utils import generate_coop_docx
+import os
+import hmac
+from urllib.parse import urlsplit
+from django.conf import settings
+from .utils import generate_coop_docx, generate_random_password
+from .progress import PLACED_STATUSES, aget_student_progress, get_student_progress, refresh_many_progress
+from .search import search_queryset
+from .filters import (
+    evaluated_jobs, filter_evaluation_jobs, filter_job_applications, filter_reports, filter_trainings
+)
+from .pagination import KeysetPaginator
+from .tasks import enqueue
+from .exports import EXPORTS, export_rows, stream_csv, stream_xlsx, streaming_response
+from .caching import aannouncement_lists, announcement_lists, bump_models, render_cached_fragment
+from .metrics import CONTENT_TYPE_LATEST, render_metrics
+from .media import serve_media
 
 # Imports จากไฟล์ภายใน App ของเรา
 from .models import (
     User, Student, CompanyMaster, CompanyProfile,
     TrainingRecord, JobApplication, WeeklyReport, 
-    Evaluation, Announcement
+    Evaluation, Announcement, BackgroundTask, StudentProgress, current_academic_year
 )
 from .forms import (
     StudentRegisterForm, TrainingRecordForm, 
@@ -47,6 +64,27 @@ def index(request):
     return redirect('login')
 
 
+class AsyncLoginRequiredView(View):
+    """
+    Base Class ของ view แบบ async (ใช้ ORM แบบ async ไม่กิน thread ระหว่างรอ DB เมื่อรันด้วย ASGI)
+    LoginRequiredMixin อ่าน request.user แบบ sync ซึ่งใช้ใน event loop ไม่ได้ ที่นี่จึงโหลด user ด้วย auser() ก่อน
+    และแทน request.user ด้วย user จริง (template/context processor อ่านต่อได้โดยไม่ query ซ้ำ)
+    handler ต้อง query ให้ครบก่อน render (ห้ามส่ง queryset แบบ lazy เข้า template)
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        denied = self.check_role(request)
+        if denied is not None:
+            return denied
+        return await super().dispatch(request, *args, **kwargs)
+
+    def check_role(self, request):
+        """ คืน response เมื่อผู้ใช้ไม่มีสิทธิ์ (None = เข้าได้) """
+        return None
+
+
 class RegisterView(View):
     """ สมัครสมาชิก (เฉพาะนักศึกษา) """
     def get(self, request):
@@ -100,17 +138,13 @@ def get_forgot_modal(request):
     return render(request, 'partials/forgot_modal.html')
 
 
-class AnnouncementListView(LoginRequiredMixin, View):
+class AnnouncementListView(AsyncLoginRequiredView):
     """ รายการประกาศข่าวสาร (ทุกคนดูได้ แต่อาจารย์เห็นปุ่มสร้าง) """
-    def get(self, request):
-        if request.user.role == User.Role.TEACHER:
-            announcements = Announcement.objects.all()
-        else:
-            # นศ./บริษัท เห็นเฉพาะที่ Publish แล้ว
-            announcements = Announcement.objects.filter(is_published=True)
-        
+    async def get(self, request):
+        # นศ./บริษัท เห็นเฉพาะที่ Publish แล้ว
+        lists = await aannouncement_lists(include_unpublished=request.user.role == User.Role.TEACHER)
         return render(request, 'common/announcement_list.html', {
-            'announcements': announcements
+            'announcements': lists['announcements']
         })
 
 class AnnouncementCreateView(LoginRequiredMixin, View):
@@ -127,7 +161,8 @@ class AnnouncementCreateView(LoginRequiredMixin, View):
         
         form = AnnouncementForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            announcement = form.save()
+            enqueue_preview(request, announcement, announcement.attachment)
             messages.success(request, "สร้างประกาศเรียบร้อยแล้ว")
             return redirect('announcement-list')
         return render(request, 'common/announcement_form.html', {'form': form})
@@ -139,7 +174,7 @@ class AnnouncementCreateView(LoginRequiredMixin, View):
 
 def download_application_form(request, job_id):
     # 1. ดึงข้อมูล
-    job_app = get_object_or_404(JobApplication, id=job_id)
+    job_app = get_object_or_404(JobApplication.objects.select_related('student__user', 'company'), id=job_id)
     
     # 2. ตรวจสอบสิทธิ์ (เหมือนเดิม)
     if job_app.student.user != request.user and not request.user.is_staff:
@@ -163,22 +198,133 @@ def download_application_form(request, job_id):
     
     return response
 
+@login_required
+def request_application_form(request, job_id):
+    """ HTMX: ส่งงานสร้างแบบฟอร์มเข้าคิว (ไม่ block worker ของเว็บ) แล้วคืนกล่องสถานะงาน """
+    if request.method != "POST":
+        return HttpResponse(status=405)
+
+    job_app = get_object_or_404(JobApplication.objects.select_related('student'), id=job_id)
+    if job_app.student.user_id != request.user.id and not request.user.is_staff:
+        return HttpResponseForbidden("คุณไม่มีสิทธิ์")
+    if job_app.status != 'APPROVED':
+        return HttpResponseForbidden("ต้องผ่านการอนุมัติก่อน")
+
+    task = enqueue('coop_form', user=request.user, job_id=job_app.id)
+    return render(request, 'partials/task_status.html', {'task': task})
+
+
+# ---- Background Tasks ----
+
+def _can_view_task(user, task):
+    return task.created_by_id == user.id or user.is_staff or user.role == User.Role.TEACHER
+
+@login_required
+def task_status(request, pk):
+    """ HTMX: กล่องสถานะงาน (poll ทุก 2 วินาทีจนกว่างานจะเสร็จ) """
+    task = get_object_or_404(BackgroundTask, pk=pk)
+    if not _can_view_task(request.user, task):
+        return HttpResponseForbidden()
+
+    response = render(request, 'partials/task_status.html', {'task': task})
+    if task.is_finished:
+        # ให้ส่วนอื่นของหน้า (เช่น รายการบัญชี) รีเฟรชตัวเองเมื่องานเสร็จ
+        response['HX-Trigger'] = 'task-finished'
+    return response
+
+@login_required
+async def task_download(request, pk):
+    task = await aget_object_or_404(BackgroundTask, pk=pk, status=BackgroundTask.Status.DONE)
+    if not _can_view_task(await request.auser(), task) or not task.result_file:
+        return HttpResponseForbidden()
+    return serve_media(task.result_file, as_attachment=True)
+
+
+# ---- Uploaded Files (ตรวจสิทธิ์แล้วให้ nginx ส่งไฟล์ ดู media.py) ----
+
+def enqueue_preview(request, instance, fieldfile):
+    """ ส่งงานสร้างภาพตัวอย่างเข้าคิวหลังอัปโหลด (ไม่ทำใน request เพราะ render PDF/รูปใหญ่ใช้เวลา) """
+    if fieldfile:
+        enqueue('file_preview', user=request.user, model=instance._meta.label_lower, pk=instance.pk)
+
+
+async def _can_view_training_proof(user, training):
+    if user.is_staff or user.role in (User.Role.TEACHER, User.Role.ADMIN):
+        return True
+    if training.student.user_id == user.id:
+        return True
+    # พี่เลี้ยงของบริษัทที่นักศึกษาคนนี้ฝึกงานอยู่
+    return user.role == User.Role.COMPANY and await JobApplication.objects.filter(
+        student_id=training.student_id,
+        status__in=PLACED_STATUSES,
+        company__staffs__user=user,
+    ).aexists()
+
+# view ส่งไฟล์เป็น async: ระหว่างรอ DB ตรวจสิทธิ์ worker ของ ASGI ยังรับ request อื่นได้
+@login_required
+async def training_proof(request, pk, preview=False):
+    """ หลักฐานการอบรม (เปิดดูในเบราว์เซอร์) หรือภาพตัวอย่างของหลักฐาน """
+    training = await aget_object_or_404(TrainingRecord.objects.select_related('student'), pk=pk)
+    if not await _can_view_training_proof(await request.auser(), training):
+        return HttpResponseForbidden()
+    return serve_media(training.proof_preview if preview else training.proof_file)
+
+@login_required
+async def announcement_attachment(request, pk, preview=False):
+    """ ไฟล์แนบของประกาศ (ประกาศที่ยังไม่เผยแพร่ให้เฉพาะอาจารย์) """
+    announcement = await aget_object_or_404(Announcement, pk=pk)
+    user = await request.auser()
+    if not announcement.is_published and user.role != User.Role.TEACHER and not user.is_staff:
+        return HttpResponseForbidden()
+    if preview:
+        return serve_media(announcement.attachment_preview)
+    return serve_media(announcement.attachment, as_attachment=True)
+
+
+# ---- Monitoring ----
+
+def _can_view_metrics(request):
+    token = settings.METRICS_TOKEN
+    auth = request.headers.get('Authorization', '')
+    if token and auth.startswith('Bearer ') and hmac.compare_digest(auth[len('Bearer '):], token):
+        return True
+    user = request.user
+    return user.is_authenticated and (user.is_staff or user.role == User.Role.ADMIN)
+
+def metrics(request):
+    """ Prometheus scrape endpoint (Bearer METRICS_TOKEN หรือ login ด้วยบัญชีผู้ดูแล) """
+    if not _can_view_metrics(request):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+def _student_only(request):
+    if request.user.role != User.Role.STUDENT:
+        messages.warning(request, "ไม่มีสิทธิ์เข้าถึงหน้านี้")
+        return redirect('home')
+    return None
+
 class StudentBaseView(LoginRequiredMixin, View):
     """ Base Class สำหรับตรวจสอบว่าเป็นนักศึกษาจริงไหม """
     def dispatch(self, request, *args, **kwargs):
-        if request.user.role != User.Role.STUDENT:
-            messages.warning(request, "ไม่มีสิทธิ์เข้าถึงหน้านี้")
-            return redirect('home')
+        denied = _student_only(request)
+        if denied is not None:
+            return denied
         return super().dispatch(request, *args, **kwargs)
 
-class StudentDashboardView(StudentBaseView):
-    def get(self, request):
-        student = request.user.student_profile
+class AsyncStudentBaseView(AsyncLoginRequiredView):
+    """ StudentBaseView สำหรับ view แบบ async """
+    def check_role(self, request):
+        return _student_only(request)
+
+class StudentDashboardView(AsyncStudentBaseView):
+    async def get(self, request):
+        student = request.user.student_profile  # โหลดมาพร้อม user แล้ว (ProfileModelBackend)
         
-        # ข้อมูลสรุป
-        job_app = JobApplication.objects.filter(student=student).last()
-        training_hours = sum([t.get_hours for t in TrainingRecord.objects.filter(student=student, status='APPROVED')])
-        reports_count = WeeklyReport.objects.filter(job_application=job_app).count() if job_app else 0
+        # ข้อมูลสรุป (อ่านจากตาราง StudentProgress แถวเดียว)
+        progress = await aget_student_progress(student, 'latest_job__company')
+        job_app = progress.latest_job
+        training_hours = progress.training_hours
+        reports_count = progress.report_count
 
         step = 1
         status_text = "อยู่ในช่วงเก็บชั่วโมงอบรม"
@@ -229,22 +375,12 @@ def get_cancel_job_modal(request, pk):
     return render(request, 'student/partials/cancel_job_modal.html', {'job': job.pk})
 
 
-class StudentNewsView(LoginRequiredMixin, View):
-    def get(self, request):
-        # 1. รายการประกาศทั้งหมด (สำหรับแสดงฝั่งซ้าย)
-        # เรียงตาม Pin ก่อน, แล้วค่อยตามวันที่ใหม่สุด
-        announcements = Announcement.objects.filter(is_published=True).order_by('-is_pinned', '-created_at')
-        
-        # 2. รายการที่มีไฟล์แนบ (สำหรับแสดงฝั่งขวา - เอกสารดาวน์โหลด)
-        # กรองเอาเฉพาะที่มีไฟล์แนบ
-        documents = Announcement.objects.filter(
-            is_published=True
-        ).exclude(attachment='').order_by('-created_at')
-        
-        return render(request, 'student/news.html', {
-            'announcements': announcements,
-            'documents': documents
-        })
+class StudentNewsView(AsyncLoginRequiredView):
+    async def get(self, request):
+        # 1. รายการประกาศทั้งหมด (ฝั่งซ้าย) เรียงตาม Pin ก่อน แล้วค่อยตามวันที่ใหม่สุด
+        # 2. รายการที่มีไฟล์แนบ (ฝั่งขวา - เอกสารดาวน์โหลด)
+        # ทั้งสองรายการมาจาก cache ชุดเดียวกัน (ดู caching.py)
+        return render(request, 'student/news.html', await aannouncement_lists())
 
 
 class StudentTrainingView(StudentBaseView):
@@ -268,6 +404,7 @@ class StudentTrainingView(StudentBaseView):
             # Default Status is PENDING (ตั้งค่าไว้ใน Model แล้ว หรือระบุตรงนี้ก็ได้)
             training.status = 'PENDING' 
             training.save()
+            enqueue_preview(request, training, training.proof_file)
             messages.success(request, "บันทึกข้อมูลสำเร็จ รออาจารย์ตรวจสอบ")
             return redirect('student-training')
         
@@ -295,21 +432,20 @@ class StudentJobView(StudentBaseView):
     def get(self, request):
         student = request.user.student_profile
         
+        progress = get_student_progress(student, 'latest_job__company')
+
         # 1. ตรวจสอบชั่วโมงอบรม (Logic ฝั่ง Server)
-        total_hours = TrainingRecord.objects.filter(
-            student=student, 
-            status='APPROVED'
-        ).aggregate(Sum('get_hours'))['get_hours__sum'] or 0
+        total_hours = progress.training_hours
         
         REQUIRED_HOURS = 30
         is_training_passed = total_hours >= REQUIRED_HOURS
 
         # 2. ตรวจสอบสถานะการสมัครงานปัจจุบัน
-        # หาใบสมัครล่าสุดที่ไม่ใช่ REJECTED (คือ PENDING, APPROVED, COMPLETED)
-        active_job = JobApplication.objects.filter(
-            student=student,
-            status__in=['PENDING', 'APPROVED','COMPLETED'] # ❌ ไม่รวม CANCELLED, REJECTED
-        ).last()
+        # ใบสมัครล่าสุดที่ยังดำเนินการอยู่ (PENDING, APPROVED, COMPLETED)
+        # สมัครใหม่ได้เฉพาะเมื่อใบเดิม REJECTED/CANCELLED จึงดูแค่ใบล่าสุดก็พอ
+        active_job = None
+        if progress.job_status in ['PENDING', 'APPROVED','COMPLETED']: # ❌ ไม่รวม CANCELLED, REJECTED
+            active_job = progress.latest_job
         # เตรียม Form
         form = JobApplicationForm()
 
@@ -375,10 +511,11 @@ def cancel_job_application(request, pk):
 
 
 @login_required
-def search_company(request):
+async def search_company(request):
     query = request.GET.get('company_search', '')
     if len(query) >= 2:
-        companies = CompanyMaster.objects.filter(name__icontains=query)[:5] # เอาแค่ 5 อันดับแรก
+        companies = search_queryset(CompanyMaster.objects.all(), query, ['name'])[:5] # เอาแค่ 5 อันดับแรก (ใกล้เคียงที่สุดก่อน)
+        companies = [company async for company in companies]
     else:
         companies = []
     
@@ -402,13 +539,15 @@ class StudentWeeklyReportView(StudentBaseView):
             messages.warning(request, "คุณต้องได้รับการอนุมัติฝึกงานก่อน จึงจะส่งรายงานได้")
             return redirect('student-dashboard')
 
-        reports = WeeklyReport.objects.filter(job_application=job).order_by('week_number')
+        # ดึงรายงานครั้งเดียว แล้วส่งจำนวนให้ template ใช้ซ้ำ (reports.count ใน template จะยิง COUNT ทุกครั้งที่เรียก)
+        reports = list(WeeklyReport.objects.filter(job_application=job).order_by('week_number'))
         form = WeeklyReportForm()
         
         return render(request, 'student/report_list.html', {
             'job': job,
             'reports': reports,
-            'next_week_number': reports.count() + 1,
+            'report_count': len(reports),
+            'next_week_number': len(reports) + 1,
             'form': form
         })
     
@@ -447,121 +586,123 @@ class TeacherBaseView(LoginRequiredMixin, View):
             return redirect('home')
         return super().dispatch(request, *args, **kwargs)
 
-class TeacherDashboardView(TeacherBaseView):
-    def get(self, request):
-        # 1. รับค่า Search และ Filter
-        search_query = request.GET.get('q', '')
-        year_filter = request.GET.get('year', '')
-        
-        # 2. Query ข้อมูลพื้นฐาน (สมมติว่าดึงมาทั้งหมดก่อน)
-        students = Student.objects.all().order_by('student_code')
-        total_count = students.count() 
-        coop_count = students.filter(job_applications__status__in=['APPROVED']).count()
-        finished_count = students.filter(job_applications__status='COMPLETED').count()
-        academic_year = set(students.filter(job_applications__status__in=['APPROVED','COMPLETED']).values_list('job_applications__academic_year', flat=True).distinct())
-        academic_year = sorted(academic_year, reverse=True)
-        academic_year.append('NONE')
-
-        # 3. การกรอง (Filter)
-        if search_query:    
-            students = students.filter(
-                Q(student_code__icontains=search_query) | 
-                Q(user__first_name__icontains=search_query) |
-                Q(user__last_name__icontains=search_query)
-            )
-        
-        if year_filter:
-            if year_filter == 'NONE':
-                # กรณีเลือก "ยังไม่ได้ฝึกงาน": คัดคนที่ 'มี' Job Approved ออกไป
-                students = students.exclude(job_applications__status__in=['APPROVED','COMPLETED'])
-            else:
-                try:
-                    students = students.filter(
-                        job_applications__status__in=['APPROVED','COMPLETED'],
-                        job_applications__academic_year=year_filter
-                    )
-                except ValueError:
-                    pass # กรณีค่า year ไม่ถูกต้อง
-            
-        # 4. Pagination (แบ่งหน้า ทีละ 5 คน ตามไฟล์ต้นฉบับ)
-        paginator = Paginator(students, 5)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+class TeacherCoopFormsZipView(TeacherBaseView):
+    """ ส่งงานสร้าง ZIP แบบฟอร์มสหกิจของใบสมัครที่อนุมัติแล้วทั้งปีการศึกษาเข้าคิว แล้วคืนกล่องสถานะงาน """
+    def post(self, request):
+        year = request.POST.get('year') or current_academic_year()
+        try:
+            year = int(year)
+        except ValueError:
+            return HttpResponseBadRequest("กรุณาเลือกปีการศึกษา")
 
+        task = enqueue('coop_forms_zip', user=request.user, year=year)
+        return render(request, 'partials/task_status.html', {'task': task})
 
-        for s in page_obj:
-            # 1. ดึงใบสมัครงานล่าสุด
-            job = JobApplication.objects.filter(student=s).order_by('-created_at').first()
-            s.latest_job = job
-            
-            # ค่า Default ให้แสดงปีการศึกษาตามทะเบียนนักศึกษาไปก่อน (ถ้ายังไม่มีงาน)
-            s.display_year = 'ยังไม่สมัครงาน'
-            
-            if job:
-                s.job_status = job.status
-                
-                # --- [LOGIC ใหม่] คำนวณปีการศึกษาสำหรับคนที่ APPROVED ---
-                if job.status == 'COMPLETED':
-                    s.display_year = job.academic_year
-                elif job.status == 'APPROVED' and job.start_date:
-                    s.display_year = job.academic_year
-                    # หา Current Week (เหมือนเดิม)
-                    last_report = WeeklyReport.objects.filter(job_application=job).order_by('-week_number').first()
-                    s.current_week = last_report.week_number if last_report else 0
-                else:
-                    s.current_week = 0
+def get_dashboard_context(request):
+    # 1. รับค่า Search และ Filter
+    search_query = request.GET.get('q', '')
+    year_filter = request.GET.get('year', '')
+    
+    # 2. Query ข้อมูลพื้นฐาน
+    # ตัวเลขสรุปด้านบน: นับในรอบเดียวด้วย aggregate (แทนการ count ทีละครั้ง)
+    counters = Student.objects.aggregate(
+        total_count=Count('pk', distinct=True),
+        coop_count=Count('pk', filter=Q(job_applications__status='APPROVED'), distinct=True),
+        finished_count=Count('pk', filter=Q(job_applications__status='COMPLETED'), distinct=True),
+    )
+    academic_year = set(JobApplication.objects.filter(
+        status__in=['APPROVED','COMPLETED']
+    ).values_list('academic_year', flat=True).distinct())
+    academic_year = sorted(academic_year, reverse=True)
+    academic_year.append('NONE')
+
+    # ข้อมูลต่อแถว (ใบสมัครล่าสุด / สัปดาห์ล่าสุด / ชั่วโมงอบรม) อ่านจาก StudentProgress ผ่าน JOIN เดียว
+    students = Student.objects.select_related('user').annotate(
+        latest_job_id=F('progress__latest_job_id'),
+        job_status=F('progress__job_status'),
+        job_academic_year=F('progress__academic_year'),
+        current_week=Coalesce('progress__current_week', 0),
+        training_hours=Coalesce('progress__training_hours', 0),
+    ).order_by('student_code')
+
+    # 3. การกรอง (Filter)
+    if search_query:    
+        students = search_queryset(students, search_query, ['student_code', 'firstname', 'lastname'])
+    
+    if year_filter:
+        if year_filter == 'NONE':
+            # กรณีเลือก "ยังไม่ได้ฝึกงาน": คัดคนที่ 'มี' Job Approved ออกไป
+            students = students.exclude(job_applications__status__in=['APPROVED','COMPLETED'])
+        else:
+            try:
+                students = students.filter(
+                    job_applications__status__in=['APPROVED','COMPLETED'],
+                    job_applications__academic_year=year_filter
+                )
+            except ValueError:
+                pass # กรณีค่า year ไม่ถูกต้อง
+        
+    # 4. Pagination (แบ่งหน้า ทีละ 5 คน ตามไฟล์ต้นฉบับ)
+    paginator = Paginator(students, 5)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
 
-            else:
-                s.job_status = None
+    # ปีการศึกษาที่แสดง คำนวณจากค่าที่ annotate มาแล้ว (ไม่มี Query เพิ่ม)
+    # โค้ดเดิมเช็ค job.start_date ด้วยสำหรับ APPROVED แต่ start_date เป็น field บังคับ (NOT NULL) และ
+    # academic_year คำนวณจาก start_date ตอน save จึงเป็นจริงเสมอ ตัดออกได้โดยผลไม่เปลี่ยน (ดู TeacherRosterTests)
+    for s in page_obj:
+        s.display_year = 'ยังไม่สมัครงาน'
+        if s.job_status in ('APPROVED', 'COMPLETED'):
+            s.display_year = s.job_academic_year
+        if s.job_status != 'APPROVED':
+            s.current_week = 0
+    # ====================================================
 
+    return {
+        'students': page_obj,
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'year_filter': year_filter,
+        'total_count': counters['total_count'],
+        'coop_count': counters['coop_count'],
+        'finished_count': counters['finished_count'],
+        'academic_year': academic_year
+    }
 
-            # B. ดึงชั่วโมงอบรมรวม (ถ้ามี Model TrainingRecord)
-            # สมมติว่า TrainingRecord มี field 'total_hours'
-            #total_hours = TrainingRecord.objects.filter(student=s).aggregate(Sum('hours'))['hours__sum']
-            total_hours = TrainingRecord.objects.filter(
-                student=s, 
-                status='APPROVED' # (Optional) ควรนับเฉพาะที่สถานะอนุมัติด้วยเพื่อความชัวร์
-            ).aggregate(
-                sum_val=Sum('get_hours')
-            )['sum_val']
-            s.training_hours = total_hours if total_hours else 0
-        # ====================================================
 
-        context = {
-            'students': page_obj,
-            'page_obj': page_obj,
-            'search_query': search_query,
-            'year_filter': year_filter,
-            'total_count': total_count,
-            'coop_count': coop_count,
-            'finished_count': finished_count,
-            'academic_year': academic_year
-        }
+# model ที่ข้อมูลในตาราง (partial) แต่ละหน้าอ่าน: เขียน model เหล่านี้เมื่อไหร่ cache ของ partial นั้นหมดอายุ
+STUDENT_RESULTS_MODELS = (Student, User, JobApplication, StudentProgress)
 
+class TeacherDashboardView(TeacherBaseView):
+    def get(self, request):
         if request.headers.get('HX-Request'):
-            return render(request, 'teacher/partials/student_results.html', context)
-        
-        return render(request, 'teacher/teacher_dashboard.html', context)
+            return render_cached_fragment(request, 'teacher/partials/student_results.html',
+                                          STUDENT_RESULTS_MODELS, lambda: get_dashboard_context(request))
+
+        return render(request, 'teacher/teacher_dashboard.html', get_dashboard_context(request))
 
 
 def get_student_detail_modal(request, student_id):
-    student = get_object_or_404(Student, pk=student_id)
+    # ชั่วโมงที่เคลม (hours) ของรายการที่อนุมัติแล้ว ตามที่หน้านี้แสดงมาตลอด (StudentProgress เก็บ get_hours)
+    # รวมใน Query เดียวกับการดึงนักศึกษา
+    student = get_object_or_404(
+        Student.objects.annotate(claimed_hours=Sum('trainings__hours', filter=Q(trainings__status='APPROVED'))),
+        pk=student_id,
+    )
     
+    progress = get_student_progress(student, 'current_job__company', 'current_job__evaluation')
+
     REQUIRED_HOURS = 30
-    total_hours = TrainingRecord.objects.filter(student=student, status='APPROVED').aggregate(Sum('hours'))['hours__sum'] or 0
+    total_hours = student.claimed_hours or 0
     training_percent = min((total_hours / REQUIRED_HOURS) * 100, 100)
 
     # 2. ข้อมูลงาน (Job)
-    # ดึงใบสมัครล่าสุดที่ได้รับการอนุมัติ หรือใบสมัครล่าสุด
-    job = JobApplication.objects.filter(student=student, status__in=['APPROVED', 'COMPLETED']).order_by('-created_at').first()
-    if not job:
-        job = JobApplication.objects.filter(student=student).order_by('-created_at').first()
+    # ใบสมัครล่าสุดที่ได้รับการอนุมัติ หรือใบสมัครล่าสุด (คำนวณไว้ใน StudentProgress)
+    job = progress.current_job
 
     # 3. ข้อมูลรายงาน (Weekly Report) (สมมติเป้าหมายคือ 16 สัปดาห์)
     REQUIRED_WEEKS = 16
-    report_count = 0
-    if job:
-        report_count = WeeklyReport.objects.filter(job_application=job, status='ACKNOWLEDGED').count()
+    report_count = progress.acknowledged_reports
     report_percent = min((report_count / REQUIRED_WEEKS) * 100, 100)
 
     # 4. ผลประเมิน (Evaluation)
@@ -596,35 +737,44 @@ def get_company_summary_context(request):
     all_companies = companies.count()
     
     if search_query:
-        companies = companies.filter(Q(name__icontains=search_query)|Q(teacher_notes__icontains=search_query))
-
-    company_list = []
-    for comp in companies:
-        jobs = JobApplication.objects.filter(company__name__icontains=comp.name, status__in=['APPROVED','COMPLETED'])
-
-        if not jobs.exists() and search_query: 
-             pass
-
-        years = jobs.values_list('academic_year', flat=True).distinct().order_by('-academic_year') # รายการปีการศึกษา
-        positions = jobs.values_list('position', flat=True).distinct() # รายการตำแหน่ง
-        student_count = jobs.count()
-
-        company_list.append({
-            'id': comp.id,
-            'name': comp.name,
-            'address': comp.address or "-",
-            'phone': getattr(comp, 'phone', '-'), # ถ้ามี field phone
-            'teacher_notes': comp.teacher_notes,
-            'years': [y for y in years if y], # กรอง None
-            'positions': list(positions),
-            'student_count': student_count,
-            'has_history': student_count > 0,
-        })
+        companies = search_queryset(companies, search_query, ['name', 'teacher_notes'])
+
+    # นับจำนวน นศ. ต่อบริษัทด้วย GROUP BY (join ผ่าน company_id) และให้ DB ทำ pagination
+    history = Q(job_applications__status__in=['APPROVED','COMPLETED'])
+    companies = companies.annotate(student_count=Count('job_applications', filter=history))
+
+    if connection.vendor == 'postgresql':
+        # PostgreSQL: รวมปีการศึกษา/ตำแหน่งเป็น array ใน Query เดียวกัน
+        companies = companies.annotate(
+            years=ArrayAgg(
+                'job_applications__academic_year',
+                filter=history & Q(job_applications__academic_year__isnull=False),
+                distinct=True,
+                ordering='-job_applications__academic_year',
+                default=Value([]),
+            ),
+            positions=ArrayAgg('job_applications__position', filter=history, distinct=True, default=Value([])),
+        )
 
-    paginator = Paginator(company_list, 10)
+    paginator = Paginator(companies, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
+    if connection.vendor != 'postgresql':
+        # DB อื่น (เช่น SQLite ตอนเทส): ดึงปี/ตำแหน่งของบริษัทในหน้านี้ด้วย Query เดียวแล้วจัดกลุ่มเอง
+        history_rows = JobApplication.objects.filter(
+            company_id__in=[c.id for c in page_obj],
+            status__in=['APPROVED','COMPLETED'],
+        ).values_list('company_id', 'academic_year', 'position').distinct()
+        years, positions = {}, {}
+        for company_id, year, position in history_rows:
+            if year:
+                years.setdefault(company_id, set()).add(year)
+            positions.setdefault(company_id, set()).add(position)
+        for c in page_obj:
+            c.years = sorted(years.get(c.id, ()), reverse=True)
+            c.positions = sorted(positions.get(c.id, ()))
+
     return {
         'page_obj': page_obj,
         'all_companies': all_companies,
@@ -632,10 +782,13 @@ def get_company_summary_context(request):
     }
 
 
+COMPANY_SUMMARY_MODELS = (CompanyMaster, JobApplication)
+
 class TeacherCompanySummaryView(TeacherBaseView):
     def get(self, request):
         if request.headers.get('HX-Request') and not request.headers.get('HX-Target') == 'modal-container':
-            return render(request, 'teacher/partials/company_summary_list.html', get_company_summary_context(request))
+            return render_cached_fragment(request, 'teacher/partials/company_summary_list.html',
+                                          COMPANY_SUMMARY_MODELS, lambda: get_company_summary_context(request))
         return render(request, 'teacher/company_summary.html', get_company_summary_context(request))
 
 def get_company_comment_modal(request, company_id):
@@ -654,32 +807,64 @@ def save_company_comment(request, company_id):
         return render(request, 'teacher/partials/company_summary_list.html', get_company_summary_context(request))
 
 # --- Verification Section ---
+def current_list_params(request):
+    """ ตัวกรอง (?q= / ?year= / ?week=) ของหน้ารายการที่เปิดอยู่ (htmx ส่ง HX-Current-URL มากับทุก request) """
+    return QueryDict(urlsplit(request.headers.get('HX-Current-URL', '')).query)
+
+def render_verified_row(request, row_id, message, tone, pending_badge, pending_count, colspan):
+    """
+    ผลของปุ่มอนุมัติ/ปฏิเสธ/รับทราบ: ส่งกลับเฉพาะแถวที่เปลี่ยน (แทนที่แถวเดิมด้วย hx-swap="outerHTML")
+    พร้อม badge จำนวนงานค้างแบบ hx-swap-oob ไม่ต้อง render ทั้งรายการใหม่
+    """
+    return render(request, 'teacher/partials/verified_row.html', {
+        'row_id': row_id,
+        'message': message,
+        'tone': tone,
+        'pending_badge': pending_badge,
+        'pending_count': pending_count,
+        'colspan': colspan,
+    })
+
+def selected_ids(request):
+    """ id ของแถวที่ติ๊กเลือกในตารางรอดำเนินการ (checkbox name="ids") """
+    return [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+
+def bulk_update_pending(model, ids, student_field, **changes):
+    """
+    เปลี่ยนสถานะรายการที่ยัง PENDING ใน ids ด้วย UPDATE คำสั่งเดียวภายใน transaction
+    update() ไม่ส่ง signals จึงคำนวณ StudentProgress ของนักศึกษาที่เกี่ยวข้องใหม่ และเปลี่ยน generation ของ cache เอง
+    """
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update(of=('self',))
+            .filter(pk__in=ids, status='PENDING')
+            .values_list('pk', student_field)
+        )
+        if not rows:
+            return 0
+        model.objects.filter(pk__in=[pk for pk, _student_id in rows]).update(**changes)
+        bump_models(model)
+        refresh_many_progress({student_id for _pk, student_id in rows})
+    return len(rows)
+
 #---------Training Verification Section ---------
 def get_training_context(request):
     search_query = request.GET.get('q', '')
     
     trainings = TrainingRecord.objects.select_related('student__user').all().order_by('-date')
-
-    if search_query:
-        trainings = trainings.filter(
-            Q(student__firstname__icontains=search_query) |
-            Q(student__lastname__icontains=search_query) |
-            Q(student__student_code__icontains=search_query) |
-            Q(topic__icontains=search_query)
-        )
+    trainings = filter_trainings(trainings, request.GET)
     
     pending_list = trainings.filter(status='PENDING')
     history_queryset = trainings.exclude(status='PENDING')
     
-    paginator = Paginator(history_queryset, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(history_queryset, 10)  # ?after= / ?before= (ดู pagination.py)
+    page_obj = paginator.get_page(request.GET)
 
     return {
         'pending_list': pending_list,
         'page_obj': page_obj,
         'search_query': search_query, # ถ้าต้องการคงค่า search อาจต้องรับค่าเพิ่ม แต่เบื้องต้นเอาแค่นี้ก่อน
-        'total_count': history_queryset.count()
+        'total_count': paginator.count
     }
 
 def get_approve_modal(request, pk):
@@ -691,11 +876,15 @@ def get_approve_modal(request, pk):
 
     return render(request, 'teacher/partials/verify_train_modal.html', {'training': training, 'id': pk})
 
+def render_training_row(request, training, message, tone):
+    pending = filter_trainings(TrainingRecord.objects.filter(status='PENDING'), current_list_params(request))
+    return render_verified_row(request, f'training-row-{training.id}', message, tone,
+                               'training-pending-count', pending.count(), colspan=7)
+
 def approve_training(request, pk):
     """ บันทึกผลอนุมัติ """
-    print(request.method)
     if request.method == "POST":
-        training = get_object_or_404(TrainingRecord, pk=pk)
+        training = get_object_or_404(TrainingRecord.objects.select_related('student__user'), pk=pk)
         approved_hours = request.POST.get('approved_hours')
 
         comment = request.POST.get('teacher_comment')
@@ -705,9 +894,9 @@ def approve_training(request, pk):
         training.get_hours = int(approved_hours) if approved_hours else training.hours
         training.save()
         
-        messages.success(request, f"อนุมัติ '{training.topic}' เรียบร้อย (ให้ {training.get_hours} ชม.)")
-        context = get_training_context(request)
-        return render(request, 'teacher/partials/verify_train_list.html', context)
+        return render_training_row(
+            request, training, f"อนุมัติ '{training.topic}' เรียบร้อย (ให้ {training.get_hours} ชม.)", 'success'
+        )
 
 
 def get_reject_modal(request, pk):
@@ -717,7 +906,7 @@ def get_reject_modal(request, pk):
 
 def reject_training(request, pk):
     if request.method == "POST":
-        training = get_object_or_404(TrainingRecord, pk=pk)
+        training = get_object_or_404(TrainingRecord.objects.select_related('student__user'), pk=pk)
         # รับค่าเหตุผลการปฏิเสธ
         comment = request.POST.get('teacher_comment')
         
@@ -726,14 +915,27 @@ def reject_training(request, pk):
         training.teacher_comment = comment # บันทึกเหตุผล
         training.save()
 
-        messages.warning(request, f"ปฏิเสธรายการ '{training.topic}' แล้ว")
-        context = get_training_context(request) 
-        return render(request, 'teacher/partials/verify_train_list.html', context)
+        return render_training_row(request, training, f"ปฏิเสธรายการ '{training.topic}' แล้ว", 'error')
+
+class BulkVerifyTrainingView(TeacherBaseView):
+    """ อนุมัติ/ปฏิเสธรายการอบรมที่เลือกทั้งหมดในครั้งเดียว (อนุมัติ = ได้ชั่วโมงเต็มตามที่ขอ) """
+    def post(self, request):
+        action = request.POST.get('action')
+        if action == 'approve':
+            changes = {'status': 'APPROVED', 'get_hours': F('hours')}
+        elif action == 'reject':
+            changes = {'status': 'REJECTED', 'get_hours': 0}
+        else:
+            return HttpResponseBadRequest("ไม่รู้จักคำสั่ง")
+
+        bulk_update_pending(TrainingRecord, selected_ids(request), 'student_id',
+                            teacher_comment=request.POST.get('teacher_comment', ''), **changes)
+        return render(request, 'teacher/partials/training_list.html', get_training_context(request))
 
 class TeacherVerifyTrainView(TeacherBaseView):
     def get(self, request):
         if request.headers.get('HX-Request'):
-            return render(request, 'teacher/partials/verify_train_list.html', get_training_context(request))
+            return render(request, 'teacher/partials/training_list.html', get_training_context(request))
 
         # 6. Full Page Load
         return render(request, 'teacher/verify_train.html', get_training_context(request))
@@ -741,26 +943,14 @@ class TeacherVerifyTrainView(TeacherBaseView):
 #---------Job Verification Section ---------
 def get_job_verification_context(request):
     search_query = request.GET.get('q', '')
-    year_filter = request.GET.get('year', '')
 
     
     # Base Query: ใบสมัครงานทั้งหมด
-    jobs = JobApplication.objects.select_related('student__user').order_by('-created_at')
+    jobs = JobApplication.objects.select_related('student__user', 'company').order_by('-created_at')
     academic_year = set(jobs.values_list('academic_year', flat=True).distinct())
     academic_year = sorted(academic_year, reverse=True)
     
-    # Search Filter
-    if search_query:
-        jobs = jobs.filter(
-            Q(student__user__first_name__icontains=search_query) |
-            Q(student__user__last_name__icontains=search_query) |
-            Q(student__student_code__icontains=search_query) |
-            Q(company__name__icontains=search_query)
-        )
-
-    # Year Filter
-    if year_filter:
-        jobs = jobs.filter(Q(academic_year__icontains=year_filter))
+    jobs = filter_job_applications(jobs, request.GET)
 
     # --- แยกข้อมูล ---
     
@@ -771,102 +961,98 @@ def get_job_verification_context(request):
     history_queryset = jobs.exclude(status='PENDING')
     
     # ✅ Pagination สำหรับ History (10 รายการต่อหน้า)
-    paginator = Paginator(history_queryset, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(history_queryset, 10)  # ?after= / ?before= (ดู pagination.py)
+    page_obj = paginator.get_page(request.GET)
 
     return {
         'pending_list': pending_list,
         'page_obj': page_obj, # ใช้ page_obj แทน history_list
         'search_query': search_query,
-        'total_count': history_queryset.count(),
+        'total_count': paginator.count,
         'academic_year': academic_year
     }
 
+JOB_LIST_MODELS = (JobApplication, Student, User, CompanyMaster)
+
 class VerifyJobListView(TeacherBaseView):
     def get(self, request):
         # HTMX Request
         if request.headers.get('HX-Request') and not request.headers.get('HX-Target') == 'modal-container':
-             return render(request, 'teacher/partials/job_list.html', get_job_verification_context(request))
+            return render_cached_fragment(request, 'teacher/partials/job_list.html',
+                                          JOB_LIST_MODELS, lambda: get_job_verification_context(request))
              
         return render(request, 'teacher/verify_job.html', get_job_verification_context(request))
     
 
 # 3. Approve Modal Logic
 def get_job_approve_modal(request, pk):
-    job = get_object_or_404(JobApplication, pk=pk)
+    job = get_object_or_404(JobApplication.objects.select_related('student__user'), pk=pk)
     return render(request, 'teacher/partials/verify_job_approve_modal.html', {'job': job})
 
+def render_job_row(request, job, message, tone):
+    pending = filter_job_applications(JobApplication.objects.filter(status='PENDING'), current_list_params(request))
+    return render_verified_row(request, f'job-row-{job.id}', message, tone,
+                               'job-pending-count', pending.count(), colspan=6)
+
 def approve_job(request, pk):
     if request.method == "POST":
-        job = get_object_or_404(JobApplication, pk=pk)
+        job = get_object_or_404(JobApplication.objects.select_related('student__user', 'company'), pk=pk)
         note = request.POST.get('teacher_note', '-')
         
         job.status = 'APPROVED'
         job.teacher_note = note
         job.save()
 
-        messages.success(request, f"อนุมัติให้นักศึกษาฝึกงานที่ '{job.company.name}' เรียบร้อย")
-        context = get_job_verification_context(request)
-        return render(request, 'teacher/partials/job_list.html', context)
+        return render_job_row(request, job, f"อนุมัติให้นักศึกษาฝึกงานที่ '{job.company.name}' เรียบร้อย", 'success')
 
 # 4. Reject Modal Logic
 def get_job_reject_modal(request, pk):
-    job = get_object_or_404(JobApplication, pk=pk)
+    job = get_object_or_404(JobApplication.objects.select_related('student__user'), pk=pk)
     return render(request, 'teacher/partials/verify_job_reject_modal.html', {'job': job})
 
 def reject_job(request, pk):
     if request.method == "POST":
-        job = get_object_or_404(JobApplication, pk=pk)
+        job = get_object_or_404(JobApplication.objects.select_related('student__user', 'company'), pk=pk)
         reason = request.POST.get('teacher_note')
         
         job.status = 'REJECTED'
         job.teacher_note = reason
         job.save()
         
-        messages.warning(request, f"ปฏิเสธคำร้องของ '{job.student.user.get_full_name()}' แล้ว")
-        context = get_job_verification_context(request)
-        return render(request, 'teacher/partials/job_list.html', context)
+        return render_job_row(request, job, f"ปฏิเสธคำร้องของ '{job.student.user.get_full_name()}' แล้ว", 'error')
+
+
+class BulkVerifyJobView(TeacherBaseView):
+    """ อนุมัติ/ปฏิเสธคำร้องขอออกฝึกงานที่เลือกทั้งหมดในครั้งเดียว """
+    def post(self, request):
+        statuses = {'approve': 'APPROVED', 'reject': 'REJECTED'}
+        action = request.POST.get('action')
+        if action not in statuses:
+            return HttpResponseBadRequest("ไม่รู้จักคำสั่ง")
+
+        bulk_update_pending(JobApplication, selected_ids(request), 'student_id',
+                            status=statuses[action], teacher_note=request.POST.get('teacher_note', ''))
+        return render(request, 'teacher/partials/job_list.html', get_job_verification_context(request))
 
 
 def get_job_detail_modal(request, pk):
-    job = get_object_or_404(JobApplication, pk=pk)
+    job = get_object_or_404(JobApplication.objects.select_related('student__user', 'company'), pk=pk)
     return render(request, 'teacher/partials/verify_job_detail_modal.html', {'job': job})
 
 #---------Repoirt Verification Section ---------
 def get_report_verification_context(request):
     search_query = request.GET.get('q', '')
-    week_filter = request.GET.get('week', '')
-    year_filter = request.GET.get('year', '')
     
     # Base Query: รายงานทั้งหมด เรียงจากใหม่ไปเก่า
     reports = WeeklyReport.objects.select_related(
         'job_application__student__user', 
-        'job_application'
+        'job_application__company'
     ).order_by('-submitted_at')
         
     academic_year = set(reports.values_list('job_application__academic_year', flat=True).distinct())
     academic_year = sorted(academic_year, reverse=True)
     
-    # Search Filter
-    if search_query:
-        reports = reports.filter(
-            Q(job_application__student__firstname__icontains=search_query) |
-            Q(job_application__student__lastname__icontains=search_query) |
-            Q(job_application__student__student_code__icontains=search_query)
-        )
-    # Year Filter
-    if year_filter:
-        reports = reports.filter(
-            job_application__academic_year__icontains=year_filter
-        )
-
-    if week_filter:
-        try:
-            week_num = int(week_filter)
-            reports = reports.filter(week_number=week_num)
-        except ValueError:
-            pass # กรณีค่า week ไม่ถูกต้อง
+    reports = filter_reports(reports, request.GET)
     # --- แยกข้อมูล ---
     
     # 1. Pending List: รายงานที่ยังไม่ตรวจ (สถานะ PENDING)
@@ -876,35 +1062,39 @@ def get_report_verification_context(request):
     history_queryset = reports.exclude(status='PENDING')
     
     # ✅ Pagination สำหรับ History (10 รายการต่อหน้า)
-    paginator = Paginator(history_queryset, 5)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(history_queryset, 5)  # ?after= / ?before= (ดู pagination.py)
+    page_obj = paginator.get_page(request.GET)
 
     return {
         'pending_list': pending_list,
         'page_obj': page_obj, # ใช้ page_obj แทน history_list
         'search_query': search_query,
-        'total_count': history_queryset.count(),
+        'total_count': paginator.count,
         'academic_year': academic_year
     }
 
+REPORT_LIST_MODELS = (WeeklyReport, JobApplication, Student, User, CompanyMaster)
+
 class TeacherVerifyReportView(TeacherBaseView):
     def get(self, request):
         # HTMX Request
         if request.headers.get('HX-Request') and not request.headers.get('HX-Target') == 'modal-container':
-             return render(request, 'teacher/partials/report_list.html', get_report_verification_context(request))
+            return render_cached_fragment(request, 'teacher/partials/report_list.html',
+                                          REPORT_LIST_MODELS, lambda: get_report_verification_context(request))
              
         return render(request, 'teacher/verify_report.html', get_report_verification_context(request))
     
 
 def get_report_detail_modal(request, pk):
-    report = get_object_or_404(WeeklyReport, pk=pk)
+    report = get_object_or_404(
+        WeeklyReport.objects.select_related('job_application__student__user', 'job_application__company'), pk=pk
+    )
     return render(request, 'teacher/partials/report_detail_modal.html', {'report': report})
 
 
 def acknowledge_report(request, pk):
     if request.method == "POST":
-        report = get_object_or_404(WeeklyReport, pk=pk)
+        report = get_object_or_404(WeeklyReport.objects.select_related('job_application__student__user'), pk=pk)
         comment = request.POST.get('teacher_comment')
         
         report.status = 'ACKNOWLEDGED'
@@ -912,34 +1102,34 @@ def acknowledge_report(request, pk):
         report.submitted_at = timezone.now()
         report.save()
         
-        messages.success(request, f"รับทราบรายงาน Week {report.week_number} ของ {report.job_application.student.user.get_full_name()} แล้ว")
-        
-        # คืนค่า List ใหม่กลับไปอัปเดตหน้าจอ
-        return render(request, 'teacher/partials/report_list.html', get_report_verification_context(request))
+        pending = filter_reports(WeeklyReport.objects.filter(status='PENDING'), current_list_params(request))
+        return render_verified_row(
+            request, f'report-row-{report.id}',
+            f"รับทราบรายงาน Week {report.week_number} ของ {report.job_application.student.user.get_full_name()} แล้ว",
+            'success', 'report-pending-count', pending.count(), colspan=7,
+        )
     
 
+class BulkAcknowledgeReportView(TeacherBaseView):
+    """ รับทราบรายงานประจำสัปดาห์ที่เลือกทั้งหมดในครั้งเดียว """
+    def post(self, request):
+        bulk_update_pending(WeeklyReport, selected_ids(request), 'job_application__student_id',
+                            status='ACKNOWLEDGED', teacher_comment=request.POST.get('teacher_comment', ''),
+                            submitted_at=timezone.now())
+        return render(request, 'teacher/partials/report_list.html', get_report_verification_context(request))
+
+
 # --- Evaluation Section ---
 def get_evaluation_list_context(request):
     search_query = request.GET.get('q', '')
     year_filter = request.GET.get('year', '')
     
     # Base Query: นักศึกษาที่ฝึกงานอยู่ (Job Status = APPROVED)
-    jobs = JobApplication.objects.filter(status__in=['APPROVED','COMPLETED']).select_related('student__user', 'evaluation')
-    jobs = jobs.filter(evaluation__isnull=False)  # ดึงเฉพาะที่มีการประเมินแล้ว
+    jobs = evaluated_jobs().select_related('student__user', 'company', 'evaluation')  # ดึงเฉพาะที่มีการประเมินแล้ว
     academic_year = set(jobs.values_list('academic_year', flat=True).distinct())
     academic_year = sorted(academic_year, reverse=True)
 
-    # Filter Search
-    if search_query:
-        jobs = jobs.filter(
-            Q(student__firstname__icontains=search_query) |
-            Q(student__lastname__icontains=search_query) |
-            Q(student__student_code__icontains=search_query) |
-            Q(company__name__icontains=search_query)
-        )
-    print(search_query, year_filter)
-    if year_filter:
-        jobs = jobs.filter(academic_year=year_filter)
+    jobs = filter_evaluation_jobs(jobs, request.GET)
 
     # --- แยกข้อมูลเป็น 2 ส่วน ---
     
@@ -951,24 +1141,26 @@ def get_evaluation_list_context(request):
     history_list = jobs.exclude(evaluation__status='SUBMITTED').order_by('-student__student_code')
     
     # Pagination เฉพาะส่วน History
-    paginator = Paginator(history_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(history_list, 10)  # ?after= / ?before= (ดู pagination.py)
+    page_obj = paginator.get_page(request.GET)
 
     return {
         'pending_list': pending_list,
         'page_obj': page_obj,
         'search_query': search_query,
         'selected_year': year_filter,
-        'total_count': history_list.count(),
+        'total_count': paginator.count,
         'academic_year':academic_year
     }
 
+EVALUATION_LIST_MODELS = (Evaluation, JobApplication, Student, User, CompanyMaster)
+
 class TeacherVerifyEvaluationView(TeacherBaseView):
     def get(self, request):
         # ถ้าเป็น HTMX Request ให้ส่งกลับเฉพาะส่วนตาราง+Pagination
         if request.headers.get('HX-Request') and not request.headers.get('HX-Target') == 'modal-container':
-            return render(request, 'teacher/partials/evaluation_list.html', get_evaluation_list_context(request))
+            return render_cached_fragment(request, 'teacher/partials/evaluation_list.html',
+                                          EVALUATION_LIST_MODELS, lambda: get_evaluation_list_context(request))
             
         return render(request, 'teacher/verify_evaluation.html', get_evaluation_list_context(request))
 
@@ -986,7 +1178,7 @@ def get_evaluation_detail_modal(request, job_id):
 def acknowledge_evaluation(request, eval_id):
     """ อาจารย์กดรับทราบผลการประเมิน """
     if request.method == "POST":
-        evaluation = get_object_or_404(Evaluation, pk=eval_id)
+        evaluation = get_object_or_404(Evaluation.objects.select_related('job_application__student__user'), pk=eval_id)
         evaluation.status = 'APPROVED' # เปลี่ยนสถานะเป็นรับรองแล้ว
         evaluation.save()
         
@@ -995,22 +1187,47 @@ def acknowledge_evaluation(request, eval_id):
             job.status = 'COMPLETED'
             job.save()
         
-        messages.success(request, f"รับทราบผลการประเมินของ {evaluation.job_application.student.user.get_full_name()} แล้ว")
-        
-        # ปิด Modal และ Refresh ตาราง
-        return render(request, 'teacher/partials/evaluation_list.html', get_evaluation_list_context(request))
+        pending = filter_evaluation_jobs(
+            JobApplication.objects.filter(status__in=['APPROVED','COMPLETED'], evaluation__status='SUBMITTED'),
+            current_list_params(request),
+        )
+        return render_verified_row(
+            request, f'evaluation-row-{job.id}',
+            f"รับทราบผลการประเมินของ {job.student.user.get_full_name()} แล้ว",
+            'success', 'evaluation-pending-count', pending.count(), colspan=5,
+        )
+
+# --- Export Section ---
+class TeacherExportView(TeacherBaseView):
+    """ Export ข้อมูลตามตัวกรองของหน้าตรวจสอบเป็น CSV/XLSX แบบ stream (Memory คงที่ไม่ว่าจะกี่แถว) """
+    def get(self, request, dataset):
+        if dataset not in EXPORTS:
+            return HttpResponseBadRequest("ไม่พบชุดข้อมูลที่ต้องการ")
+
+        filename, headers, rows = export_rows(dataset, request.GET)
+        if request.GET.get('format') == 'xlsx':
+            response = streaming_response(
+                request, stream_xlsx(headers, rows),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            filename += '.xlsx'
+        else:
+            response = streaming_response(request, stream_csv(headers, rows), content_type='text/csv; charset=utf-8')
+            filename += '.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 # ----Announcement Section----
 def get_announcement_list_context():
     return {
-        'news_list': Announcement.objects.all()
+        'news_list': announcement_lists(include_unpublished=True)['announcements']
     }
 
 class TeacherNewsView(TeacherBaseView):
     def get(self, request):
         context = {
             'form': AnnouncementForm(),
-            'news_list': Announcement.objects.all()
+            **get_announcement_list_context()
         }
         return render(request, 'teacher/news.html', context)
 
@@ -1019,7 +1236,8 @@ def create_announcement(request):
     if request.method == "POST":
         form = AnnouncementForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            announcement = form.save()
+            enqueue_preview(request, announcement, announcement.attachment)
             # ส่งกลับรายการใหม่ (Update List)
             return render(request, 'partials/news_list.html', get_announcement_list_context())
     
@@ -1041,10 +1259,6 @@ def get_current_year():
     else: # มกราคม - เมษายน (ยังเป็นปีการศึกษาเก่า)
         return thai_year - 1
 
-def generate_random_password(length=8):
-    chars = string.ascii_letters + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
-
 def get_account_context(search_query=''):
     year = get_current_year()
     # ดึงข้อมูล Profile ในปีปัจจุบัน
@@ -1068,7 +1282,7 @@ class TeacherCompanyAccountView(TeacherBaseView):
         
         # HTMX Search Request
         if request.headers.get('HX-Request'):
-            return render(request, 'partials/company_account_list.html', get_account_context(search_query))
+            return render(request, 'teacher/partials/company_account_list.html', get_account_context(search_query))
             
         return render(request, 'teacher/company_account.html', get_account_context())
     
@@ -1166,64 +1380,26 @@ def delete_account(request, pk):
     
     return render(request, 'teacher/partials/company_account_list.html', get_account_context())
 
-@transaction.atomic
 def auto_generate_accounts(request):
-    current_year = get_current_year()
-    
-    # ดึงชื่อบริษัทจากใบสมัครงานที่อนุมัติแล้วในปีนี้
-    # สมมติ JobApplication เชื่อมกับ CompanyMaster หรือเก็บชื่อไว้
-    # กรณีเก็บเป็นชื่อ (CharField) ต้องเอามา map กับ CompanyMaster
-    job_companies = JobApplication.objects.filter(status='APPROVED').values_list('company__name', flat=True).distinct()
-    
-    created_count = 0
-    
-    for comp_name in job_companies:
-        # 1. หาหรือสร้าง CompanyMaster
-        company, _ = CompanyMaster.objects.get_or_create(name=comp_name)
-        
-        # 2. เช็คว่ามี Profile หรือยัง
-        if not CompanyProfile.objects.filter(company=company, academic_year=current_year).exists():
-            # Generate Username (เช่น comp_abc123)
-            clean_name = "".join(e for e in company.name if e.isalnum())[:8]
-            username = f"{clean_name.lower()}_{random.randint(100,999)}"
-            password = generate_random_password(8)
-            
-            # Create User & Profile
-            if not User.objects.filter(username=username).exists():
-                user = User.objects.create_user(username=username, password=password, role=User.Role.COMPANY)
-                
-                CompanyProfile.objects.create(
-                    user=user,
-                    company=company,
-                    position="HR / ผู้ดูแล",
-                    academic_year=current_year
-                )
-                
-                # Note: อาจต้องบันทึก password (plaintext) ไว้ชั่วคราวเพื่อแจ้งบริษัท 
-                # หรือใช้วิธีส่ง email reset password แต่ในที่นี้จะโชว์หน้าเว็บตาม requirement เดิม
-                # (การเก็บ plaintext password ไม่แนะนำใน production แต่ทำตาม flow เดิมเพื่อความสะดวก)
-                
-                created_count += 1
-    
-    if created_count > 0:
-        messages.success(request, f"สร้างบัญชีอัตโนมัติสำเร็จ {created_count} รายการ")
-    else:
-        messages.info(request, "ข้อมูลครบถ้วนแล้ว ไม่มีบัญชีที่ต้องสร้างเพิ่ม")
-
-    return render(request, 'teacher/partials/company_account_list.html', get_account_context())
+    """ ส่งงานสร้างบัญชีอัตโนมัติเข้าคิว แล้วคืนกล่องสถานะงาน (poll จนเสร็จ) """
+    if request.method == "POST" and request.user.role == User.Role.TEACHER:
+        task = enqueue('auto_generate_accounts', user=request.user)
+        return render(request, 'partials/task_status.html', {'task': task})
+    return HttpResponseForbidden()
 
 # ==============================================================================
 # 3. Company System
 # ==============================================================================
 
-class CompanyBaseView(LoginRequiredMixin, View):
-    def dispatch(self, request, *args, **kwargs):
+class CompanyBaseView(AsyncLoginRequiredView):
+    """ หน้าของบริษัทเป็น view แบบ async """
+    def check_role(self, request):
         if request.user.role != User.Role.COMPANY:
             return redirect('home')
-        return super().dispatch(request, *args, **kwargs)
+        return None
 
 class CompanyEvaluationListView(CompanyBaseView):
-    def get(self, request):
+    async def get(self, request):
         # ดึง Profile ของบริษัทที่ Login อยู่
         try:
             company_profile = request.user.company_profile
@@ -1233,16 +1409,17 @@ class CompanyEvaluationListView(CompanyBaseView):
 
         # ดึงรายชื่อนักศึกษาที่ 'Approved' ให้มาฝึกงานที่บริษัทนี้ในปีการศึกษาปัจจุบัน
         students = JobApplication.objects.filter(
-            company__name=company_profile.company.name, # หรือเชื่อมด้วย ID ถ้ามี
+            company_id=company_profile.company_id, # เชื่อมด้วย FK ให้ใช้ index (company, status, academic_year)
             status__in=['APPROVED', 'COMPLETED'],
             academic_year=company_profile.academic_year # กรองปีถ้าจำเป็น
         ).select_related('student__user', 'evaluation')
+        students = [job async for job in students]
 
         return render(request, 'company/evaluation_list.html', {'students': students, 'company': company_profile.company})
 
 # --- HTMX Views ---
 def get_evaluation_modal(request, job_id):
-    job = get_object_or_404(JobApplication, pk=job_id)
+    job = get_object_or_404(JobApplication.objects.select_related('student__user', 'company'), pk=job_id)
     eval_obj, created = Evaluation.objects.get_or_create(job_application=job)
     
     # สร้าง Form โดยดึงค่าจาก eval_obj มาแสดง (Instance)
@@ -0,0 +1,35 @@
+"""
+gunicorn อ่านไฟล์นี้อัตโนมัติเมื่อรันจากโฟลเดอร์ app ใช้ได้ทั้งสองโหมด
+- ASGI (docker-compose): gunicorn coopV2.asgi:application -k uvicorn_worker.UvicornWorker
+  view แบบ async (dashboard, ข่าวสาร, ค้นหาบริษัท, ดาวน์โหลดไฟล์) รอ DB ได้โดย worker ยังรับ request อื่นต่อ
+  ส่วน view แบบ sync ยังทำงานได้ตามเดิม (Django รันใน thread ให้)
+- WSGI (sync worker แบบเดิม): gunicorn coopV2.wsgi:application
+
+Prometheus แบบหลาย worker: แต่ละ worker เขียน metrics ลงไฟล์ใน PROMETHEUS_MULTIPROC_DIR
+"""
+import glob
+import os
+import socket
+
+from prometheus_client import multiprocess
+
+
+def metrics_identifier(pid):
+    # ต้องตรงกับ coopstack.metrics.process_identifier (โฟลเดอร์ metrics แชร์กับ container worker)
+    return f"{socket.gethostname().replace('_', '-')}-{pid}"
+
+
+def on_starting(server):
+    # ล้างไฟล์ metrics ของรอบก่อนเฉพาะของ container นี้ (counter จะได้เริ่มจาก 0 หลัง restart)
+    # ไม่ลบทั้งโฟลเดอร์เพราะ container worker กำลังเขียนไฟล์ของตัวเองอยู่
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, f"*_{metrics_identifier('*')}.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    # worker ที่ตายแล้วไม่ต้องนับ gauge แบบ live อีก
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(metrics_identifier(worker.pid))